@@ -25,6 +25,8 @@ try:
             os.environ['DEEPSEEK_API_KEY'] = st.secrets['DEEPSEEK_API_KEY']
         if 'DEEPSEEK_API_URL' in st.secrets:
             os.environ['DEEPSEEK_API_URL'] = st.secrets['DEEPSEEK_API_URL']
+        if 'JWT_SECRET' in st.secrets:
+            os.environ['JWT_SECRET'] = st.secrets['JWT_SECRET']
 except Exception as e:
     # Secrets 未配置时不报错
     pass
@@ -42,64 +44,11 @@ if 'DEEPSEEK_API_KEY' not in os.environ:
 # 导入其他必要的模块
 try:
     from streamlit_autorefresh import st_autorefresh
-    from services.realtime_manager import RealTimeManager
 except ImportError as e:
     st.error(f"❌ 导入模块失败: {e}")
     st.info("请检查 requirements.txt 是否包含所有依赖")
     st.stop()
 
-# 只在已登录状态下启用自动刷新
-if 'authenticated' in st.session_state and st.session_state.authenticated:
-    st_autorefresh(interval=10000, key="data_refresh")
-
-# 初始化会话状态
-if 'authenticated' not in st.session_state:
-    st.session_state.authenticated = False
-if 'username' not in st.session_state:
-    st.session_state.username = None
-if 'rt_manager' not in st.session_state:
-    st.session_state.rt_manager = RealTimeManager()
-if 'last_seen_id' not in st.session_state:
-    st.session_state.last_seen_id = None
-if 'logs' not in st.session_state:
-    st.session_state.logs = []
-if 'recommendations' not in st.session_state:
-    st.session_state.recommendations = []
-if 'analysis_results' not in st.session_state:
-    st.session_state.analysis_results = []
-if 'use_reasoning_model' not in st.session_state:
-    st.session_state.use_reasoning_model = False
-if 'is_analyzing' not in st.session_state:
-    st.session_state.is_analyzing = False
-if 'analysis_start_time' not in st.session_state:
-    st.session_state.analysis_start_time = None
-if 'is_level2_analyzing' not in st.session_state:
-    st.session_state.is_level2_analyzing = False
-if 'level2_queue' not in st.session_state:
-    st.session_state.level2_queue = []
-
-# 登录页面
-def render_login():
-    st.title("A股观察室 — 实时推荐")
-    
-    st.markdown("### 🔐 用户登录")
-    st.info("💡 默认账号: admin / admin123")
-    
-    with st.form("login_form"):
-        username = st.text_input("用户名")
-        password = st.text_input("密码", type="password")
-        submit = st.form_submit_button("登录")
-        
-        if submit:
-            if username == "admin" and password == "admin123":
-                st.session_state.authenticated = True
-                st.session_state.username = username
-                st.success("✅ 登录成功！")
-                time.sleep(0.5)
-                st.rerun()
-            else:
-                st.error("❌ 用户名或密码错误")
-
 # 导入主渲染函数
 try:
     # 直接导入 streamlit_app 模块中的函数
@@ -117,9 +66,9 @@ try:
     # 恢复原始函数
     st.set_page_config = original_set_page_config
     
-    # 获取 render_main 函数
+    # 登录、JWT 校验和自动刷新都复用 streamlit_app 模块中的实现
     render_main = streamlit_app_module.render_main
-    process_news = streamlit_app_module.process_news
+    render_login = streamlit_app_module.render_login
     
 except Exception as e:
     st.error(f"❌ 加载主应用失败: {e}")
@@ -128,7 +77,7 @@ except Exception as e:
     st.stop()
 
 # 渲染应用
-if st.session_state.authenticated:
+if st.session_state.username:
     try:
         render_main()
     except Exception as e:
@@ -136,4 +85,5 @@ if st.session_state.authenticated:
         import traceback
         st.code(traceback.format_exc())
 else:
+    st.info("💡 默认账号: admin / admin123")
     render_login()
@@ -56,7 +56,7 @@ if 'parsed' in res1:
     if impact == '是':
         # 步骤3: 获取候选股票
         print(f"\n[{time.strftime('%H:%M:%S')}] 📈 步骤3: 筛选候选股票...")
-        candidates = rt.pick_candidate_stocks(5)
+        candidates = rt.pick_candidate_stocks(5, sectors)
         print(f"[{time.strftime('%H:%M:%S')}] ✅ 筛选了 {len(candidates)} 只候选股票")
         
         for i, stock in enumerate(candidates[:3], 1):
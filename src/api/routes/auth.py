@@ -1,29 +1,26 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from datetime import datetime, timedelta
-from jose import JWTError, jwt
-from services.auth_service import AuthService
+from services.auth_service import create_access_token, decode_access_token, get_auth_service
 
 router = APIRouter()
-auth_service = AuthService()
 
-# JWT 配置
-SECRET_KEY = "your-secret-key-here"  # 在生产环境中应该从环境变量获取
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/token")
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
-
-def create_access_token(data: dict):
-    to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+def get_current_user(token: str = Depends(oauth2_scheme)) -> str:
+    """需要登录的接口依赖：只校验 JWT，不查数据库，返回用户名"""
+    username = decode_access_token(token)
+    if not username:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return username
 
+# bcrypt 校验是 CPU 密集的同步调用，登录/注册用普通函数，由 FastAPI 放到线程池执行
 @router.post("/token")
-async def login(form_data: OAuth2PasswordRequestForm = Depends()):
-    user = auth_service.authenticate_user(form_data.username, form_data.password)
+def login(form_data: OAuth2PasswordRequestForm = Depends()):
+    user = get_auth_service().authenticate_user(form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -34,11 +31,16 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.post("/register")
-async def register(username: str, password: str, email: str = None):
-    success = auth_service.create_user(username, password, email)
+def register(username: str, password: str, email: str = None):
+    success = get_auth_service().create_user(username, password, email)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already registered"
         )
-    return {"message": "User created successfully"}
\ No newline at end of file
+    return {"message": "User created successfully"}
+
+@router.get("/me")
+async def me(username: str = Depends(get_current_user)):
+    """当前登录用户（用于前端校验 token 是否仍然有效）"""
+    return {"username": username}
@@ -0,0 +1,33 @@
+import asyncio
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from services.auth_service import decode_access_token
+from services.ws_hub import get_broadcast_hub
+
+router = APIRouter()
+
+@router.websocket("/ws")
+async def websocket_endpoint(websocket: WebSocket, token: str = ""):
+    """推送新的分析结果（token 为 /api/auth/token 返回的 JWT）"""
+    username = decode_access_token(token) if token else None
+    if not username:
+        await websocket.close(code=1008)
+        return
+
+    await websocket.accept()
+    hub = get_broadcast_hub()
+    client = hub.register(websocket, username)
+    sender = asyncio.create_task(client.sender())
+    try:
+        # 客户端不需要发送数据；持续接收以便及时发现断开
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        hub.unregister(client)
+        sender.cancel()
+
+@router.get("/api/metrics/ws")
+async def ws_metrics():
+    """WebSocket 推送指标"""
+    return get_broadcast_hub().stats()
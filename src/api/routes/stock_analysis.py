@@ -1,21 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
-from models.schemas import StockAnalysis
-from services.news_monitor import NewsMonitor
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import List, Optional
+from models.schemas import StockAnalysis, StockAnalysisPage
+from services.analysis_repository import get_analysis_repository
+from services.market_data import get_market_data
 
 router = APIRouter()
-news_monitor = NewsMonitor()
 
-@router.get("/latest")
-async def get_latest_analysis():
+@router.get("/latest", response_model=StockAnalysisPage)
+def get_latest_analysis(limit: int = Query(20, ge=1, le=200),
+                        since: Optional[int] = Query(None, description="上次返回的 cursor，只取之后的新结果"),
+                        level: Optional[int] = Query(None, ge=1, le=2),
+                        sector: Optional[str] = None):
     """获取最新的分析结果"""
-    # TODO: 实现从数据库获取最新分析结果
-    return {"message": "Coming soon"}
+    repo = get_analysis_repository()
+    if repo is None:
+        raise HTTPException(status_code=503, detail="Analysis storage disabled")
+    if since is None:
+        items = repo.latest(limit, level=level, sector=sector)
+    else:
+        items = repo.since(since, limit, level=level, sector=sector)
+    cursor = max((item['id'] for item in items), default=since)
+    return {"items": items, "cursor": cursor}
 
 @router.get("/stock/{stock_code}")
 async def get_stock_data(stock_code: str):
     """获取单个股票的实时数据"""
-    data = await news_monitor.get_stock_data(stock_code)
+    try:
+        data = await get_market_data().get_quote(stock_code)
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Market data unavailable: {str(e)}")
     if not data:
         raise HTTPException(status_code=404, detail="Stock not found")
-    return data
\ No newline at end of file
+    return data
@@ -1,8 +1,13 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from api.routes import auth, stock_analysis
-from services.news_monitor import NewsMonitor
-from services.auth_service import AuthService
+from api.routes import auth, realtime, stock_analysis
+from services.news_monitor import NEWS_MONITOR_ENABLED, get_news_monitor
+from services.auth_service import get_auth_service
+from services.analysis_repository import get_analysis_repository
+from services.http_client import close_async_session, pool_stats
+from services.market_data import get_market_data
+from services.ws_hub import AnalysisFeed, get_broadcast_hub
 
 app = FastAPI(title="A股观察室")
 
@@ -18,12 +23,40 @@ app.add_middleware(
 # 注册路由
 app.include_router(auth.router, prefix="/api/auth", tags=["认证"])
 app.include_router(stock_analysis.router, prefix="/api/analysis", tags=["股票分析"])
+app.include_router(realtime.router, tags=["实时推送"])
+
+background_tasks = []
 
 @app.on_event("startup")
 async def startup_event():
     # 确保默认用户存在
-    auth_service = AuthService()
-    auth_service.ensure_default_user()
+    get_auth_service().ensure_default_user()
+    # 跟踪分析结果表，通过 /ws 推送新结果
+    repository = get_analysis_repository()
+    if repository is not None:
+        background_tasks.append(asyncio.create_task(AnalysisFeed(repository, get_broadcast_hub()).run()))
+    # 进程内的 asyncio 新闻监控（抓取 -> 一级分析 -> 二级分析）
+    if NEWS_MONITOR_ENABLED:
+        get_news_monitor().start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    for task in background_tasks:
+        task.cancel()
+    if NEWS_MONITOR_ENABLED:
+        await get_news_monitor().stop()
+    await close_async_session()
+    get_market_data().shutdown()
+
+@app.get("/api/metrics/http")
+async def http_metrics():
+    """HTTP 连接池指标"""
+    return pool_stats()
+
+@app.get("/api/metrics/market")
+async def market_metrics():
+    """行情门面指标：线程池、合并的请求数、快照缓存状态"""
+    return get_market_data().stats()
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,17 +1,70 @@
+import os
+import threading
 from datetime import datetime
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, JSON
+from sqlalchemy import create_engine, event, Column, ForeignKey, Index, Integer, String, DateTime, Text, JSON
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 Base = declarative_base()
 
+# 默认与用户表共用项目根目录下的 SQLite 数据库文件
+DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'stock_analysis.db')
+DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{DB_PATH}")
+
 class StockAnalysis(Base):
     __tablename__ = "stock_analysis"
 
     id = Column(Integer, primary_key=True, index=True)
+    news_id = Column(String, index=True)
+    level = Column(Integer, default=1)  # 1=一级分析(V3)，2=二级分析(R1)
     news_title = Column(String)
     news_content = Column(Text)
     affected_sectors = Column(JSON)
     recommended_stocks = Column(JSON)
-    analysis_time = Column(DateTime, default=datetime.utcnow)
-    impact_level = Column(String)
\ No newline at end of file
+    analysis_time = Column(DateTime, default=datetime.utcnow, index=True)
+    impact = Column(String)        # 是/否/未知
+    impact_level = Column(String)  # 强/中/弱
+    reason = Column(Text)
+    model = Column(String)
+
+class StockAnalysisSector(Base):
+    """分析结果与影响板块的对应，用于按板块查询"""
+    __tablename__ = "stock_analysis_sector"
+
+    analysis_id = Column(Integer, ForeignKey("stock_analysis.id", ondelete="CASCADE"), primary_key=True)
+    sector = Column(String, primary_key=True)
+
+    __table_args__ = (Index("ix_stock_analysis_sector_sector", "sector", "analysis_id"),)
+
+def create_db_engine(url: str = DATABASE_URL):
+    """创建数据库引擎；SQLite 开启 WAL，读写互不阻塞"""
+    if not url.startswith("sqlite"):
+        return create_engine(url, pool_pre_ping=True)
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragma(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+    return engine
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+def get_engine(url: str = DATABASE_URL):
+    """返回进程内共享的数据库引擎（同一 URL 只创建一次，分析结果与用户表共用连接池）"""
+    engine = _engines.get(url)
+    if engine is None:
+        with _engines_lock:
+            engine = _engines.get(url)
+            if engine is None:
+                engine = _engines[url] = create_db_engine(url)
+    return engine
+
+def init_db(engine):
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
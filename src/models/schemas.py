@@ -7,9 +7,19 @@ class User(BaseModel):
     hashed_password: str
 
 class StockAnalysis(BaseModel):
+    id: Optional[int] = None
+    news_id: Optional[str] = None
+    level: Optional[int] = None
     news_title: str
-    news_content: str
+    news_content: Optional[str] = None
     affected_sectors: List[str]
     recommended_stocks: List[dict]
     analysis_time: str
-    impact_level: str
\ No newline at end of file
+    impact: Optional[str] = None
+    impact_level: Optional[str] = None
+    reason: Optional[str] = None
+    model: Optional[str] = None
+
+class StockAnalysisPage(BaseModel):
+    items: List[StockAnalysis]
+    cursor: Optional[int] = None
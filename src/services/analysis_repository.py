@@ -0,0 +1,178 @@
+import os
+import time
+import queue
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy import insert, select
+from models.database import DATABASE_URL, StockAnalysis, StockAnalysisSector, get_engine, init_db
+from services.event_log import ERROR, get_event_log
+
+ANALYSIS_DB_ENABLED = os.getenv("ANALYSIS_DB_ENABLED", "1") == "1"
+# 批量写入：攒够多少条或间隔多少秒提交一次
+ANALYSIS_DB_BATCH_SIZE = int(os.getenv("ANALYSIS_DB_BATCH_SIZE", "100"))
+ANALYSIS_DB_FLUSH_INTERVAL = float(os.getenv("ANALYSIS_DB_FLUSH_INTERVAL", "0.5"))
+_QUEUE_SIZE = 10000
+
+_analysis = StockAnalysis.__table__
+_sectors = StockAnalysisSector.__table__
+
+
+class AnalysisRepository:
+    """一级/二级分析结果的持久化存储（StockAnalysis 表）
+
+    写入走后台线程：记录先进入内存队列，按批次用一条 executemany 插入并提交，
+    分析流水线不会因为数据库写入而阻塞。读取提供"最新 N 条"和"游标之后"两种查询。
+    """
+
+    def __init__(self, url: str = DATABASE_URL, batch_size: int = ANALYSIS_DB_BATCH_SIZE,
+                 flush_interval: float = ANALYSIS_DB_FLUSH_INTERVAL):
+        self.engine = get_engine(url)
+        init_db(self.engine)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.written = 0
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=_QUEUE_SIZE)
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+
+    # ---------- 写入 ----------
+    def add(self, record: Dict[str, Any]):
+        """加入写入队列（队列满时丢弃并计数，不阻塞调用方）"""
+        self._ensure_writer()
+        record.setdefault('analysis_time', datetime.utcnow())
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def record_level1(self, item: Dict[str, Any], impact: str, sectors: List[str], reason: str,
+                      impact_level: Optional[str] = None):
+        self.add({
+            'news_id': str(item.get('id', '')),
+            'level': 1,
+            'news_title': item.get('title', ''),
+            'news_content': item.get('content', ''),
+            'affected_sectors': list(sectors or []),
+            'recommended_stocks': [],
+            'impact': impact,
+            'impact_level': impact_level,
+            'reason': reason,
+            'model': 'DeepSeek-V3',
+        })
+
+    def record_level2(self, task: Dict[str, Any], strategy: Dict[str, Any]):
+        parsed = strategy.get('parsed') if isinstance(strategy.get('parsed'), dict) else {}
+        self.add({
+            'news_id': str(task.get('nid', '')),
+            'level': 2,
+            'news_title': task.get('title', ''),
+            'news_content': task.get('content', ''),
+            'affected_sectors': list(task.get('sectors') or []),
+            'recommended_stocks': parsed.get('recommended_stocks') or [],
+            'impact': '是',
+            'impact_level': task.get('strength'),
+            'reason': parsed.get('overall_strategy') or task.get('reason', ''),
+            'model': 'DeepSeek-R1',
+        })
+
+    def _ensure_writer(self):
+        if self._thread is not None:
+            return
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._writer, name="analysis-db", daemon=True)
+                self._thread.start()
+
+    def _writer(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self.write_batch(batch)
+            except Exception as e:
+                get_event_log().emit('db_write_error', 'system', ERROR, outcome='error', count=len(batch),
+                                     error=str(e))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def write_batch(self, records: List[Dict[str, Any]]):
+        """单个事务内批量插入分析结果及其板块索引"""
+        if not records:
+            return
+        columns = [c.name for c in _analysis.columns if c.name != 'id']
+        now = datetime.utcnow()
+        # executemany 中显式的 None 会绕过列默认值，缺少分析时间的记录在这里补上
+        rows = [{**{c: r.get(c) for c in columns}, 'analysis_time': r.get('analysis_time') or now} for r in records]
+        with self.engine.begin() as conn:
+            ids = conn.execute(insert(_analysis).returning(_analysis.c.id, sort_by_parameter_order=True),
+                               rows).scalars().all()
+            sector_rows = [{'analysis_id': i, 'sector': s}
+                           for i, r in zip(ids, rows) for s in dict.fromkeys(r['affected_sectors'] or [])
+                           if isinstance(s, str) and s]
+            if sector_rows:
+                conn.execute(insert(_sectors), sector_rows)
+        self.written += len(rows)
+
+    def flush(self):
+        """等待队列中的记录全部写入"""
+        if self._thread is not None:
+            self._queue.join()
+
+    # ---------- 查询 ----------
+    def _select(self, level: Optional[int], sector: Optional[str]):
+        stmt = select(_analysis)
+        if sector:
+            stmt = stmt.join(_sectors, _sectors.c.analysis_id == _analysis.c.id).where(_sectors.c.sector == sector)
+        if level is not None:
+            stmt = stmt.where(_analysis.c.level == level)
+        return stmt
+
+    def latest(self, limit: int = 20, level: Optional[int] = None, sector: Optional[str] = None) -> List[Dict[str, Any]]:
+        """最新的 limit 条（最新在前）"""
+        stmt = self._select(level, sector).order_by(_analysis.c.id.desc()).limit(limit)
+        with self.engine.connect() as conn:
+            return [self.to_dict(row) for row in conn.execute(stmt).mappings()]
+
+    def since(self, cursor: int, limit: int = 100, level: Optional[int] = None,
+              sector: Optional[str] = None) -> List[Dict[str, Any]]:
+        """id 大于 cursor 的记录（按写入顺序），用于增量拉取"""
+        stmt = self._select(level, sector).where(_analysis.c.id > cursor).order_by(_analysis.c.id).limit(limit)
+        with self.engine.connect() as conn:
+            return [self.to_dict(row) for row in conn.execute(stmt).mappings()]
+
+    @staticmethod
+    def to_dict(row) -> Dict[str, Any]:
+        data = dict(row)
+        if isinstance(data.get('analysis_time'), datetime):
+            data['analysis_time'] = data['analysis_time'].isoformat()
+        return data
+
+    def stats(self) -> Dict[str, Any]:
+        return {'written': self.written, 'queued': self._queue.qsize(), 'dropped': self.dropped}
+
+
+_repository: Optional[AnalysisRepository] = None
+_repository_lock = threading.Lock()
+
+
+def get_analysis_repository() -> Optional[AnalysisRepository]:
+    """返回进程内共享的分析结果仓库；ANALYSIS_DB_ENABLED=0 时返回 None"""
+    global _repository
+    if not ANALYSIS_DB_ENABLED:
+        return None
+    if _repository is None:
+        with _repository_lock:
+            if _repository is None:
+                _repository = AnalysisRepository()
+    return _repository
@@ -1,12 +1,52 @@
-from sqlalchemy import create_engine, Column, Integer, String
+from sqlalchemy import Column, Integer, String
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from passlib.context import CryptContext
+from dotenv import load_dotenv
+from jose import JWTError, jwt
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+from models.database import DATABASE_URL, get_engine
 from models.schemas import User
+from services.event_log import WARNING, get_event_log
 import os
+import bcrypt
+import secrets
+import time
+import hmac
+import hashlib
+import threading
+
+load_dotenv()
 
 Base = declarative_base()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# JWT 配置：未设置 JWT_SECRET 或仍为示例值时，每个进程随机生成密钥（重启后已签发的 token 失效，
+# 且其他进程签发的 token 无法通过校验），绝不使用公开的默认密钥
+_PLACEHOLDER_SECRETS = {"", "your-secret-key-here"}
+JWT_SECRET = os.getenv("JWT_SECRET", "").strip()
+JWT_SECRET_EPHEMERAL = JWT_SECRET in _PLACEHOLDER_SECRETS
+if JWT_SECRET_EPHEMERAL:
+    JWT_SECRET = secrets.token_urlsafe(32)
+    get_event_log().emit('jwt_secret_generated', 'system', WARNING)
+JWT_ALGORITHM = "HS256"
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+# 用户记录 LRU 缓存条数（注册/修改时失效）
+AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", "256"))
+# 已验证凭据的缓存时长（秒），期间同一用户名+密码再次登录不重复计算 bcrypt；0 表示关闭
+AUTH_CREDENTIAL_CACHE_TTL = float(os.getenv("AUTH_CREDENTIAL_CACHE_TTL", "60"))
+AUTH_CREDENTIAL_CACHE_SIZE = int(os.getenv("AUTH_CREDENTIAL_CACHE_SIZE", "1024"))
+
+def hash_password(password: str) -> str:
+    """bcrypt 哈希（与 passlib 生成的 $2b$ 哈希兼容）；bcrypt 只使用前 72 字节，这里显式截断"""
+    return bcrypt.hashpw(password.encode('utf-8')[:72], bcrypt.gensalt()).decode('ascii')
+
+def verify_password(password: str, hashed_password: str) -> bool:
+    try:
+        return bcrypt.checkpw(password.encode('utf-8')[:72], hashed_password.encode('ascii'))
+    except ValueError:
+        # 哈希格式无效
+        return False
 
 class UserModel(Base):
     __tablename__ = "users"
@@ -17,20 +57,67 @@ class UserModel(Base):
     hashed_password = Column(String)
 
 class AuthService:
-    def __init__(self):
-        # 使用项目根目录下的 SQLite 数据库文件
-        db_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'stock_analysis.db')
-        self.engine = create_engine(f"sqlite:///{db_path}")
+    """用户认证服务（进程内通过 get_auth_service() 共享一个实例）
+
+    使用共享的数据库引擎；用户记录走 LRU 缓存，写入时失效。
+    登录成功后以 HMAC(进程随机盐, 用户名+密码) 为键缓存一小段时间，
+    缓存中只有摘要、不保存明文，且密码哈希变化后自动作废；登录失败从不缓存。
+    """
+
+    def __init__(self, url: str = DATABASE_URL, user_cache_size: int = AUTH_USER_CACHE_SIZE,
+                 credential_ttl: float = AUTH_CREDENTIAL_CACHE_TTL,
+                 credential_cache_size: int = AUTH_CREDENTIAL_CACHE_SIZE):
+        self.engine = get_engine(url)
         Base.metadata.create_all(bind=self.engine)
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.user_cache_size = max(0, user_cache_size)
+        self.credential_ttl = credential_ttl
+        self.credential_cache_size = max(0, credential_cache_size)
+        self._users: "OrderedDict[str, User]" = OrderedDict()
+        # 凭据摘要 -> (过期时间, 验证时的密码哈希)
+        self._credentials: "OrderedDict[bytes, Tuple[float, str]]" = OrderedDict()
+        self._salt = os.urandom(16)
+        self._lock = threading.Lock()
+        self.verifications = 0
+        self.credential_hits = 0
+
+    def get_user(self, username: str) -> Optional[User]:
+        with self._lock:
+            user = self._users.get(username)
+            if user is not None:
+                self._users.move_to_end(username)
+                return user
+        db = self.SessionLocal()
+        try:
+            row = db.query(UserModel).filter(UserModel.username == username).first()
+            if row is None:
+                return None
+            user = User(username=row.username, email=row.email, hashed_password=row.hashed_password)
+        finally:
+            db.close()
+        if self.user_cache_size:
+            with self._lock:
+                self._users[username] = user
+                while len(self._users) > self.user_cache_size:
+                    self._users.popitem(last=False)
+        return user
+
+    def invalidate(self, username: Optional[str] = None):
+        """用户记录变化后调用；不传用户名时清空全部缓存"""
+        with self._lock:
+            if username is None:
+                self._users.clear()
+                self._credentials.clear()
+            else:
+                self._users.pop(username, None)
 
     def create_user(self, username: str, password: str, email: str = None) -> bool:
         db = self.SessionLocal()
         try:
             if db.query(UserModel).filter(UserModel.username == username).first():
                 return False
-            
-            hashed_password = pwd_context.hash(password)
+
+            hashed_password = hash_password(password)
             db_user = UserModel(
                 username=username,
                 email=email,
@@ -41,25 +128,73 @@ class AuthService:
             return True
         finally:
             db.close()
+            self.invalidate(username)
+
+    def _credential_key(self, username: str, password: str) -> bytes:
+        return hmac.new(self._salt, f"{username}\0{password}".encode('utf-8'), hashlib.sha256).digest()
 
     def authenticate_user(self, username: str, password: str):
-        db = self.SessionLocal()
-        try:
-            user = db.query(UserModel).filter(UserModel.username == username).first()
-            if not user:
-                return False
-            if not pwd_context.verify(password, user.hashed_password):
-                return False
-            return user
-        finally:
-            db.close()
+        user = self.get_user(username)
+        if not user:
+            return False
+        key = self._credential_key(username, password) if self.credential_ttl > 0 else None
+        if key is not None:
+            with self._lock:
+                cached = self._credentials.get(key)
+                if cached is not None and cached[0] > time.monotonic() and cached[1] == user.hashed_password:
+                    self.credential_hits += 1
+                    return user
+        self.verifications += 1
+        if not verify_password(password, user.hashed_password):
+            return False
+        if key is not None and self.credential_cache_size:
+            with self._lock:
+                self._credentials[key] = (time.monotonic() + self.credential_ttl, user.hashed_password)
+                self._credentials.move_to_end(key)
+                while len(self._credentials) > self.credential_cache_size:
+                    self._credentials.popitem(last=False)
+        return user
+
+    def user_from_token(self, token: str) -> Optional[User]:
+        """校验 JWT 并确认其中的用户仍然存在（用户记录走 LRU 缓存，通常不查数据库）"""
+        username = decode_access_token(token) if token else None
+        return self.get_user(username) if username else None
 
     def ensure_default_user(self):
         """确保默认用户存在"""
-        db = self.SessionLocal()
-        try:
-            default_user = db.query(UserModel).filter(UserModel.username == "admin").first()
-            if not default_user:
-                self.create_user("admin", "admin123", "admin@example.com")
-        finally:
-            db.close()
\ No newline at end of file
+        if self.get_user("admin") is None:
+            self.create_user("admin", "admin123", "admin@example.com")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'cached_users': len(self._users),
+            'cached_credentials': len(self._credentials),
+            'verifications': self.verifications,
+            'credential_hits': self.credential_hits,
+        }
+
+def create_access_token(data: dict) -> str:
+    to_encode = data.copy()
+    expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    to_encode.update({"exp": expire})
+    return jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGORITHM)
+
+def decode_access_token(token: str) -> Optional[str]:
+    """本地校验 JWT（只验签和过期时间，不查数据库），返回用户名；无效或过期时返回 None"""
+    try:
+        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+    except JWTError:
+        return None
+    return payload.get("sub")
+
+_auth_service: Optional[AuthService] = None
+_auth_service_lock = threading.Lock()
+
+def get_auth_service() -> AuthService:
+    """返回进程内共享的认证服务（首次调用时建表）"""
+    global _auth_service
+    if _auth_service is None:
+        with _auth_service_lock:
+            if _auth_service is None:
+                _auth_service = AuthService()
+    return _auth_service
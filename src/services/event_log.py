@@ -0,0 +1,193 @@
+import os
+import json
+import time
+import queue
+import itertools
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, NamedTuple, Optional
+
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+LEVEL_NAMES = {DEBUG: 'DEBUG', INFO: 'INFO', WARNING: 'WARNING', ERROR: 'ERROR'}
+
+EVENT_LOG_CAPACITY = int(os.getenv("EVENT_LOG_CAPACITY", "2000"))
+# 设置后事件同时追加写入该 JSONL 文件（后台线程批量写入）
+EVENT_LOG_PATH = os.getenv("EVENT_LOG_PATH", "")
+EVENT_LOG_FLUSH_INTERVAL = float(os.getenv("EVENT_LOG_FLUSH_INTERVAL", "1"))
+EVENT_LOG_LEVEL = {v: k for k, v in LEVEL_NAMES.items()}.get(os.getenv("EVENT_LOG_LEVEL", "DEBUG").upper(), DEBUG)
+
+# 各类事件在界面日志面板中的显示模板（只在渲染时格式化）
+MESSAGES: Dict[str, str] = {
+    'pipeline_started': "🟢 分析流水线已启动",
+    'fetch_failed': "❌ 新闻抓取失败，请检查新浪财经API是否可用",
+    'fetch_error': "抓取新闻失败: {error}",
+    'fetched': "✅ 新增 {new} 条新闻（去重后 {unique} 条，预筛后 {relevant} 条），待分析 {backlog} 条",
+    'duplicate': "🔁 新闻 {news_id} 与 {rep_id} 为同一事件，跳过分析",
+    'prefiltered': "🚫 新闻 {news_id} 相关度 {score:.2f} 低于阈值，跳过分析",
+    'level1_dispatch': "🤖 并发调用DeepSeek一级分析(V3快速模型) {count} 条，并发度 {concurrency}...",
+    'level1_done': "⏱️ 一级分析 {count} 条完成，耗时 {duration:.1f} 秒",
+    'impact_early': "⚡ 新闻 {news_id} 已判定有影响，提前预取行情",
+    'level1_result': "📊 新闻 {news_id} {title} → 影响: {impact} | 影响板块: {sectors}",
+    'level1_error': "❌ 新闻 {news_id} 一级分析API调用失败: {error}",
+    'level1_non_json': "⚠️ 新闻 {news_id} 一级分析返回非JSON格式",
+    'screened': "✅ 筛选了 {count} 只候选股票: {top}",
+    'screen_error': "❌ 股票筛选异常: {error}",
+    'screen_empty': "❌ 股票筛选失败，未获取到数据",
+    'level2_queued': "📥 已加入R1二级分析队列 (影响强度: {strength}, 排队: {queued})",
+    'level2_started': "🚀 开始R1二级分析 (创建于 {created_time})",
+    'level2_failed': "❌ R1二级分析失败: {error}",
+    'level2_done': "✅ R1二级分析完成，耗时 {duration:.1f} 秒",
+    'llm_call': "{model}@{endpoint} 调用{outcome}，耗时 {duration:.1f} 秒",
+    'llm_retry': "⏱️ {error}，{wait:.1f}秒后重试 ({attempt}/{retries})...",
+    'endpoint_failover': "🔀 端点 {endpoint} 调用失败，切换到 {next}: {error}",
+    'stream_callback_error': "流式回调异常: {error}",
+    'cycle_error': "❌ 系统异常: {error}",
+    'feed_read_error': "❌ 读取分析结果失败: {error}",
+    'db_write_error': "❌ {count} 条分析结果写入数据库失败: {error}",
+    'spill_error': "缓冲区溢出条目落盘失败: {error}",
+    'sector_list_error': "获取板块列表失败: {error}",
+    'endpoints_config_error': "⚠️ LLM_ENDPOINTS 不是合法的 JSON，已忽略: {error}",
+    'quote_error': "获取股票 {code} 行情失败: {error}",
+    'prefilter_model_rejected': "⚠️ 预筛模型文件 {path} 不是本程序训练生成的（或已被修改），已忽略",
+    'jwt_secret_generated': "⚠️ 未配置 JWT_SECRET（或仍为示例值），已为本进程随机生成密钥，重启后需重新登录",
+}
+
+
+class Event(NamedTuple):
+    seq: int
+    ts: float                  # time.monotonic()，用于排序和计算间隔
+    wall: float                # time.time()，仅用于显示
+    level: int
+    stage: str                 # fetch / dedup / prefilter / level1 / screen / level2 / llm / system
+    kind: str                  # 见 MESSAGES
+    news_id: Optional[str]
+    duration: Optional[float]  # 秒
+    outcome: Optional[str]     # ok / error / skipped / ...
+    fields: Dict[str, Any]
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = self._asdict()
+        data['level'] = LEVEL_NAMES.get(self.level, str(self.level))
+        return data
+
+
+def format_event(event: Dict[str, Any]) -> str:
+    """把事件（to_dict 的结果）渲染为一行日志文本"""
+    fields = {k: ', '.join(map(str, v)) if isinstance(v, list) else v for k, v in (event.get('fields') or {}).items()}
+    values = {'news_id': event.get('news_id'), 'duration': event.get('duration'),
+              'outcome': event.get('outcome'), **fields}
+    template = MESSAGES.get(event.get('kind', ''))
+    try:
+        text = template.format(**values) if template else None
+    except (KeyError, ValueError, TypeError, IndexError):
+        text = None
+    if text is None:
+        text = f"{event.get('stage')}.{event.get('kind')} " + " ".join(f"{k}={v}" for k, v in values.items() if v is not None)
+    return f"[{time.strftime('%H:%M:%S', time.localtime(event.get('wall', 0)))}] {text}"
+
+
+class EventLog:
+    """结构化事件流
+
+    emit() 只构造一个元组并追加到定长 deque（CPython 下 append 原子，无需加锁），
+    不做任何字符串格式化；配置了 JSONL 文件时事件另入无锁队列，由后台线程批量写盘。
+    """
+
+    def __init__(self, capacity: int = EVENT_LOG_CAPACITY, path: str = EVENT_LOG_PATH,
+                 flush_interval: float = EVENT_LOG_FLUSH_INTERVAL, min_level: int = EVENT_LOG_LEVEL):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.min_level = min_level
+        self._buffer: Deque[Event] = deque(maxlen=max(1, capacity))
+        self._seq = itertools.count()
+        self._pending: Optional["queue.SimpleQueue[Event]"] = None
+        if path:
+            self._pending = queue.SimpleQueue()
+            threading.Thread(target=self._flusher, name="event-log", daemon=True).start()
+
+    def emit(self, kind: str, stage: str, level: int = INFO, news_id: Any = None, duration: Optional[float] = None,
+             outcome: Optional[str] = None, **fields) -> Optional[Event]:
+        if level < self.min_level:
+            return None
+        event = Event(next(self._seq), time.monotonic(), time.time(), level, stage, kind,
+                      None if news_id is None else str(news_id), duration, outcome, fields)
+        self._buffer.append(event)
+        if self._pending is not None:
+            self._pending.put(event)
+        return event
+
+    @contextmanager
+    def span(self, kind: str, stage: str, level: int = INFO, news_id: Any = None, **fields) -> Iterator[Dict[str, Any]]:
+        """计时区间：退出时发出带 duration 的事件；with 块内可向返回的 dict 补充字段（outcome 可覆盖）"""
+        extra: Dict[str, Any] = {}
+        started = time.monotonic()
+        try:
+            yield extra
+        except Exception as e:
+            fields.update(extra, error=str(e))
+            self.emit(kind, stage, ERROR, news_id, time.monotonic() - started, 'error', **fields)
+            raise
+        outcome = extra.pop('outcome', 'ok')
+        fields.update(extra)
+        self.emit(kind, stage, level, news_id, time.monotonic() - started, outcome, **fields)
+
+    def recent(self, limit: Optional[int] = None, min_level: int = INFO) -> List[Dict[str, Any]]:
+        """最新在前"""
+        result = []
+        for event in reversed(list(self._buffer)):
+            if event.level >= min_level:
+                result.append(event.to_dict())
+                if limit is not None and len(result) >= limit:
+                    break
+        return result
+
+    def stage_stats(self) -> Dict[str, Dict[str, Any]]:
+        """按 阶段.事件 汇总缓冲区内带耗时的事件：次数、平均/p95/最大耗时"""
+        durations: Dict[str, List[float]] = {}
+        for event in list(self._buffer):
+            if event.duration is not None:
+                durations.setdefault(f"{event.stage}.{event.kind}", []).append(event.duration)
+        stats = {}
+        for key, values in durations.items():
+            values.sort()
+            stats[key] = {
+                'count': len(values),
+                'avg': round(sum(values) / len(values), 3),
+                'p95': round(values[min(len(values) - 1, int(0.95 * len(values)))], 3),
+                'max': round(values[-1], 3),
+            }
+        return stats
+
+    def _flusher(self):
+        while True:
+            time.sleep(self.flush_interval)
+            batch = []
+            while True:
+                try:
+                    batch.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                continue
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    for event in batch:
+                        f.write(json.dumps(event.to_dict(), ensure_ascii=False, default=str) + '\n')
+            except OSError:
+                pass
+
+
+_event_log: Optional[EventLog] = None
+_event_log_lock = threading.Lock()
+
+
+def get_event_log() -> EventLog:
+    """返回进程内共享的事件流"""
+    global _event_log
+    if _event_log is None:
+        with _event_log_lock:
+            if _event_log is None:
+                _event_log = EventLog()
+    return _event_log
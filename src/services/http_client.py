@@ -0,0 +1,90 @@
+import os
+import asyncio
+import threading
+from typing import Any, Dict, Optional
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+
+# 连接池配置
+# 同步（requests）与异步（aiohttp）共用：每个 host 的最大连接数
+HTTP_PER_HOST_LIMIT = int(os.getenv("HTTP_PER_HOST_LIMIT", "16"))
+# 仅同步：缓存的 host 连接池个数（urllib3 PoolManager 的 num_pools）
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))
+# 仅异步：所有 host 合计的最大连接数、空闲连接保活时间（秒）
+# urllib3 既没有跨 host 的总连接上限，也不会按空闲时长回收连接，同步会话不使用这两项
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "32"))
+HTTP_KEEPALIVE = float(os.getenv("HTTP_KEEPALIVE", "60"))
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+_async_sessions: Dict[int, aiohttp.ClientSession] = {}
+
+
+def get_http_session() -> requests.Session:
+    """返回进程内共享的 requests.Session（HTTP keep-alive + 每 host 连接池）
+
+    每个 host 最多 HTTP_PER_HOST_LIMIT 个连接，占满时阻塞等待；HTTP_POOL_MAXSIZE 与 HTTP_KEEPALIVE 只作用于异步会话。
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS,
+                                      pool_maxsize=HTTP_PER_HOST_LIMIT,
+                                      pool_block=True)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+async def get_async_session() -> aiohttp.ClientSession:
+    """返回当前事件循环共享的 aiohttp.ClientSession（首次调用时创建）"""
+    loop = asyncio.get_running_loop()
+    session = _async_sessions.get(id(loop))
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(limit=HTTP_POOL_MAXSIZE,
+                                         limit_per_host=HTTP_PER_HOST_LIMIT,
+                                         keepalive_timeout=HTTP_KEEPALIVE)
+        session = aiohttp.ClientSession(connector=connector)
+        _async_sessions[id(loop)] = session
+    return session
+
+
+async def close_async_session():
+    """关闭当前事件循环的共享会话（应用关闭时调用）"""
+    session = _async_sessions.pop(id(asyncio.get_running_loop()), None)
+    if session is not None and not session.closed:
+        await session.close()
+
+
+def pool_stats() -> Dict[str, Any]:
+    """连接池指标：每个 host 的请求数、新建连接数和连接复用率"""
+    stats: Dict[str, Any] = {"sync": {}, "async": {}}
+    if _session is not None:
+        adapter = _session.get_adapter("https://")
+        for key in list(adapter.poolmanager.pools.keys()):
+            pool = adapter.poolmanager.pools.get(key)
+            if pool is None:
+                continue
+            requests_made = getattr(pool, "num_requests", 0)
+            connections = getattr(pool, "num_connections", 0)
+            stats["sync"][f"{pool.scheme}://{pool.host}:{pool.port}"] = {
+                "requests": requests_made,
+                "connections_opened": connections,
+                "free_slots": pool.pool.qsize() if pool.pool is not None else 0,
+                "reuse_ratio": round(1 - connections / requests_made, 3) if requests_made else None,
+            }
+    for loop_id, session in list(_async_sessions.items()):
+        connector = session.connector
+        if connector is None or session.closed:
+            continue
+        stats["async"][str(loop_id)] = {
+            "limit": connector.limit,
+            "limit_per_host": connector.limit_per_host,
+            "acquired": len(getattr(connector, "_acquired", ())),
+            "idle": sum(len(v) for v in getattr(connector, "_conns", {}).values()),
+        }
+    return stats
@@ -0,0 +1,98 @@
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class IncrementalJSONParser:
+    """流式 JSON 解析：逐段喂入模型输出，顶层对象的某个字段一旦完整就立即给出
+
+    只跟踪最外层对象的字段（例如一级分析的 impact / affected_sectors / reason），
+    开头的 ```json 代码块标记等非 JSON 文本会被跳过。
+    """
+
+    def __init__(self):
+        self.buffer = ''
+        self.fields: Dict[str, Any] = {}
+        self.finished = False
+        self._pos = 0
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._expect = 'key'  # key -> key_str -> colon -> value -> comma
+        self._key: Optional[str] = None
+        self._key_start = 0
+        self._value_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """喂入一段文本，返回本次新完成的 (字段名, 值) 列表"""
+        self.buffer += chunk
+        buf = self.buffer
+        completed: List[Tuple[str, Any]] = []
+        i = self._pos
+        while i < len(buf) and not self.finished:
+            ch = buf[i]
+            if not self._started:
+                if ch == '{':
+                    self._started = True
+                    self._depth = 1
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        if self._expect == 'key_str':
+                            self._key = self._loads(buf[self._key_start:i + 1])
+                            self._expect = 'colon'
+                        elif self._expect == 'value' and self._value_start is not None:
+                            self._emit(buf, i + 1, completed)
+            elif ch == '"':
+                self._in_string = True
+                if self._depth == 1:
+                    if self._expect == 'key':
+                        self._key_start = i
+                        self._expect = 'key_str'
+                    elif self._expect == 'value' and self._value_start is None:
+                        self._value_start = i
+            elif ch in '{[':
+                if self._depth == 1 and self._expect == 'value' and self._value_start is None:
+                    self._value_start = i
+                self._depth += 1
+            elif ch in '}]':
+                self._depth -= 1
+                if self._depth == 1 and self._expect == 'value' and self._value_start is not None:
+                    self._emit(buf, i + 1, completed)
+                elif self._depth == 0:
+                    if self._expect == 'value' and self._value_start is not None:
+                        self._emit(buf, i, completed)
+                    self.finished = True
+            elif self._depth == 1:
+                if ch == ':' and self._expect == 'colon':
+                    self._expect = 'value'
+                elif ch == ',':
+                    if self._expect == 'value' and self._value_start is not None:
+                        self._emit(buf, i, completed)
+                    self._expect = 'key'
+                elif not ch.isspace() and self._expect == 'value' and self._value_start is None:
+                    self._value_start = i
+            i += 1
+        self._pos = i
+        return completed
+
+    def _emit(self, buf: str, end: int, completed: List[Tuple[str, Any]]):
+        value = self._loads(buf[self._value_start:end].strip())
+        if self._key is not None:
+            self.fields[self._key] = value
+            completed.append((self._key, value))
+        self._value_start = None
+        self._key = None
+        self._expect = 'comma'
+
+    @staticmethod
+    def _loads(text: str) -> Any:
+        try:
+            return json.loads(text)
+        except ValueError:
+            return text
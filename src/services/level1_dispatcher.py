@@ -0,0 +1,96 @@
+import os
+import math
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+LEVEL1_CONCURRENCY = int(os.getenv("LEVEL1_CONCURRENCY", "4"))
+LEVEL1_ITEM_TIMEOUT = float(os.getenv("LEVEL1_ITEM_TIMEOUT", "45"))
+# 待分析条数达到该值时改用批量请求（突发时段），否则逐条流式分析
+LEVEL1_BATCH_MIN = int(os.getenv("LEVEL1_BATCH_MIN", "3"))
+LEVEL1_BATCH_TIMEOUT = float(os.getenv("LEVEL1_BATCH_TIMEOUT", "90"))
+# 任务自身的请求超时之外再多等的时长（秒），之后不再等待该任务
+_TIMEOUT_GRACE = 5.0
+
+
+class Level1Dispatcher:
+    """一级分析并发分发：有界线程池 + 单条超时 + 按输入顺序合并结果
+
+    analyze 为单条新闻的分析函数（通常是 RealTimeManager.analyze_level1），以 analyze(新闻, timeout=秒) 调用，
+    超时在请求内部生效（客户端请求超时），返回值与 call_deepseek 一致；超时的条目返回 {"error": ...}。
+    提供 analyze_batch / split_batches 时，条数较多的一轮会先按批次请求（同样传入 timeout），
+    批量结果中缺失或格式错误的条目再逐条补做。
+    已在执行的线程无法取消，因此单个任务在超时之后最多再等 _TIMEOUT_GRACE 秒；
+    整轮另有总时限（按并发度排队的批数 × 单任务超时），到期时仍在排队的任务直接取消。
+    """
+
+    def __init__(self, analyze: Callable[[Dict[str, Any]], Dict[str, Any]],
+                 concurrency: int = LEVEL1_CONCURRENCY, item_timeout: float = LEVEL1_ITEM_TIMEOUT,
+                 analyze_batch: Optional[Callable[[List[Dict[str, Any]]], List[Optional[Dict[str, Any]]]]] = None,
+                 split_batches: Optional[Callable[[List[Dict[str, Any]]], List[List[Dict[str, Any]]]]] = None,
+                 batch_min: int = LEVEL1_BATCH_MIN, batch_timeout: float = LEVEL1_BATCH_TIMEOUT):
+        self.analyze = analyze
+        self.analyze_batch = analyze_batch
+        self.split_batches = split_batches
+        self.concurrency = max(1, concurrency)
+        self.item_timeout = item_timeout
+        self.batch_min = batch_min
+        self.batch_timeout = batch_timeout
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="level1")
+
+    def _run(self, fn: Callable, arg: Any, timeout: float, started: Dict[int, float], key: int) -> Any:
+        started[key] = time.monotonic()
+        return fn(arg, timeout=timeout)
+
+    def _run_jobs(self, jobs: List[Tuple[Callable, Any]], timeout: float, on_timeout: Any) -> List[Any]:
+        """并发执行 (函数, 参数) 列表，返回同序结果；超时/异常的任务返回 on_timeout 或 {"error": ...}"""
+        started: Dict[int, float] = {}
+        futures: Dict[Future, int] = {
+            self._executor.submit(self._run, fn, arg, timeout, started, i): i for i, (fn, arg) in enumerate(jobs)
+        }
+        results: List[Any] = [None] * len(jobs)
+        pending = set(futures)
+        deadline = time.monotonic() + math.ceil(len(jobs) / self.concurrency) * timeout + _TIMEOUT_GRACE
+        while pending:
+            done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+            for f in done:
+                try:
+                    results[futures[f]] = f.result()
+                except Exception as e:
+                    results[futures[f]] = {"error": str(e)}
+            # 单任务超时从真正开始执行时计时；整轮总时限到期时排队中的任务一并放弃
+            now = time.monotonic()
+            for f in list(pending):
+                i = futures[f]
+                if now > deadline or (i in started and now - started[i] > timeout + _TIMEOUT_GRACE):
+                    f.cancel()
+                    results[i] = on_timeout
+                    pending.discard(f)
+        return results
+
+    def dispatch(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """并发分析一批新闻，返回与 items 顺序一致的结果列表"""
+        if not items:
+            return []
+        results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+
+        if self.analyze_batch is not None and len(items) >= self.batch_min:
+            groups = self.split_batches(items) if self.split_batches else [items]
+            batch_results = self._run_jobs([(self.analyze_batch, g) for g in groups], self.batch_timeout, None)
+            pos = 0
+            for group, answers in zip(groups, batch_results):
+                if isinstance(answers, list) and len(answers) == len(group):
+                    results[pos:pos + len(group)] = answers
+                pos += len(group)
+
+        # 逐条分析：非批量模式下的全部条目，或批量结果缺失的条目
+        missing = [i for i, r in enumerate(results) if r is None]
+        if missing:
+            timeout_error = {"error": f"一级分析超时（>{self.item_timeout:.0f}秒）"}
+            singles = self._run_jobs([(self.analyze, items[i]) for i in missing], self.item_timeout, timeout_error)
+            for i, r in zip(missing, singles):
+                results[i] = r
+        return results
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
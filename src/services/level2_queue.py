@@ -0,0 +1,159 @@
+import os
+import time
+import heapq
+import itertools
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+LEVEL2_WORKERS = int(os.getenv("LEVEL2_WORKERS", "2"))
+# 新闻发布超过该时长（秒）后，二级分析任务视为过期不再执行
+LEVEL2_MAX_NEWS_AGE = float(os.getenv("LEVEL2_MAX_NEWS_AGE", "3600"))
+LEVEL2_HISTORY_SIZE = 200
+# 新浪 7x24 的 create_time 为北京时间
+NEWS_TIMEZONE = ZoneInfo("Asia/Shanghai")
+
+# 一级分析给出的影响强度 -> 优先级权重
+IMPACT_STRENGTH = {'强': 3, '中': 2, '弱': 1}
+
+
+def parse_news_time(create_time: Any) -> Optional[float]:
+    """解析新浪 7x24 的 create_time（如 2025-10-20 09:31:00，北京时间）为时间戳
+
+    不带时区的时间按北京时间解释，不依赖服务器本地时区；带时区偏移的（如 2025-10-20T01:31:00+00:00）
+    按其自身时区换算。晚于当前时间的（时钟偏差）按当前时间处理，避免新闻永不过期
+    """
+    if not create_time:
+        return None
+    if isinstance(create_time, datetime):
+        parsed = create_time
+    else:
+        try:
+            parsed = datetime.fromisoformat(str(create_time).strip())
+        except ValueError:
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=NEWS_TIMEZONE)
+    return min(parsed.timestamp(), time.time())
+
+
+class Level2Queue:
+    """二级分析（R1）任务队列
+
+    - N 个工作线程并发调用 R1
+    - 按一级分析影响强度、其次按新闻新鲜度排序
+    - 新闻过旧的任务在出队时直接标记为过期
+    - progress() 返回轻量的状态摘要，供界面轮询
+    """
+
+    def __init__(self, handler: Callable[[Dict[str, Any]], None], workers: int = LEVEL2_WORKERS,
+                 max_news_age: float = LEVEL2_MAX_NEWS_AGE):
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.max_news_age = max_news_age
+        self._heap: List = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._jobs: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self.counters = {'done': 0, 'failed': 0, 'expired': 0}
+
+    def start(self):
+        if self._threads:
+            return
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f"level2-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    def submit(self, task: Dict[str, Any], strength: str = '中', news_time: Optional[float] = None) -> int:
+        """加入任务，返回任务 id"""
+        now = time.time()
+        news_time = news_time or now
+        weight = IMPACT_STRENGTH.get(strength, 2)
+        job_id = next(self._seq)
+        job = {
+            'id': job_id,
+            'title': task.get('title', ''),
+            'strength': strength,
+            'state': 'queued',
+            'news_time': news_time,
+            'deadline': news_time + self.max_news_age,
+            'queued_at': now,
+            'started_at': None,
+            'finished_at': None,
+        }
+        with self._cond:
+            self._jobs[job_id] = job
+            while len(self._jobs) > LEVEL2_HISTORY_SIZE:
+                oldest = next(iter(self._jobs))
+                if self._jobs[oldest]['state'] in ('queued', 'running'):
+                    break
+                self._jobs.popitem(last=False)
+            # 强度高的优先，同强度新闻越新越优先
+            heapq.heappush(self._heap, (-weight, -news_time, job_id, task))
+            self._cond.notify()
+        return job_id
+
+    def _next(self) -> Optional[tuple]:
+        with self._cond:
+            while not self._stop.is_set():
+                while self._heap:
+                    _, _, job_id, task = heapq.heappop(self._heap)
+                    job = self._jobs.get(job_id)
+                    if job is None:
+                        continue
+                    if time.time() > job['deadline']:
+                        job['state'] = 'expired'
+                        job['finished_at'] = time.time()
+                        self.counters['expired'] += 1
+                        continue
+                    job['state'] = 'running'
+                    job['started_at'] = time.time()
+                    task['_job_id'] = job_id
+                    return job, task
+                self._cond.wait(timeout=1.0)
+        return None
+
+    def _worker(self):
+        while True:
+            item = self._next()
+            if item is None:
+                return
+            job, task = item
+            try:
+                ok = self.handler(task)
+                state = 'failed' if ok is False else 'done'
+            except Exception:
+                state = 'failed'
+            with self._cond:
+                job['state'] = state
+                job['finished_at'] = time.time()
+                self.counters[state] += 1
+
+    def report(self, job_id: Optional[int], **info):
+        """运行中的任务上报进度（如流式推理已输出的字数），随 progress() 一起返回"""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.setdefault('progress', {}).update(info)
+
+    def progress(self) -> Dict[str, Any]:
+        with self._cond:
+            running = [{'title': j['title'], 'strength': j['strength'], 'started_at': j['started_at'],
+                        'progress': dict(j.get('progress', {}))}
+                       for j in self._jobs.values() if j['state'] == 'running']
+            return {
+                'queued': len(self._heap),
+                'running': running,
+                'workers': self.workers,
+                **self.counters,
+            }
@@ -0,0 +1,240 @@
+import json
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from services.event_log import DEBUG, WARNING, get_event_log
+from services.llm_cache import get_llm_cache
+from services.llm_endpoints import Endpoint, EndpointPool, LatencyTracker
+from services.rate_limiter import (DEEPSEEK_MAX_RETRIES, ModelBudget, backoff_delay, estimate_tokens,
+                                   get_model_budget, parse_retry_after)
+
+
+def parse_content(content: str) -> Dict[str, Any]:
+    """清理 markdown 代码块标记并尝试解析为 JSON"""
+    content_cleaned = content.strip()
+
+    # 移除 ```json 和 ``` 标记
+    if content_cleaned.startswith('```json'):
+        content_cleaned = content_cleaned[7:]
+    elif content_cleaned.startswith('```'):
+        content_cleaned = content_cleaned[3:]
+
+    if content_cleaned.endswith('```'):
+        content_cleaned = content_cleaned[:-3]
+
+    content_cleaned = content_cleaned.strip()
+
+    try:
+        parsed = json.loads(content_cleaned)
+        return {"parsed": parsed, "raw_text": content}
+    except json.JSONDecodeError as e:
+        # JSON解析失败，返回原始文本
+        return {"raw_text": content, "parse_error": str(e)}
+    except Exception as e:
+        return {"raw_text": content, "error": str(e)}
+
+
+def message_content(res: Dict[str, Any]) -> Optional[str]:
+    """非流式响应的正文（choices[0].message.content）"""
+    try:
+        return res.get("choices", [])[0].get("message", {}).get("content")
+    except Exception:
+        return None
+
+
+class LLMCall:
+    """一次 chat/completions 调用的策略，与传输方式无关
+
+    响应缓存、端点顺序与故障转移、请求体、限流记账、重试与退避、对冲触发点和胜者选择都在这里，
+    同步传输（RealTimeManager，requests + 线程）与异步传输（NewsMonitor，aiohttp + 协程）
+    只负责发请求、读响应和等待。
+    """
+
+    def __init__(self, pool: EndpointPool, latency: LatencyTracker, prompt: str, max_tokens: int,
+                 use_reasoning: bool, timeout: Optional[float] = None):
+        self.prompt = prompt
+        self.max_tokens = max_tokens
+        self.use_reasoning = use_reasoning
+        self.latency = latency
+        self.model = pool.endpoints[0].model(use_reasoning)
+        self.model_name = "DeepSeek-R1(推理模型)" if use_reasoning else "DeepSeek-V3"
+        self.timeout = 120 if use_reasoning else 30  # R1需要更长超时
+        # 调用方给出的总时限（秒）：覆盖全部重试、故障转移与流式读取，到期后不再发起或重试请求
+        self.time_limit = timeout
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self.est_tokens = estimate_tokens(prompt) + max_tokens
+        self.endpoints = pool.ranked()
+        self._cache = get_llm_cache()
+        self._cache_key = None
+        if self._cache is not None:
+            self._cache_key = self._cache.make_key(self.model, prompt, {"max_tokens": max_tokens, "temperature": 0.7})
+
+    # ---------- 缓存 ----------
+    def cached(self) -> Optional[Dict[str, Any]]:
+        if self._cache_key is None:
+            return None
+        cached = self._cache.get(self._cache_key)
+        return None if cached is None else {**cached, "cached": True}
+
+    def store(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        if self._cache_key is not None and "parsed" in result:
+            self._cache.put(self._cache_key, self.model, result)
+        return result
+
+    # ---------- 总时限 ----------
+    def remaining(self) -> Optional[float]:
+        return None if self.deadline is None else self.deadline - time.monotonic()
+
+    def expired(self) -> bool:
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def request_timeout(self) -> float:
+        """单次 HTTP 请求的超时：模型默认超时与剩余总时限取小"""
+        remaining = self.remaining()
+        return self.timeout if remaining is None else max(0.1, min(self.timeout, remaining))
+
+    def deadline_error(self) -> Dict[str, Any]:
+        return {"error": f"{self.model_name}请求超时（>{self.time_limit:.0f}秒）"}
+
+    # ---------- 端点顺序 ----------
+    def plan(self, endpoints: Optional[List[Endpoint]] = None) -> List[Tuple[Endpoint, int, Optional[Endpoint]]]:
+        """(端点, 尝试次数, 下一个端点)：前面的端点只试一次，最后一个端点用满重试次数"""
+        endpoints = self.endpoints if endpoints is None else endpoints
+        return [(e, DEEPSEEK_MAX_RETRIES if i == len(endpoints) - 1 else 1,
+                 endpoints[i + 1] if i < len(endpoints) - 1 else None) for i, e in enumerate(endpoints)]
+
+    @staticmethod
+    def no_endpoint() -> Dict[str, Any]:
+        return {"error": "没有可用的模型端点"}
+
+    @staticmethod
+    def failover(endpoint: Endpoint, next_endpoint: Optional[Endpoint], result: Dict[str, Any]):
+        if next_endpoint is not None:
+            get_event_log().emit('endpoint_failover', 'llm', WARNING, outcome='error', endpoint=endpoint.name,
+                                 next=next_endpoint.name, error=result['error'])
+
+    # ---------- 对冲 ----------
+    def hedge_delay(self) -> float:
+        """主请求超过该时长仍未拿到合法 JSON 时补发"""
+        return self.latency.percentile()
+
+    def hedgeable(self) -> bool:
+        """只有一个端点时补发只会向同一端点重复计费，不做对冲"""
+        return len(self.endpoints) > 1
+
+    def hedge(self) -> Optional[List[Endpoint]]:
+        """申请一次补发，返回补发请求的端点顺序（次优端点优先）；本轮补发次数已用完时返回 None"""
+        if not self.latency.try_hedge():
+            return None
+        return self.endpoints[1:] + self.endpoints[:1]
+
+    def hedge_won(self, index: int):
+        if index == 1:
+            self.latency.hedge_wins += 1
+
+    @staticmethod
+    def hedge_fallback(results: Dict[int, Dict[str, Any]]) -> Dict[str, Any]:
+        """两个请求都没有拿到合法 JSON：优先返回非错误的结果"""
+        for idx in (0, 1):
+            if "error" not in results.get(idx, {"error": ""}):
+                return results[idx]
+        return results.get(0) or results.get(1) or LLMCall.no_endpoint()
+
+    # ---------- 单次请求 ----------
+    def request(self, endpoint: Endpoint, stream: bool = False) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
+        """(url, headers, payload)"""
+        headers = {
+            "Authorization": f"Bearer {endpoint.api_key}",
+            "Content-Type": "application/json",
+        }
+        payload = {
+            "model": endpoint.model(self.use_reasoning),
+            "messages": [{"role": "user", "content": self.prompt}],
+            "max_tokens": self.max_tokens,
+            "temperature": 0.7,  # 适当的随机性
+        }
+        if stream:
+            payload["stream"] = True
+        return endpoint.url + "/chat/completions", headers, payload
+
+    def budget(self, endpoint: Endpoint) -> ModelBudget:
+        return get_model_budget(self.use_reasoning, endpoint.name)
+
+    def attempt(self, endpoint: Endpoint, started: float) -> "Attempt":
+        """额度已取得（started 为 budget.acquire 的返回值）后开始一次 HTTP 尝试"""
+        return Attempt(self, endpoint, started)
+
+
+class Attempt:
+    """单次 HTTP 尝试的结果记账：限流/失败/取消标志、实际 token 用量、是否需要重试"""
+
+    def __init__(self, call: LLMCall, endpoint: Endpoint, started: float):
+        self.call = call
+        self.endpoint = endpoint
+        self.started = started
+        self.throttled = self.failed = self.retry = self.cancelled = False
+        self.retry_after: Optional[float] = None
+        self.used_tokens: Optional[int] = None
+        self.error: Optional[str] = None
+
+    def http_status(self, status: int, retry_after: Optional[str]) -> bool:
+        """429 与 5xx 需要退避重试，返回 True"""
+        if status != 429 and status < 500:
+            return False
+        self.throttled = status == 429
+        self.failed = not self.throttled
+        self.retry = True
+        self.retry_after = parse_retry_after(retry_after)
+        self.error = f"{self.call.model_name}返回 HTTP {status}"
+        return True
+
+    def timed_out(self, attempt: int):
+        self.failed = self.retry = True
+        self.error = f"{self.call.model_name}请求超时（已重试{attempt + 1}次）"
+
+    def connection_error(self, e: Exception):
+        self.failed = self.retry = True
+        self.error = str(e)
+
+    def fatal(self, e: Exception) -> Dict[str, Any]:
+        """不可重试的异常"""
+        self.failed = True
+        return {"error": str(e)}
+
+    def usage(self, res: Dict[str, Any]):
+        self.used_tokens = (res.get("usage") or {}).get("total_tokens")
+
+    def result(self, content: Optional[str], res: Dict[str, Any]) -> Dict[str, Any]:
+        """解析正文；V3 返回合法 JSON 时计入对冲延迟样本"""
+        if not content:
+            # 兜底：将整个响应转为字符串
+            return {"raw": res}
+        result = parse_content(content)
+        if not self.call.use_reasoning and "parsed" in result:
+            self.call.latency.add(time.monotonic() - self.started)
+        return result
+
+    def finish(self):
+        """归还额度并记录端点健康度（被取消的尝试不计入）"""
+        self.call.budget(self.endpoint).release(self.started, self.call.est_tokens, self.used_tokens,
+                                                throttled=self.throttled, failed=self.failed,
+                                                cancelled=self.cancelled)
+        if self.cancelled:
+            return
+        elapsed = time.monotonic() - self.started
+        self.endpoint.record(not (self.throttled or self.failed), elapsed)
+        get_event_log().emit('llm_call', 'llm', DEBUG, duration=elapsed,
+                             outcome='throttled' if self.throttled else 'error' if self.failed else 'ok',
+                             model=self.endpoint.model(self.call.use_reasoning), endpoint=self.endpoint.name)
+
+    def retry_delay(self, attempt: int, attempts: int) -> Optional[float]:
+        """需要重试时返回退避时长（服务端给出 Retry-After 时至少等待该时长），否则 None"""
+        if not self.retry or self.cancelled or attempt >= attempts - 1:
+            return None
+        wait_time = backoff_delay(attempt, self.retry_after)
+        remaining = self.call.remaining()
+        if remaining is not None and wait_time >= remaining:
+            return None
+        get_event_log().emit('llm_retry', 'llm', WARNING, outcome='retry', error=self.error,
+                             wait=wait_time, attempt=attempt + 1, retries=attempts - 1)
+        return wait_time
@@ -0,0 +1,179 @@
+import os
+import json
+import time
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+from services.event_log import ERROR, get_event_log
+
+# 额外的 OpenAI 兼容端点（JSON 列表），例如：
+# [{"name": "deepseek", "url": "https://api.deepseek.com/v1", "api_key_env": "DEEPSEEK_OFFICIAL_KEY",
+#   "v3_model": "deepseek-chat", "r1_model": "deepseek-reasoner"}]
+LLM_ENDPOINTS = os.getenv("LLM_ENDPOINTS", "")
+# 连续失败多少次后暂停使用该端点，以及初始冷却时长（秒，之后每次翻倍，最长 10 分钟）
+LLM_ENDPOINT_MAX_FAILURES = int(os.getenv("LLM_ENDPOINT_MAX_FAILURES", "3"))
+LLM_ENDPOINT_COOLDOWN = float(os.getenv("LLM_ENDPOINT_COOLDOWN", "60"))
+# 一级分析对冲：超过近期 p95 延迟仍未返回时向备用端点补发一次（默认关闭：补发按次计费，
+# 且慢的时候正是服务商压力大的时候；只配置了一个端点时即使开启也不补发）
+LEVEL1_HEDGE = os.getenv("LEVEL1_HEDGE", "0") == "1"
+# 每轮抓取最多补发多少次，超出后直接等待主请求
+LEVEL1_HEDGE_MAX_PER_CYCLE = int(os.getenv("LEVEL1_HEDGE_MAX_PER_CYCLE", "3"))
+LEVEL1_HEDGE_DEFAULT_DELAY = float(os.getenv("LEVEL1_HEDGE_DEFAULT_DELAY", "10"))
+LEVEL1_HEDGE_MIN_DELAY = float(os.getenv("LEVEL1_HEDGE_MIN_DELAY", "2"))
+
+_EWMA_ALPHA = 0.2
+
+
+class Endpoint:
+    """一个 OpenAI 兼容的 chat/completions 端点及其健康度"""
+
+    def __init__(self, name: str, url: str, api_key: Optional[str], v3_model: str, r1_model: str):
+        self.name = name
+        self.url = url.rstrip('/')
+        self.api_key = api_key
+        self.models = {False: v3_model, True: r1_model}
+        self.latency: Optional[float] = None  # 成功请求延迟的 EWMA
+        self.error_rate = 0.0                 # 失败率的 EWMA
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self.requests = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def model(self, use_reasoning: bool) -> str:
+        return self.models[use_reasoning]
+
+    def record(self, ok: bool, latency: Optional[float] = None):
+        with self._lock:
+            self.requests += 1
+            self.error_rate += _EWMA_ALPHA * ((0.0 if ok else 1.0) - self.error_rate)
+            if ok:
+                self.consecutive_failures = 0
+                if latency is not None:
+                    self.latency = latency if self.latency is None else \
+                        self.latency + _EWMA_ALPHA * (latency - self.latency)
+                return
+            self.failures += 1
+            self.consecutive_failures += 1
+            over = self.consecutive_failures - LLM_ENDPOINT_MAX_FAILURES
+            if over >= 0:
+                self.cooldown_until = time.monotonic() + min(600.0, LLM_ENDPOINT_COOLDOWN * (2 ** over))
+
+    def available(self) -> bool:
+        return time.monotonic() >= self.cooldown_until
+
+    def score(self) -> float:
+        """越小越好：平均延迟按失败率加权"""
+        return (self.latency or LEVEL1_HEDGE_DEFAULT_DELAY) * (1 + 4 * self.error_rate)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'latency': round(self.latency, 2) if self.latency is not None else None,
+            'error_rate': round(self.error_rate, 3),
+            'requests': self.requests,
+            'failures': self.failures,
+            'available': self.available(),
+        }
+
+
+class EndpointPool:
+    """按健康度排序的端点列表：冷却中的端点排在最后，仅作兜底"""
+
+    def __init__(self, endpoints: List[Endpoint]):
+        self.endpoints = endpoints
+
+    @classmethod
+    def from_env(cls, primary: Endpoint) -> "EndpointPool":
+        endpoints = [primary]
+        try:
+            extra = json.loads(LLM_ENDPOINTS) if LLM_ENDPOINTS.strip() else []
+        except ValueError as e:
+            get_event_log().emit('endpoints_config_error', 'llm', ERROR, outcome='error', error=str(e))
+            extra = []
+        for i, cfg in enumerate(extra):
+            if not isinstance(cfg, dict) or not cfg.get('url'):
+                continue
+            endpoints.append(Endpoint(
+                name=cfg.get('name') or f"endpoint-{i + 1}",
+                url=cfg['url'],
+                api_key=cfg.get('api_key') or os.getenv(cfg.get('api_key_env', '')),
+                v3_model=cfg.get('v3_model', primary.models[False]),
+                r1_model=cfg.get('r1_model', primary.models[True]),
+            ))
+        return cls(endpoints)
+
+    def ranked(self) -> List[Endpoint]:
+        return sorted(self.endpoints, key=lambda e: (not e.available(), e.score()))
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [e.stats() for e in self.endpoints]
+
+
+class LatencyTracker:
+    """最近 N 次成功请求的延迟，用于计算对冲触发点（p95）"""
+
+    def __init__(self, size: int = 200, min_samples: int = 20,
+                 default: float = LEVEL1_HEDGE_DEFAULT_DELAY, floor: float = LEVEL1_HEDGE_MIN_DELAY,
+                 max_hedges_per_cycle: int = LEVEL1_HEDGE_MAX_PER_CYCLE):
+        self._samples: Deque[float] = deque(maxlen=size)
+        self.min_samples = min_samples
+        self.default = default
+        self.floor = floor
+        self.max_hedges_per_cycle = max_hedges_per_cycle
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.hedge_skipped = 0
+        self._cycle_hedges = 0
+        self._lock = threading.Lock()
+
+    def add(self, latency: float):
+        with self._lock:
+            self._samples.append(latency)
+
+    def percentile(self, q: float = 0.95) -> float:
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < self.min_samples:
+            return self.default
+        return max(self.floor, samples[min(len(samples) - 1, int(q * len(samples)))])
+
+    def start_cycle(self):
+        """每轮抓取开始时调用，重置本轮补发次数"""
+        with self._lock:
+            self._cycle_hedges = 0
+
+    def try_hedge(self) -> bool:
+        """申请一次补发；本轮次数已用完时返回 False"""
+        with self._lock:
+            if self._cycle_hedges >= self.max_hedges_per_cycle:
+                self.hedge_skipped += 1
+                return False
+            self._cycle_hedges += 1
+            self.hedged += 1
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {'p95': round(self.percentile(), 2), 'hedged': self.hedged, 'hedge_wins': self.hedge_wins,
+                'hedge_skipped': self.hedge_skipped}
+
+
+class EventRouter:
+    """对冲时多个请求同时流式输出，只转发最先输出内容的那个请求的事件"""
+
+    def __init__(self, on_event: Optional[Callable[[str, Any], None]]):
+        self.on_event = on_event
+        self.owner: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def for_attempt(self, attempt: int) -> Optional[Callable[[str, Any], None]]:
+        if self.on_event is None:
+            return None
+
+        def forward(kind: str, data: Any):
+            with self._lock:
+                if self.owner is None:
+                    self.owner = attempt
+            if self.owner == attempt:
+                self.on_event(kind, data)
+        return forward
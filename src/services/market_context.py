@@ -0,0 +1,77 @@
+import os
+import math
+from typing import Any, Dict, List, Optional, Tuple
+from services.quote_store import normalize_code
+from services.rate_limiter import estimate_tokens
+
+# 二级分析提示词中行情数据块的 token 上限
+LEVEL2_CONTEXT_TOKENS = int(os.getenv("LEVEL2_CONTEXT_TOKENS", "600"))
+
+# (行情列名, 表头, 缩放系数, 小数位)；超出预算时按 _DROP_ORDER 依次删列
+CONTEXT_FIELDS: List[Tuple[str, str, float, int]] = [
+    ('最新价', '价', 1, 2),
+    ('涨跌幅', '涨幅%', 1, 2),
+    ('最高', '高', 1, 2),
+    ('最低', '低', 1, 2),
+    ('换手率', '换手%', 1, 2),
+    ('量比', '量比', 1, 2),
+    ('振幅', '振幅%', 1, 1),
+    ('成交额', '成交亿', 1e-8, 2),
+    ('流通市值', '流通亿', 1e-8, 0),
+    ('市盈率-动态', 'PE', 1, 1),
+    ('60日涨跌幅', '60日%', 1, 1),
+    ('5分钟涨跌', '5分%', 1, 2),
+]
+_DROP_ORDER = ['5分钟涨跌', '市盈率-动态', '60日涨跌幅', '流通市值', '振幅', '量比', '最高', '最低']
+# 候选股自带字段（StockScreener 的输出）与行情列名的对应
+_CANDIDATE_KEYS = {'最新价': 'price', '名称': 'name'}
+
+
+def _fmt(value: Any, scale: float, digits: int) -> str:
+    try:
+        v = float(value) * scale
+    except (TypeError, ValueError):
+        return '-'
+    if math.isnan(v) or math.isinf(v):
+        return '-'
+    return f"{v:.{digits}f}" if digits else str(int(round(v)))
+
+
+def _table(rows: List[Dict[str, Any]], fields: List[Tuple[str, str, float, int]]) -> str:
+    lines = [','.join(['代码', '名称'] + [header for _, header, _, _ in fields])]
+    for row in rows:
+        name = str(row.get('名称') or '').replace(',', ' ')
+        cells = [str(row.get('代码') or ''), name] + [_fmt(row.get(col), scale, digits)
+                                                       for col, _, scale, digits in fields]
+        lines.append(','.join(cells))
+    return '\n'.join(lines)
+
+
+def merge_candidates(candidates: List[Dict[str, Any]], quotes: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """候选股与行情表中的完整行合并（行情缺失时保留候选股自带的名称、价格）"""
+    rows = []
+    for c in candidates:
+        code = normalize_code(c.get('code') or c.get('代码') or '')
+        row = dict(quotes.get(code) or {})
+        row['代码'] = code
+        for col, key in _CANDIDATE_KEYS.items():
+            if row.get(col) is None and c.get(key) is not None:
+                row[col] = c[key]
+        rows.append(row)
+    return rows
+
+
+def encode_market_context(rows: List[Dict[str, Any]], token_budget: Optional[int] = None) -> str:
+    """把行情行编码为紧凑的 CSV 文本：只保留决策相关列、数值取整，超出 token 预算时先删次要列再删末尾的行"""
+    budget = token_budget if token_budget is not None else LEVEL2_CONTEXT_TOKENS
+    fields = [f for f in CONTEXT_FIELDS if any(r.get(f[0]) is not None for r in rows)]
+    text = _table(rows, fields)
+    drop = [c for c in _DROP_ORDER if any(f[0] == c for f in fields)]
+    while estimate_tokens(text) > budget and drop:
+        col = drop.pop(0)
+        fields = [f for f in fields if f[0] != col]
+        text = _table(rows, fields)
+    while estimate_tokens(text) > budget and len(rows) > 1:
+        rows = rows[:-1]
+        text = _table(rows, fields)
+    return text
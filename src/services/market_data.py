@@ -0,0 +1,93 @@
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional
+from services.market_snapshot import get_snapshot_cache
+from services.quote_store import get_quote_store
+from services.sector_index import get_sector_index
+
+# AkShare 调用专用线程池大小（不占用事件循环默认线程池）
+MARKET_DATA_WORKERS = int(os.getenv("MARKET_DATA_WORKERS", "4"))
+
+
+class AsyncMarketData:
+    """异步行情门面：AkShare 等阻塞调用放到专用的有界线程池执行，事件循环只 await 结果
+
+    相同 key 的并发请求合并为一次调用（在途期间后来者直接等待同一个结果），
+    行情本身仍由进程级快照缓存 / 行情表 / 板块索引提供，与线程版流水线共享。
+    同一实例只应在一个事件循环中使用。
+    """
+
+    def __init__(self, max_workers: int = MARKET_DATA_WORKERS):
+        self.max_workers = max(1, max_workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="akshare")
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def run(self, fn: Callable[..., Any], *args, key: Optional[Hashable] = None) -> Any:
+        """在线程池中执行 fn(*args)；传入 key 时合并相同 key 的在途调用"""
+        if key is not None:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return await asyncio.shield(future)
+        self.calls += 1
+        future = asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        if key is not None:
+            self._inflight[key] = future
+            future.add_done_callback(lambda f: self._forget(key, f))
+        # shield：某个调用方被取消时不影响其他等待同一结果的调用方
+        return await asyncio.shield(future)
+
+    def _forget(self, key: Hashable, future: asyncio.Future):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+
+    async def get_snapshot(self):
+        """全市场实时行情快照（DataFrame）"""
+        return await self.run(get_snapshot_cache().get, key='snapshot')
+
+    async def get_quote(self, code: Any) -> Dict[str, Any]:
+        """单只股票的实时行情，未找到返回空 dict"""
+        store = await self.run(get_quote_store, key='quote_store')
+        return store.get(code)
+
+    async def get_quotes(self, codes: Iterable[Any]) -> Dict[str, Dict[str, Any]]:
+        """批量查询，返回 {代码: 行情}"""
+        store = await self.run(get_quote_store, key='quote_store')
+        return store.get_many(codes)
+
+    async def get_board(self, sector: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """板块（行业/概念，名称模糊匹配）成分股的实时行情"""
+        return await self.run(self._board_rows, sector, limit, key=('board', sector, limit))
+
+    @staticmethod
+    def _board_rows(sector: str, limit: Optional[int]) -> List[Dict[str, Any]]:
+        codes = sorted(get_sector_index().codes_for([sector]))
+        store = get_quote_store()
+        positions = store.positions(codes[:limit] if limit else codes)
+        return store.rows(positions)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'workers': self.max_workers,
+            'calls': self.calls,
+            'coalesced': self.coalesced,
+            'in_flight': len(self._inflight),
+            'snapshot': get_snapshot_cache().stats(),
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_market_data: Optional[AsyncMarketData] = None
+
+
+def get_market_data() -> AsyncMarketData:
+    """返回进程内共享的异步行情门面"""
+    global _market_data
+    if _market_data is None:
+        _market_data = AsyncMarketData()
+    return _market_data
@@ -0,0 +1,117 @@
+import os
+import time
+import threading
+from typing import Any, Callable, Dict, Optional
+import akshare as ak
+
+# 全市场快照在 TTL 内直接复用；过期但未超过 MAX_STALE 时先返回旧数据再后台刷新
+SNAPSHOT_TTL = float(os.getenv("SNAPSHOT_TTL", "15"))
+SNAPSHOT_MAX_STALE = float(os.getenv("SNAPSHOT_MAX_STALE", "300"))
+SNAPSHOT_FETCH_TIMEOUT = float(os.getenv("SNAPSHOT_FETCH_TIMEOUT", "30"))
+
+
+class SnapshotCache:
+    """A股全市场实时行情快照缓存（进程级共享）
+
+    - TTL 内：直接返回缓存
+    - 过期但在 max_stale 内：立即返回旧快照，并在后台刷新（stale-while-revalidate）
+    - 无缓存或过旧：同步等待刷新，并发调用方共享同一次在途请求（single-flight）
+    """
+
+    def __init__(self, fetcher: Optional[Callable[[], Any]] = None, ttl: float = SNAPSHOT_TTL,
+                 max_stale: float = SNAPSHOT_MAX_STALE, fetch_timeout: float = SNAPSHOT_FETCH_TIMEOUT):
+        self._fetcher = fetcher or ak.stock_zh_a_spot_em
+        self.ttl = ttl
+        self.max_stale = max(max_stale, ttl)
+        self.fetch_timeout = fetch_timeout
+        self._lock = threading.Lock()
+        self._data: Any = None
+        self._fetched_at = 0.0
+        self._inflight: Optional[threading.Event] = None
+        self._last_error: Optional[Exception] = None
+        self.version = 0  # 每次成功刷新递增，供下游判断快照是否变化
+        self.hits = 0
+        self.stale_hits = 0
+        self.fetches = 0
+
+    def get(self) -> Any:
+        """获取快照；上游失败且没有任何可用缓存时抛出最近一次异常"""
+        with self._lock:
+            data = self._data
+            age = time.monotonic() - self._fetched_at
+            if data is not None and age < self.ttl:
+                self.hits += 1
+                return data
+            event, leader = self._begin_refresh_locked()
+            if data is not None and age < self.max_stale:
+                self.stale_hits += 1
+                if leader:
+                    threading.Thread(target=self._refresh, args=(event,), daemon=True).start()
+                return data
+
+        if leader:
+            self._refresh(event)
+        else:
+            event.wait(self.fetch_timeout)
+
+        with self._lock:
+            if self._data is not None:
+                return self._data
+            raise self._last_error or TimeoutError("行情快照获取超时")
+
+    def peek(self) -> Any:
+        """只读当前缓存，不触发任何网络请求"""
+        return self._data
+
+    def invalidate(self):
+        with self._lock:
+            self._fetched_at = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "version": self.version,
+                "age": time.monotonic() - self._fetched_at if self._data is not None else None,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "fetches": self.fetches,
+                "refreshing": self._inflight is not None,
+                "last_error": str(self._last_error) if self._last_error else None,
+            }
+
+    def _begin_refresh_locked(self):
+        if self._inflight is not None:
+            return self._inflight, False
+        self._inflight = threading.Event()
+        return self._inflight, True
+
+    def _refresh(self, event: threading.Event):
+        try:
+            data = self._fetcher()
+            with self._lock:
+                self._data = data
+                self._fetched_at = time.monotonic()
+                self._last_error = None
+                self.version += 1
+                self.fetches += 1
+        except Exception as e:
+            with self._lock:
+                self._last_error = e
+        finally:
+            with self._lock:
+                self._inflight = None
+            event.set()
+
+
+_snapshot_cache: Optional[SnapshotCache] = None
+_snapshot_cache_lock = threading.Lock()
+
+
+def get_snapshot_cache() -> SnapshotCache:
+    """返回进程内唯一的全市场快照缓存"""
+    global _snapshot_cache
+    if _snapshot_cache is None:
+        with _snapshot_cache_lock:
+            if _snapshot_cache is None:
+                _snapshot_cache = SnapshotCache()
+    return _snapshot_cache
@@ -0,0 +1,112 @@
+import os
+import re
+import time
+import hashlib
+import threading
+from collections import Counter, deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+DEDUP_WINDOW = float(os.getenv("DEDUP_WINDOW", "1800"))
+DEDUP_NGRAM = int(os.getenv("DEDUP_NGRAM", "3"))
+DEDUP_MAX_DISTANCE = int(os.getenv("DEDUP_MAX_DISTANCE", "18"))
+DEDUP_MIN_JACCARD = float(os.getenv("DEDUP_MIN_JACCARD", "0.6"))
+
+# 去掉标点、空白和新浪快讯常见的来源前缀，只保留正文字符
+_NOISE = re.compile(r'[\s\W_]+', re.UNICODE)
+_PREFIX = re.compile(r'^【[^】]{0,30}】')
+
+
+def _shingles(text: str, n: int) -> Counter:
+    text = _NOISE.sub('', _PREFIX.sub('', text or ''))
+    if len(text) <= n:
+        return Counter([text]) if text else Counter()
+    return Counter(text[i:i + n] for i in range(len(text) - n + 1))
+
+
+def simhash(features: Counter) -> int:
+    """64 位 SimHash：按 n-gram 频次加权"""
+    weights = [0] * 64
+    for gram, count in features.items():
+        h = int.from_bytes(hashlib.blake2b(gram.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(64):
+            weights[bit] += count if (h >> bit) & 1 else -count
+    value = 0
+    for bit, w in enumerate(weights):
+        if w > 0:
+            value |= 1 << bit
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+class NearDuplicateDetector:
+    """快讯近重复检测（字符 n-gram SimHash + Jaccard 复核）
+
+    时间窗口内与已有簇代表足够相似的新闻判为重复，返回代表新闻的 id；
+    否则该新闻成为新簇的代表。窗口内条目有限，直接线性比较汉明距离即可。
+
+    新代表先处于待定状态：它的重复条目暂存在检测器中，直到调用方
+    confirm()（代表拿到一级分析结论，返回暂存的重复条目以便挂到结果下）或
+    release()（代表被预筛跳过或分析失败，撤销代表并交回暂存条目，由调用方重新判重、分析）。
+    """
+
+    def __init__(self, window: float = DEDUP_WINDOW, ngram: int = DEDUP_NGRAM,
+                 max_distance: int = DEDUP_MAX_DISTANCE, min_jaccard: float = DEDUP_MIN_JACCARD):
+        self.window = window
+        self.ngram = ngram
+        self.max_distance = max_distance
+        self.min_jaccard = min_jaccard
+        self._lock = threading.Lock()
+        # (加入时间, 代表新闻id, simhash, n-gram集合)
+        self._reps: Deque[Tuple[float, str, int, Set[str]]] = deque()
+        # 待定代表 id -> 暂存的重复条目
+        self._waiting: Dict[str, List[Dict[str, Any]]] = {}
+        self.duplicates = 0
+
+    def check(self, item: Dict[str, Any], now: Optional[float] = None) -> Optional[str]:
+        """返回重复簇代表的新闻 id；不重复时登记为新的待定代表并返回 None
+
+        代表仍待定时，重复条目由检测器暂存（见 confirm / release）。
+        """
+        now = now if now is not None else time.monotonic()
+        text = item.get('content') or item.get('title') or ''
+        grams = _shingles(text, self.ngram)
+        if not grams:
+            return None
+        fingerprint = simhash(grams)
+        gram_set = set(grams)
+        with self._lock:
+            while self._reps and now - self._reps[0][0] > self.window:
+                self._reps.popleft()
+            for _, rep_id, rep_hash, rep_set in reversed(self._reps):
+                if hamming(fingerprint, rep_hash) > self.max_distance:
+                    continue
+                jaccard = len(gram_set & rep_set) / len(gram_set | rep_set)
+                if jaccard >= self.min_jaccard:
+                    self.duplicates += 1
+                    if rep_id in self._waiting:
+                        self._waiting[rep_id].append(item)
+                    return rep_id
+            nid = str(item.get('id', ''))
+            self._reps.append((now, nid, fingerprint, gram_set))
+            self._waiting[nid] = []
+        return None
+
+    def is_pending(self, rep_id: str) -> bool:
+        with self._lock:
+            return rep_id in self._waiting
+
+    def confirm(self, rep_id: str) -> List[Dict[str, Any]]:
+        """代表已拿到一级分析结论：此后的重复条目直接跳过，返回此前暂存的重复条目"""
+        with self._lock:
+            return self._waiting.pop(rep_id, None) or []
+
+    def release(self, rep_id: str) -> List[Dict[str, Any]]:
+        """代表未能完成分析：撤销该代表，返回暂存的重复条目（需重新判重并分析）"""
+        with self._lock:
+            self._reps = deque(r for r in self._reps if r[1] != rep_id)
+            waiting = self._waiting.pop(rep_id, None) or []
+            self.duplicates -= len(waiting)
+            return waiting
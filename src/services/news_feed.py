@@ -0,0 +1,103 @@
+import os
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+FEED_PAGE_SIZE = int(os.getenv("FEED_PAGE_SIZE", "20"))
+FEED_MAX_BACKFILL_PAGES = int(os.getenv("FEED_MAX_BACKFILL_PAGES", "5"))
+FEED_SEEN_CAPACITY = int(os.getenv("FEED_SEEN_CAPACITY", "5000"))
+FEED_RECENT_SIZE = int(os.getenv("FEED_RECENT_SIZE", "50"))
+
+
+def _id_value(item: Dict[str, Any]) -> int:
+    try:
+        return int(item.get('id'))
+    except (TypeError, ValueError):
+        return -1
+
+
+class IncrementalFeedReader:
+    """7x24 新闻增量读取器
+
+    记录已处理到的最大新闻 id（高水位），每次只取比高水位更新的条目；
+    若第一页全部是新条目（说明停机或突发期间超过一页），自动向后翻页补齐缺口。
+    另维护一个有界的已见 id 集合，防止重复处理。
+    """
+
+    def __init__(self, fetch_page: Callable[[int, int], List[Dict[str, Any]]], page_size: int = FEED_PAGE_SIZE,
+                 max_backfill_pages: int = FEED_MAX_BACKFILL_PAGES, seen_capacity: int = FEED_SEEN_CAPACITY):
+        self._fetch_page = fetch_page
+        self.page_size = page_size
+        self.max_backfill_pages = max_backfill_pages
+        self.seen_capacity = seen_capacity
+        self.high_water: Optional[int] = None
+        self.last_fetch_ok = True
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        self._recent: Deque[Dict[str, Any]] = deque(maxlen=FEED_RECENT_SIZE)
+        self._lock = threading.Lock()
+
+    def _mark_seen(self, nid: str):
+        self._seen[nid] = None
+        self._seen.move_to_end(nid)
+        while len(self._seen) > self.seen_capacity:
+            self._seen.popitem(last=False)
+
+    def poll(self) -> List[Dict[str, Any]]:
+        """返回自上次调用以来的新新闻（按时间从旧到新）"""
+        with self._lock:
+            fresh: List[Dict[str, Any]] = []
+            for page in range(1, self._pages_to_scan() + 1):
+                items = self._fetch_page(page, self.page_size)
+                if not self._scan_page(page, items, fresh):
+                    break
+            return self._commit(fresh)
+
+    async def poll_async(self, fetch_page: Callable[[int, int], Awaitable[List[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+        """poll() 的协程版本，fetch_page 为异步的分页抓取函数（同一读取器只应在一个事件循环中使用）"""
+        fresh: List[Dict[str, Any]] = []
+        for page in range(1, self._pages_to_scan() + 1):
+            items = await fetch_page(page, self.page_size)
+            if not self._scan_page(page, items, fresh):
+                break
+        with self._lock:
+            return self._commit(fresh)
+
+    def _pages_to_scan(self) -> int:
+        return 1 if self.high_water is None else self.max_backfill_pages
+
+    def _scan_page(self, page: int, items: List[Dict[str, Any]], fresh: List[Dict[str, Any]]) -> bool:
+        """把一页中的新条目加入 fresh，返回是否需要继续翻下一页"""
+        if page == 1:
+            self.last_fetch_ok = bool(items)
+        if not items:
+            return False
+        reached_known = False
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            nid = str(item.get('id', ''))
+            value = _id_value(item)
+            if (self.high_water is not None and 0 <= value <= self.high_water) or nid in self._seen:
+                reached_known = True
+                continue
+            fresh.append(item)
+        return not (reached_known or len(items) < self.page_size)
+
+    def _commit(self, fresh: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # 去重（翻页期间新闻流可能整体后移，同一条可能出现两次）并按时间正序返回
+        unique: Dict[str, Dict[str, Any]] = {}
+        for item in fresh:
+            unique.setdefault(str(item.get('id', '')), item)
+        result = sorted(unique.values(), key=lambda x: (_id_value(x), str(x.get('create_time', ''))))
+
+        for item in result:
+            self._mark_seen(str(item.get('id', '')))
+            self._recent.appendleft(item)
+            value = _id_value(item)
+            if value >= 0 and (self.high_water is None or value > self.high_water):
+                self.high_water = value
+        return result
+
+    def recent(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """最近读取到的新闻（从新到旧），供界面展示，不触发网络请求"""
+        return list(self._recent)[:limit]
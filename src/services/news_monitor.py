@@ -1,81 +1,375 @@
-import aiohttp
-import json
+import os
+import time
+import asyncio
+import traceback
 from datetime import datetime
-from typing import List, Dict
-import akshare as ak
+from typing import Any, Dict, List, Optional, Tuple
+import aiohttp
 from models.schemas import StockAnalysis
+from services.analysis_repository import AnalysisRepository, get_analysis_repository
+from services.event_log import DEBUG, ERROR, INFO, WARNING, get_event_log
+from services.http_client import get_async_session
+from services.llm_client import LLMCall, message_content
+from services.llm_endpoints import LEVEL1_HEDGE, Endpoint
+from services.news_dedup import NearDuplicateDetector
+from services.news_feed import IncrementalFeedReader
+from services.market_data import get_market_data
+from services.realtime_manager import (SINA_7X24_API, SINA_HEADERS, RealTimeManager, parse_sina_feed,
+                                       sina_feed_params)
+from services.relevance_filter import PREFILTER_ENABLED, RelevanceFilter
+
+# 在 FastAPI 进程内运行新闻监控。默认关闭：线程版流水线默认内嵌在 Streamlit 中运行（PIPELINE_MODE=embedded），
+# 两者同时运行会重复分析同一条新闻；只有在没有其他流水线（PIPELINE_MODE=external 且未运行 worker）时才设为 1
+NEWS_MONITOR_ENABLED = os.getenv("NEWS_MONITOR_ENABLED", "0") == "1"
+NEWS_MONITOR_INTERVAL = float(os.getenv("NEWS_MONITOR_INTERVAL", "10"))
+# 各阶段的协程数（实际在途的模型请求数仍受 rate_limiter 的自适应并发限制）
+NEWS_MONITOR_LEVEL1_WORKERS = int(os.getenv("NEWS_MONITOR_LEVEL1_WORKERS", "32"))
+NEWS_MONITOR_LEVEL2_WORKERS = int(os.getenv("NEWS_MONITOR_LEVEL2_WORKERS", "4"))
+# 阶段之间的队列长度，队列满时上游等待（背压）
+NEWS_MONITOR_LEVEL1_QUEUE = int(os.getenv("NEWS_MONITOR_LEVEL1_QUEUE", "200"))
+NEWS_MONITOR_LEVEL2_QUEUE = int(os.getenv("NEWS_MONITOR_LEVEL2_QUEUE", "50"))
+
 
 class NewsMonitor:
-    def __init__(self):
-        self.last_news_id = None
-        self.api_url = "http://zhibo.sina.com.cn/api/zhibo/feed"
-        self.deepseek_url = "https://api.siliconflow.cn/v1/chat/completions"
-        self.deepseek_key = "sk-bzguagzymvuubepardjpxvqmbljfhxpmgceddsrqzjnouezw"
-
-    async def get_latest_news(self) -> List[Dict]:
-        params = {
-            "page": 1,
-            "page_size": 20,
-            "zhibo_id": 152
-        }
-        async with aiohttp.ClientSession() as session:
-            async with session.get(self.api_url, params=params) as response:
-                data = await response.json()
-                return data.get("result", {}).get("data", [])
-
-    async def analyze_news(self, title: str, content: str) -> StockAnalysis:
-        # 构建分析提示
-        prompt = f"""分析以下新闻对A股市场的影响：
-        标题：{title}
-        内容：{content}
-        
-        请判断：
-        1. 这个新闻是否会对特定板块产生显著影响？
-        2. 如果会，影响哪些板块？
-        3. 推荐5支最具投资价值的相关股票
-        4. 对每支股票的具体分析和操作建议"""
-
-        headers = {
-            "Authorization": f"Bearer {self.deepseek_key}",
-            "Content-Type": "application/json"
-        }
-        payload = {
-            "model": "deepseek-chat",
-            "messages": [{"role": "user", "content": prompt}]
-        }
+    """asyncio 版新闻监控引擎（运行在 FastAPI 的事件循环中）
 
-        async with aiohttp.ClientSession() as session:
-            async with session.post(self.deepseek_url, headers=headers, json=payload) as response:
-                result = await response.json()
-                analysis = result["choices"][0]["message"]["content"]
-                
-                # 处理分析结果
-                # TODO: 解析AI返回的文本，提取结构化信息
+    抓取 -> 一级分析 -> 候选股筛选 + 二级分析 三个阶段由有界 asyncio.Queue 串联，
+    各阶段由多个协程并发消费，所有 HTTP 请求共用同一个 aiohttp 会话；
+    提示词、端点、限流额度、响应缓存与线程版流水线（AnalysisPipeline）共享，结果写入分析结果表。
+    """
 
-    async def get_stock_data(self, stock_code: str):
-        """获取股票实时数据"""
+    def __init__(self, rt: Optional[RealTimeManager] = None, repository: Optional[AnalysisRepository] = None,
+                 interval: float = NEWS_MONITOR_INTERVAL, level1_workers: int = NEWS_MONITOR_LEVEL1_WORKERS,
+                 level2_workers: int = NEWS_MONITOR_LEVEL2_WORKERS):
+        self.rt = rt or RealTimeManager()
+        self.repository = repository if repository is not None else get_analysis_repository()
+        self.events = get_event_log()
+        self.interval = interval
+        self.level1_workers = level1_workers
+        self.level2_workers = level2_workers
+        self.feed = IncrementalFeedReader(self.rt.fetch_latest_news)
+        self.dedup = NearDuplicateDetector()
+        self._recheck: List[Dict[str, Any]] = []  # 簇代表未能完成分析而交回的重复条目，下一轮重新判重
+        self.prefilter = RelevanceFilter() if PREFILTER_ENABLED else None
+        self.level1_queue: Optional["asyncio.Queue[Dict[str, Any]]"] = None
+        self.level2_queue: Optional["asyncio.Queue[Tuple[Dict[str, Any], StockAnalysis, List[Dict[str, Any]]]]"] = None
+        self._tasks: List[asyncio.Task] = []
+        self.last_news_id: Optional[str] = None
+
+    # ---------- 生命周期 ----------
+    def start(self):
+        """在当前事件循环中启动抓取协程和各阶段的工作协程"""
+        if self._tasks:
+            return
+        self.level1_queue = asyncio.Queue(maxsize=NEWS_MONITOR_LEVEL1_QUEUE)
+        self.level2_queue = asyncio.Queue(maxsize=NEWS_MONITOR_LEVEL2_QUEUE)
+        self._tasks.append(asyncio.create_task(self.start_monitoring()))
+        for _ in range(self.level1_workers):
+            self._tasks.append(asyncio.create_task(self._level1_worker()))
+        for _ in range(self.level2_workers):
+            self._tasks.append(asyncio.create_task(self._level2_worker()))
+        self.events.emit('pipeline_started', 'system')
+
+    async def stop(self):
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def is_running(self) -> bool:
+        return any(not t.done() for t in self._tasks)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'running': self.is_running(),
+            'level1_queued': self.level1_queue.qsize() if self.level1_queue is not None else 0,
+            'level2_queued': self.level2_queue.qsize() if self.level2_queue is not None else 0,
+            'duplicates': self.dedup.duplicates,
+            'prefiltered': self.prefilter.skipped if self.prefilter else 0,
+            'last_news_id': self.last_news_id,
+        }
+
+    # ---------- 抓取 ----------
+    async def get_latest_news(self, page: int = 1, page_size: int = 20) -> List[Dict[str, Any]]:
+        """异步抓取新浪财经7x24的一页快讯"""
         try:
-            stock_data = ak.stock_zh_a_spot_em()
-            return stock_data[stock_data['代码'] == stock_code].to_dict('records')[0]
+            session = await get_async_session()
+            async with session.get(SINA_7X24_API, params=sina_feed_params(page, page_size), headers=SINA_HEADERS,
+                                   timeout=aiohttp.ClientTimeout(total=10)) as response:
+                response.raise_for_status()
+                return parse_sina_feed(await response.json(content_type=None))
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
-            print(f"获取股票数据失败: {str(e)}")
-            return None
+            self.events.emit('fetch_error', 'fetch', ERROR, outcome='error', error=str(e))
+            return []
 
     async def start_monitoring(self):
-        """开始监控新闻"""
+        """抓取阶段：定时增量读取新闻，去重、预筛后放入一级分析队列"""
+        while True:
+            started = time.monotonic()
+            self.rt.level1_latency.start_cycle()
+            try:
+                news_items = await self.feed.poll_async(self.get_latest_news)
+                fetch_duration = time.monotonic() - started
+                if not self.feed.last_fetch_ok:
+                    self.events.emit('fetch_failed', 'fetch', ERROR, duration=fetch_duration, outcome='error')
+                else:
+                    unique = relevant = 0
+                    recheck, self._recheck = self._recheck, []
+                    for item in recheck + news_items:
+                        rep_id = self.dedup.check(item)
+                        if rep_id is not None:
+                            self.events.emit('duplicate', 'dedup', news_id=item.get('id'), outcome='skipped',
+                                             rep_id=rep_id)
+                            continue
+                        unique += 1
+                        if self.prefilter is not None:
+                            ok, score = self.prefilter.check(item)
+                            if not ok:
+                                self._recheck.extend(self.dedup.release(str(item.get('id', ''))))
+                                self.events.emit('prefiltered', 'prefilter', DEBUG, news_id=item.get('id'),
+                                                 outcome='skipped', score=score)
+                                continue
+                        relevant += 1
+                        await self.level1_queue.put(item)
+                        self.last_news_id = str(item.get('id', ''))
+                    self.events.emit('fetched', 'fetch', INFO if relevant else DEBUG, duration=fetch_duration,
+                                     outcome='ok', new=len(news_items), unique=unique, relevant=relevant,
+                                     backlog=self.level1_queue.qsize())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.events.emit('cycle_error', 'system', ERROR, outcome='error', error=str(e),
+                                 traceback=traceback.format_exc())
+            await asyncio.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+    # ---------- 一级分析 ----------
+    async def analyze_news(self, title: str, content: str, news_id: Optional[str] = None) -> Optional[StockAnalysis]:
+        """一级分析（V3 快速模型），返回结构化结果；调用失败或返回非 JSON 时返回 None"""
+        res = await self.call_deepseek(self.rt.level1_prompt(title, content or title), max_tokens=500,
+                                       hedge=LEVEL1_HEDGE)
+        if 'error' in res:
+            self.events.emit('level1_error', 'level1', ERROR, news_id=news_id, outcome='error', error=res['error'])
+            return None
+        parsed = res.get('parsed')
+        if not isinstance(parsed, dict):
+            self.events.emit('level1_non_json', 'level1', WARNING, news_id=news_id, outcome='non_json')
+            return None
+        impact = parsed.get('impact', '否')
+        sectors = parsed.get('affected_sectors') or []
+        self.events.emit('level1_result', 'level1', news_id=news_id, outcome='ok', title=title[:50],
+                         impact=impact, sectors=sectors, cached=bool(res.get('cached')))
+        return StockAnalysis(
+            news_id=news_id,
+            level=1,
+            news_title=title,
+            news_content=content,
+            affected_sectors=[str(s) for s in sectors] if isinstance(sectors, list) else [],
+            recommended_stocks=[],
+            analysis_time=datetime.now().isoformat(timespec='seconds'),
+            impact=impact,
+            impact_level=parsed.get('impact_strength', '中') if impact == '是' else "无影响",
+            reason=parsed.get('reason', ''),
+            model='DeepSeek-V3',
+        )
+
+    async def _level1_worker(self):
         while True:
+            item = await self.level1_queue.get()
             try:
-                news_list = await self.get_latest_news()
-                for news in news_list:
-                    if news['id'] != self.last_news_id:
-                        analysis = await self.analyze_news(news['title'], news['content'])
-                        if analysis and analysis.impact_level != "无影响":
-                            # TODO: 保存分析结果到数据库
-                            # TODO: 通过WebSocket推送到前端
-                            pass
-                        self.last_news_id = news['id']
+                await self._handle_level1(item)
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                print(f"监控过程发生错误: {str(e)}")
-            
-            # 等待一定时间后再次检查
-            await asyncio.sleep(60)
\ No newline at end of file
+                self._recheck.extend(self.dedup.release(str(item.get('id', ''))))
+                self.events.emit('cycle_error', 'system', ERROR, news_id=item.get('id'), outcome='error',
+                                 error=str(e), traceback=traceback.format_exc())
+            finally:
+                self.level1_queue.task_done()
+
+    async def _handle_level1(self, item: Dict[str, Any]):
+        nid = str(item.get('id', ''))
+        title = item.get('title', '')
+        with self.events.span('level1_done', 'level1', DEBUG, news_id=nid, count=1):
+            analysis = await self.analyze_news(title, item.get('content', ''), nid)
+        if analysis is None:
+            # 簇代表分析失败：撤销代表，暂存的重复条目下一轮重新判重并分析
+            self._recheck.extend(self.dedup.release(nid))
+            return
+        self.dedup.confirm(nid)
+        if self.prefilter is not None:
+            self.prefilter.record(item, analysis.impact)
+        has_impact = analysis.impact_level != "无影响"
+        if self.repository is not None:
+            self.repository.record_level1(item, analysis.impact, analysis.affected_sectors, analysis.reason,
+                                          analysis.impact_level if has_impact else None)
+        if not has_impact:
+            return
+
+        # 候选股筛选读取共享行情表（快照过期时会下载全市场行情），放到 AkShare 线程池中执行
+        screen_started = time.monotonic()
+        try:
+            candidates = await get_market_data().run(self.rt.pick_candidate_stocks, 5, analysis.affected_sectors,
+                                                     key=('candidates', tuple(analysis.affected_sectors)))
+        except Exception as e:
+            self.events.emit('screen_error', 'screen', ERROR, news_id=nid, outcome='error', error=str(e))
+            return
+        if not candidates:
+            self.events.emit('screen_empty', 'screen', ERROR, news_id=nid, outcome='empty')
+            return
+        self.events.emit('screened', 'screen', news_id=nid, duration=time.monotonic() - screen_started,
+                         outcome='ok', count=len(candidates),
+                         top=[f"{c.get('name')}({c.get('code')})" for c in candidates[:3]])
+        await self.level2_queue.put((item, analysis, candidates))
+        self.events.emit('level2_queued', 'level2', news_id=nid, strength=analysis.impact_level,
+                         queued=self.level2_queue.qsize())
+
+    # ---------- 二级分析 ----------
+    async def analyze_level2(self, analysis: StockAnalysis, candidates: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """二级分析（R1 推理模型）：基于候选股实时行情给出操作策略"""
+        prompt = await get_market_data().run(self.rt.level2_prompt, analysis.news_title, analysis.affected_sectors,
+                                             analysis.reason or '', {'candidates': candidates})
+        return await self.call_deepseek(prompt, max_tokens=1500, use_reasoning=True)
+
+    async def _level2_worker(self):
+        while True:
+            item, analysis, candidates = await self.level2_queue.get()
+            nid = str(item.get('id', ''))
+            try:
+                self.events.emit('level2_started', 'level2', news_id=nid, created_time=analysis.analysis_time)
+                started = time.monotonic()
+                strategy = await self.analyze_level2(analysis, candidates)
+                if 'error' in strategy:
+                    self.events.emit('level2_failed', 'level2', ERROR, news_id=nid, outcome='error',
+                                     error=strategy['error'])
+                    continue
+                self.events.emit('level2_done', 'level2', news_id=nid, duration=time.monotonic() - started,
+                                 outcome='ok' if 'parsed' in strategy else 'non_json')
+                if self.repository is not None and 'parsed' in strategy:
+                    self.repository.record_level2({
+                        'nid': nid,
+                        'title': analysis.news_title,
+                        'content': analysis.news_content,
+                        'sectors': analysis.affected_sectors,
+                        'strength': analysis.impact_level,
+                        'reason': analysis.reason,
+                    }, strategy)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.events.emit('level2_failed', 'level2', ERROR, news_id=nid, outcome='error', error=str(e))
+            finally:
+                self.level2_queue.task_done()
+
+    # ---------- 模型调用 ----------
+    async def call_deepseek(self, prompt: str, max_tokens: int = 800, use_reasoning: bool = False,
+                            hedge: bool = False) -> Dict[str, Any]:
+        """RealTimeManager.call_deepseek 的协程版本（非流式）：调用策略同样由 LLMCall 决定，这里只做 aiohttp 传输"""
+        call = LLMCall(self.rt.endpoints, self.rt.level1_latency, prompt, max_tokens, use_reasoning)
+        cached = call.cached()
+        if cached is not None:
+            return cached
+        if hedge and not use_reasoning and call.hedgeable():
+            result = await self._call_hedged(call)
+        else:
+            result = await self._call_with_failover(call, call.endpoints)
+        return call.store(result)
+
+    async def _call_with_failover(self, call: LLMCall, endpoints: List[Endpoint]) -> Dict[str, Any]:
+        """按 call.plan 的顺序依次尝试各端点"""
+        result = LLMCall.no_endpoint()
+        for endpoint, attempts, next_endpoint in call.plan(endpoints):
+            if call.expired():
+                return call.deadline_error()
+            result = await self._call_endpoint(call, endpoint, attempts)
+            if "error" not in result:
+                return result
+            call.failover(endpoint, next_endpoint, result)
+        return result
+
+    async def _call_hedged(self, call: LLMCall) -> Dict[str, Any]:
+        """超过近期 p95 延迟仍未拿到合法 JSON 时补发一次，先返回合法 JSON 者胜出，另一个直接取消"""
+        first = asyncio.ensure_future(self._call_with_failover(call, call.endpoints))
+        done, _ = await asyncio.wait({first}, timeout=call.hedge_delay())
+        if first in done and "parsed" in first.result():
+            return first.result()
+
+        alternate = call.hedge()
+        if alternate is None:
+            return await first
+        second = asyncio.ensure_future(self._call_with_failover(call, alternate))
+        tasks = {first: 0, second: 1}
+        results: Dict[int, Dict[str, Any]] = {}
+        pending = {t for t in tasks if not t.done()}
+        for t in set(tasks) - pending:
+            results[tasks[t]] = t.result()
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for t in done:
+                    idx = tasks[t]
+                    results[idx] = t.result()
+                    if "parsed" in results[idx]:
+                        call.hedge_won(idx)
+                        return results[idx]
+        finally:
+            for t in pending:
+                t.cancel()
+        return LLMCall.hedge_fallback(results)
+
+    async def _call_endpoint(self, call: LLMCall, endpoint: Endpoint, attempts: int) -> Dict[str, Any]:
+        """在单个端点上调用（aiohttp 传输）；被取消时不计入端点健康度和自适应并发"""
+        url, headers, payload = call.request(endpoint)
+        budget = call.budget(endpoint)
+        session = await get_async_session()
+        last_error = "未知错误"
+        for attempt in range(attempts):
+            if call.expired():
+                return call.deadline_error()
+            att = call.attempt(endpoint, await budget.acquire_async(call.est_tokens))
+            try:
+                async with session.post(url, headers=headers, json=payload,
+                                        timeout=aiohttp.ClientTimeout(total=call.request_timeout())) as r:
+                    if att.http_status(r.status, r.headers.get("Retry-After")):
+                        continue
+                    r.raise_for_status()
+                    res = await r.json(content_type=None)
+                att.usage(res)
+                return att.result(message_content(res), res)
+            except asyncio.CancelledError:
+                att.cancelled = True
+                raise
+            except asyncio.TimeoutError:
+                att.timed_out(attempt)
+            except aiohttp.ClientConnectionError as e:
+                att.connection_error(e)
+            except Exception as e:
+                return att.fatal(e)
+            finally:
+                att.finish()
+                last_error = att.error or last_error
+                wait_time = att.retry_delay(attempt, attempts)
+                if wait_time is not None:
+                    await asyncio.sleep(wait_time)
+
+        return {"error": last_error}
+
+    async def get_stock_data(self, stock_code: str):
+        """获取股票实时数据（行情下载在 AkShare 专用线程池中执行，不阻塞事件循环）"""
+        try:
+            return await get_market_data().get_quote(stock_code) or None
+        except Exception as e:
+            self.events.emit('quote_error', 'screen', ERROR, outcome='error', code=stock_code, error=str(e))
+            return None
+
+
+_monitor: Optional[NewsMonitor] = None
+
+
+def get_news_monitor() -> NewsMonitor:
+    """返回进程内共享的新闻监控引擎（只创建，不启动）"""
+    global _monitor
+    if _monitor is None:
+        _monitor = NewsMonitor()
+    return _monitor
@@ -0,0 +1,358 @@
+import os
+import time
+import threading
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from services.analysis_repository import get_analysis_repository
+from services.event_log import ERROR, WARNING, DEBUG
+from services.level2_queue import Level2Queue, parse_news_time
+from services.llm_cache import get_llm_cache
+from services.news_dedup import NearDuplicateDetector
+from services.quote_store import get_quote_store
+from services.rate_limiter import budget_stats
+from services.realtime_manager import DEEPSEEK_STREAM, RealTimeManager
+from services.relevance_filter import PREFILTER_ENABLED, RelevanceFilter
+from services.result_store import ResultStore
+
+PIPELINE_INTERVAL = float(os.getenv("PIPELINE_INTERVAL", "10"))
+
+
+class AnalysisPipeline:
+    """新闻 -> 一级分析 -> 候选股筛选 -> 二级分析 的后台流水线
+
+    由独立 worker 进程（src/worker.py）或界面进程内的单个后台线程运行，
+    结果写入 ResultStore，界面只负责读取展示。
+    """
+
+    def __init__(self, rt: Optional[RealTimeManager] = None, store: Optional[ResultStore] = None,
+                 interval: float = PIPELINE_INTERVAL):
+        self.rt = rt or RealTimeManager()
+        self.store = store or ResultStore()
+        self.events = self.store.events
+        self.interval = interval
+        self.backlog: List[Dict[str, Any]] = []  # 已抓取但尚未分析的新闻（按时间正序）
+        self._recheck: List[Dict[str, Any]] = []  # 代表未能完成分析而交回的重复条目，下一轮重新判重
+        self.level2 = Level2Queue(self.run_level2)
+        self.dedup = NearDuplicateDetector()
+        self.prefilter = RelevanceFilter() if PREFILTER_ENABLED else None
+        self.repository = get_analysis_repository()
+        # 流式一级分析中提前启动的候选股筛选：新闻id -> (板块, Future)
+        self._early_candidates: Dict[str, tuple] = {}
+        self._prefetch_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="prefetch")
+        self._impact_seen: Dict[str, Any] = {}
+        self.rt.level1_field_hook = self._on_level1_field
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self.cycle_count = 0
+
+    # ---------- 生命周期 ----------
+    def start(self):
+        """以后台线程启动（一级循环 + 二级分析工作线程池）"""
+        if self._threads:
+            return
+        self.level2.start()
+        t = threading.Thread(target=self.run_forever, name="pipeline-level1", daemon=True)
+        t.start()
+        self._threads.append(t)
+
+    def stop(self):
+        self._stop.set()
+        self.level2.stop()
+
+    def is_running(self) -> bool:
+        return any(t.is_alive() for t in self._threads)
+
+    def run_forever(self):
+        self.events.emit('pipeline_started', 'system')
+        while not self._stop.is_set():
+            started = time.monotonic()
+            self.run_cycle()
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    # ---------- 一级分析 ----------
+    def run_cycle(self):
+        """执行一轮：增量抓取新闻并并发完成一级分析"""
+        self.cycle_count += 1
+        current_time = time.strftime('%H:%M:%S')
+        rt = self.rt
+        rt.level1_latency.start_cycle()
+        batch: List[Dict[str, Any]] = []
+        handled = 0
+        try:
+            fetch_started = time.monotonic()
+            news_items = rt.feed.poll()
+            fetch_duration = time.monotonic() - fetch_started
+            self.store.set_news(rt.feed.recent(10))
+
+            if not rt.feed.last_fetch_ok:
+                self.events.emit('fetch_failed', 'fetch', ERROR, duration=fetch_duration, outcome='error')
+                self.store.update_status(last_error="新闻抓取失败")
+                return
+
+            # 近重复快讯只分析簇代表，其余挂到代表的结果下（代表尚未出结论时由去重器暂存）
+            recheck, self._recheck = self._recheck, []
+            unique_items = []
+            for item in recheck + news_items:
+                rep_id = self.dedup.check(item)
+                if rep_id is None:
+                    unique_items.append(item)
+                else:
+                    if not self.dedup.is_pending(rep_id):
+                        self.store.link_duplicate(rep_id, item)
+                    self.events.emit('duplicate', 'dedup', news_id=item.get('id'), outcome='skipped', rep_id=rep_id)
+
+            # 本地相关度预筛：明显无关的新闻不调用 DeepSeek
+            relevant_items = [item for item in unique_items if self._prefilter_accept(item, current_time)]
+
+            self.backlog.extend(relevant_items)
+            if not self.backlog:
+                self.events.emit('fetched', 'fetch', DEBUG, duration=fetch_duration, outcome='ok',
+                                 new=0, unique=0, relevant=0, backlog=0)
+                return
+            self.events.emit('fetched', 'fetch', duration=fetch_duration, outcome='ok', new=len(news_items),
+                             unique=len(unique_items), relevant=len(relevant_items), backlog=len(self.backlog))
+
+            batch, self.backlog = self.backlog, []
+            self.events.emit('level1_dispatch', 'level1', count=len(batch), concurrency=rt.level1.concurrency)
+            with self.events.span('level1_done', 'level1', count=len(batch)):
+                results = rt.level1.dispatch(batch)
+
+            # 按新闻时间顺序合并结果（最新的排在最前）
+            for item, res1 in zip(batch, results):
+                handled += 1
+                self.handle_level1_result(item, res1, current_time)
+            self.store.update_status(last_error=None)
+        except Exception as e:
+            self.events.emit('cycle_error', 'system', ERROR, outcome='error', error=str(e),
+                             traceback=traceback.format_exc())
+            self.store.update_status(last_error=str(e))
+            # 本轮已取出但没来得及处理的新闻按分析失败处理，不能直接丢失
+            for item in batch[handled:]:
+                self._retry_or_release(item)
+        finally:
+            cache = get_llm_cache()
+            self.store.update_status(cycle_count=self.cycle_count, backlog=len(self.backlog),
+                                     duplicates=self.dedup.duplicates,
+                                     prefiltered=self.prefilter.skipped if self.prefilter else 0,
+                                     level2=self.level2.progress(),
+                                     llm_cache=cache.stats() if cache is not None else None,
+                                     rate_limits=budget_stats(),
+                                     endpoints=self.rt.endpoints.stats(),
+                                     hedge=self.rt.level1_latency.stats())
+            self.store.flush()
+
+    def _prefilter_accept(self, item: Dict[str, Any], current_time: str) -> bool:
+        if self.prefilter is None:
+            return True
+        ok, score = self.prefilter.check(item)
+        if ok:
+            return True
+        self._resolve_representative(item, analyzed=False)
+        self.events.emit('prefiltered', 'prefilter', DEBUG, news_id=item.get('id'), outcome='skipped', score=score)
+        self.store.add_analysis({
+            'time': current_time,
+            'news_id': str(item.get('id', '')),
+            'news_title': item.get('title', ''),
+            'impact': '否',
+            'sectors': [],
+            'reason': f"[本地预筛跳过] 相关度 {score:.2f} < 阈值 {self.prefilter.threshold:.2f}",
+            'is_json': True,
+            'raw_response': None,
+            'prefiltered': True
+        })
+        return False
+
+    def _resolve_representative(self, item: Dict[str, Any], analyzed: bool):
+        """簇代表有了结论时挂上暂存的重复条目；未能分析（预筛跳过/失败/非JSON）时撤销代表，重复条目下一轮重新判重"""
+        nid = str(item.get('id', ''))
+        if analyzed:
+            for dup in self.dedup.confirm(nid):
+                self.store.link_duplicate(nid, dup)
+        else:
+            self._recheck.extend(self.dedup.release(nid))
+
+    def _retry_or_release(self, item: Dict[str, Any]):
+        """一级分析失败的新闻放回待分析队列，下一轮重试一次；仍失败则放弃并撤销其簇代表身份"""
+        attempts = item.get('_attempts', 0) + 1
+        if attempts < 2:
+            self.backlog.append({**item, '_attempts': attempts})
+        else:
+            self._resolve_representative(item, analyzed=False)
+
+    def _on_level1_field(self, item: Dict[str, Any], key: str, value: Any):
+        """一级分析流式字段回调：impact 一确定为"是"就预热行情，affected_sectors 到达即提前筛选候选股，
+        不必等待 reason 写完"""
+        nid = str(item.get('id', ''))
+        if key == 'impact':
+            self._impact_seen[nid] = value
+            if value == '是':
+                self.events.emit('impact_early', 'level1', news_id=nid)
+                self._prefetch_pool.submit(get_quote_store)
+        elif key == 'affected_sectors' and self._impact_seen.pop(nid, None) == '是' and isinstance(value, list):
+            future: Future = self._prefetch_pool.submit(self.rt.pick_candidate_stocks, 5, value)
+            self._early_candidates[nid] = (value, future)
+
+    def handle_level1_result(self, item: Dict[str, Any], res1: Dict[str, Any], current_time: str):
+        """处理单条新闻的一级分析结果：记录结果，有影响时筛选候选股并加入二级分析队列"""
+        store = self.store
+        nid = str(item.get('id', ''))
+        title = item.get('title', '')
+
+        early = self._early_candidates.pop(nid, None)
+        self._impact_seen.pop(nid, None)
+
+        # 检查API错误
+        if 'error' in res1:
+            self.events.emit('level1_error', 'level1', ERROR, news_id=nid, outcome='error', error=res1['error'])
+            self._retry_or_release(item)
+            return
+
+        # 检查返回格式
+        if 'parsed' not in res1:
+            self.events.emit('level1_non_json', 'level1', WARNING, news_id=nid, outcome='non_json')
+            self._resolve_representative(item, analyzed=False)
+            raw_text = res1.get('raw_text', str(res1))
+            store.add_analysis({
+                'time': current_time,
+                'news_id': nid,
+                'news_title': title,
+                'impact': '未知',
+                'sectors': [],
+                'reason': f"[非JSON格式] {raw_text}",
+                'is_json': False,
+                'raw_response': raw_text
+            })
+            if self.repository is not None:
+                self.repository.record_level1(item, '未知', [], f"[非JSON格式] {raw_text}")
+            return
+
+        impact = res1['parsed'].get('impact', '否')
+        sectors = res1['parsed'].get('affected_sectors', [])
+        reason = res1['parsed'].get('reason', '')
+        if self.prefilter is not None and not res1.get('cached'):
+            self.prefilter.record(item, impact)
+
+        self.events.emit('level1_result', 'level1', news_id=nid, outcome='ok', title=title[:50],
+                         impact=impact, sectors=sectors)
+        store.add_analysis({
+            'time': current_time,
+            'news_id': nid,
+            'news_title': title,
+            'impact': impact,
+            'sectors': sectors,
+            'reason': reason,
+            'is_json': True,
+            'raw_response': None
+        })
+        self._resolve_representative(item, analyzed=True)
+        strength = res1['parsed'].get('impact_strength', '中')
+        if self.repository is not None:
+            self.repository.record_level1(item, impact, sectors, reason, strength if impact == '是' else None)
+
+        if impact != '是':
+            return
+
+        # ========== 筛选候选股票（流式阶段已提前启动的直接取结果）==========
+        screen_started = time.monotonic()
+        try:
+            if early is not None and early[0] == sectors:
+                candidates = early[1].result()
+            else:
+                candidates = self.rt.pick_candidate_stocks(5, sectors)
+        except Exception as e:
+            self.events.emit('screen_error', 'screen', ERROR, news_id=nid, outcome='error', error=str(e))
+            store.add_recommendation({
+                'title': title,
+                'time': current_time,
+                'strategy': {'error': f'AkShare异常: {str(e)}'},
+                'sectors': sectors,
+                'candidates': [],
+                'error_type': 'akshare_exception',
+                'error_detail': str(e)
+            })
+            return
+
+        if not candidates:
+            self.events.emit('screen_empty', 'screen', ERROR, news_id=nid, outcome='empty')
+            store.add_recommendation({
+                'title': title,
+                'time': current_time,
+                'strategy': {'error': 'AkShare股票数据获取失败，接口暂时不可用'},
+                'sectors': sectors,
+                'candidates': [],
+                'error_type': 'akshare_failed'
+            })
+            return
+
+        self.events.emit('screened', 'screen', news_id=nid, duration=time.monotonic() - screen_started, outcome='ok',
+                         count=len(candidates), early=early is not None,
+                         top=[f"{c.get('name')}({c.get('code')})" for c in candidates[:3]])
+
+        # ========== 加入二级分析队列（使用R1模型，按影响强度和新闻新鲜度排序）==========
+        self.level2.submit({
+            'title': title,
+            'content': item.get('content', ''),
+            'strength': strength,
+            'sectors': sectors,
+            'reason': reason,
+            'candidates': candidates,
+            'created_time': current_time,
+            'nid': nid
+        }, strength=strength, news_time=parse_news_time(item.get('create_time')))
+        self.events.emit('level2_queued', 'level2', news_id=nid, strength=strength,
+                         queued=self.level2.progress()['queued'])
+
+    # ---------- 二级分析 ----------
+    def run_level2(self, task: Dict[str, Any]) -> bool:
+        """对一个二级分析任务调用R1模型并保存推荐结果（在二级分析工作线程中执行）"""
+        store = self.store
+        title = task['title']
+        job_id = task.get('_job_id')
+        self.events.emit('level2_started', 'level2', news_id=task.get('nid'), created_time=task['created_time'])
+        started = time.monotonic()
+        store.update_status(level2=self.level2.progress())
+        store.flush()
+
+        # 流式推理进度：累计推理/正文字数，最多每2秒向界面发布一次
+        counts = {'reasoning_chars': 0, 'content_chars': 0}
+        last_publish = [time.monotonic()]
+
+        def on_event(kind: str, data: Any):
+            if kind == 'reasoning':
+                counts['reasoning_chars'] += len(data)
+            elif kind == 'token':
+                counts['content_chars'] += len(data)
+            else:
+                return
+            self.level2.report(job_id, **counts)
+            if time.monotonic() - last_publish[0] >= 2.0:
+                last_publish[0] = time.monotonic()
+                store.update_status(level2=self.level2.progress())
+                store.flush()
+
+        try:
+            prompt2 = self.rt.level2_prompt(title, task['sectors'], task['reason'], {'candidates': task['candidates']})
+            res2 = self.rt.call_deepseek(prompt2, max_tokens=1500, use_reasoning=True,
+                                         on_event=on_event if DEEPSEEK_STREAM else None)
+            if 'error' in res2:
+                self.events.emit('level2_failed', 'level2', ERROR, news_id=task.get('nid'),
+                                 duration=time.monotonic() - started, outcome='error', error=res2['error'])
+                return False
+
+            self.events.emit('level2_done', 'level2', news_id=task.get('nid'),
+                             duration=time.monotonic() - started, outcome='ok')
+            store.add_recommendation({
+                'title': title,
+                'time': time.strftime('%H:%M:%S'),
+                'strategy': res2,
+                'sectors': task['sectors'],
+                'candidates': task['candidates'],
+                'model': 'DeepSeek-R1'
+            })
+            if self.repository is not None:
+                self.repository.record_level2(task, res2)
+            return True
+        finally:
+            store.update_status(level2=self.level2.progress())
+            store.flush()
@@ -0,0 +1,84 @@
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+import numpy as np
+from services.market_snapshot import get_snapshot_cache
+
+# 不同行情接口对股票代码列的命名
+CODE_COLUMNS = ('代码', '股票代码', 'code')
+
+_CODE_PATTERN = re.compile(r'(\d{6})')
+
+
+def normalize_code(code: Any) -> str:
+    """统一股票代码格式：sh600000 / 600000.SH / 600000 -> 600000"""
+    text = str(code).strip()
+    m = _CODE_PATTERN.search(text)
+    return m.group(1) if m else text
+
+
+class QuoteStore:
+    """按股票代码索引的列式行情表
+
+    快照只在构建时规整一次：每列转为 NumPy 数组，代码 -> 行号建哈希索引，
+    之后单只/批量查询都是 O(1) 定位 + 按行号取值，不再扫描 DataFrame。
+    """
+
+    def __init__(self, df):
+        code_col = next((c for c in CODE_COLUMNS if c in df.columns), None)
+        if code_col is None:
+            raise KeyError("行情快照缺少股票代码列")
+        self.columns: List[str] = [str(c) for c in df.columns]
+        self._arrays: Dict[str, np.ndarray] = {str(c): df[c].to_numpy() for c in df.columns}
+        self.codes = np.array([normalize_code(c) for c in df[code_col].to_numpy()], dtype=object)
+        self._index: Dict[str, int] = {code: i for i, code in enumerate(self.codes)}
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __contains__(self, code: Any) -> bool:
+        return normalize_code(code) in self._index
+
+    def column(self, name: str) -> Optional[np.ndarray]:
+        return self._arrays.get(name)
+
+    def positions(self, codes: Iterable[Any]) -> np.ndarray:
+        """把股票代码转换为行号，未知代码被忽略"""
+        idx = [self._index.get(normalize_code(c)) for c in codes]
+        return np.array([i for i in idx if i is not None], dtype=np.intp)
+
+    def rows(self, positions: np.ndarray) -> List[Dict[str, Any]]:
+        """按行号批量取出记录（逐列 take，再按行拼装）"""
+        if len(positions) == 0:
+            return []
+        cols = [self._arrays[c][positions].tolist() for c in self.columns]
+        return [dict(zip(self.columns, values)) for values in zip(*cols)]
+
+    def get(self, code: Any) -> Dict[str, Any]:
+        i = self._index.get(normalize_code(code))
+        if i is None:
+            return {}
+        return self.rows(np.array([i], dtype=np.intp))[0]
+
+    def get_many(self, codes: Iterable[Any]) -> Dict[str, Dict[str, Any]]:
+        """批量查询，返回 {代码: 行情}；不存在的代码不出现在结果中"""
+        positions = self.positions(codes)
+        return {self.codes[i]: row for i, row in zip(positions, self.rows(positions))}
+
+
+_store: Optional[QuoteStore] = None
+_store_source: Any = None
+_store_lock = threading.Lock()
+
+
+def get_quote_store() -> QuoteStore:
+    """返回与当前共享快照对应的行情表；快照刷新后惰性重建一次"""
+    global _store, _store_source
+    df = get_snapshot_cache().get()
+    if _store is not None and _store_source is df:
+        return _store
+    with _store_lock:
+        if _store is None or _store_source is not df:
+            _store = QuoteStore(df)
+            _store_source = df
+        return _store
@@ -0,0 +1,228 @@
+import os
+import re
+import time
+import random
+import asyncio
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+# 服务商限额（每分钟请求数 / token 数），V3 与 R1 分开计算
+DEEPSEEK_V3_RPM = float(os.getenv("DEEPSEEK_V3_RPM", "300"))
+DEEPSEEK_V3_TPM = float(os.getenv("DEEPSEEK_V3_TPM", "300000"))
+DEEPSEEK_R1_RPM = float(os.getenv("DEEPSEEK_R1_RPM", "60"))
+DEEPSEEK_R1_TPM = float(os.getenv("DEEPSEEK_R1_TPM", "100000"))
+# 自适应并发上限与延迟目标（秒），超过目标或遇到 429 时并发减半
+DEEPSEEK_V3_MAX_CONCURRENCY = int(os.getenv("DEEPSEEK_V3_MAX_CONCURRENCY", "8"))
+DEEPSEEK_R1_MAX_CONCURRENCY = int(os.getenv("DEEPSEEK_R1_MAX_CONCURRENCY", "4"))
+DEEPSEEK_V3_TARGET_LATENCY = float(os.getenv("DEEPSEEK_V3_TARGET_LATENCY", "15"))
+DEEPSEEK_R1_TARGET_LATENCY = float(os.getenv("DEEPSEEK_R1_TARGET_LATENCY", "90"))
+# 重试：最大尝试次数、指数退避基数与上限（秒）
+DEEPSEEK_MAX_RETRIES = int(os.getenv("DEEPSEEK_MAX_RETRIES", "4"))
+DEEPSEEK_BACKOFF_BASE = float(os.getenv("DEEPSEEK_BACKOFF_BASE", "1"))
+DEEPSEEK_BACKOFF_MAX = float(os.getenv("DEEPSEEK_BACKOFF_MAX", "30"))
+
+_CJK = re.compile(r'[　-〿一-鿿＀-￯]')
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数：中文约 1 字 0.6 token，其余约 4 字符 1 token"""
+    cjk = len(_CJK.findall(text))
+    return int(cjk * 0.6 + (len(text) - cjk) / 4) + 1
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After 响应头（秒数或 HTTP 日期），返回需等待的秒数"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None,
+                  base: float = DEEPSEEK_BACKOFF_BASE, cap: float = DEEPSEEK_BACKOFF_MAX) -> float:
+    """指数退避 + 全抖动；服务端给出 Retry-After 时至少等待该时长"""
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, cap * 4))
+    return delay
+
+
+class TokenBucket:
+    """令牌桶：每分钟补充 per_minute 个令牌，容量为一分钟的额度"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = max(1.0, per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._cond = threading.Condition()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount: float = 1.0):
+        """阻塞直到取得 amount 个令牌（超过容量的请求按容量计，避免永远等待）"""
+        amount = min(amount, self.capacity)
+        with self._cond:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                self._cond.wait((amount - self.tokens) / self.rate)
+
+    def try_acquire(self, amount: float = 1.0) -> float:
+        """不阻塞：取得令牌返回 0，否则返回大约还需等待的秒数"""
+        amount = min(amount, self.capacity)
+        with self._cond:
+            self._refill()
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return 0.0
+            return (amount - self.tokens) / self.rate
+
+    def adjust(self, delta: float):
+        """按实际用量修正：delta > 0 追加扣减，< 0 退还（允许透支为负数）"""
+        with self._cond:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - delta)
+            if delta < 0:
+                self._cond.notify_all()
+
+    def drain(self):
+        """收到 429 时清空令牌，让后续请求等待补充"""
+        with self._cond:
+            self._refill()
+            self.tokens = min(self.tokens, 0.0)
+
+
+class AIMDLimiter:
+    """AIMD 自适应并发：成功且延迟正常时每轮 +1，遇到限流/超时/高延迟时减半"""
+
+    def __init__(self, max_limit: int, target_latency: float, min_limit: int = 1):
+        self.max_limit = max(min_limit, max_limit)
+        self.min_limit = min_limit
+        self.target_latency = target_latency
+        self.limit = float(max(min_limit, self.max_limit // 2))
+        self.in_flight = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    def try_acquire(self) -> bool:
+        with self._cond:
+            if self.in_flight >= int(self.limit):
+                return False
+            self.in_flight += 1
+            return True
+
+    def cancel(self):
+        """归还 try_acquire 占用但未使用的并发位（不调整并发上限）"""
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def release(self, latency: Optional[float], congested: bool):
+        with self._cond:
+            self.in_flight -= 1
+            if congested or (latency is not None and latency > self.target_latency):
+                self.limit = max(float(self.min_limit), self.limit / 2)
+            elif latency is not None:
+                self.limit = min(float(self.max_limit), self.limit + 1 / max(1.0, self.limit))
+            self._cond.notify_all()
+
+
+class ModelBudget:
+    """单个模型的客户端限流：RPM 令牌桶 + TPM 令牌桶 + 自适应并发"""
+
+    def __init__(self, name: str, rpm: float, tpm: float, max_concurrency: int, target_latency: float):
+        self.name = name
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.concurrency = AIMDLimiter(max_concurrency, target_latency)
+        self.throttled = 0
+        self.completed = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, est_tokens: int) -> float:
+        """等待额度后占用一个并发位，返回开始时间"""
+        self.requests.acquire(1)
+        self.tokens.acquire(est_tokens)
+        self.concurrency.acquire()
+        return time.monotonic()
+
+    async def acquire_async(self, est_tokens: int, poll: float = 0.05) -> float:
+        """acquire() 的协程版本：额度不足时 await 等待而不占用线程，与同步调用方共享同一份额度"""
+        while True:
+            if self.concurrency.try_acquire():
+                wait = self.requests.try_acquire(1)
+                if wait == 0:
+                    wait = self.tokens.try_acquire(est_tokens)
+                    if wait == 0:
+                        return time.monotonic()
+                    self.requests.adjust(-1)
+                self.concurrency.cancel()
+            else:
+                wait = poll
+            await asyncio.sleep(min(max(wait, poll), 1.0))
+
+    def release(self, started: float, est_tokens: int, used_tokens: Optional[int] = None,
+                throttled: bool = False, failed: bool = False, cancelled: bool = False):
+        """归还并发位；throttled=429，failed=超时/5xx 等拥塞信号，cancelled=主动取消（不调整并发）"""
+        latency = None if (throttled or failed or cancelled) else time.monotonic() - started
+        self.concurrency.release(latency, throttled or failed)
+        if used_tokens is not None:
+            self.tokens.adjust(used_tokens - est_tokens)
+        if throttled:
+            self.requests.drain()
+        with self._lock:
+            if throttled:
+                self.throttled += 1
+            elif not (failed or cancelled):
+                self.completed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'concurrency_limit': int(self.concurrency.limit),
+            'in_flight': self.concurrency.in_flight,
+            'completed': self.completed,
+            'throttled': self.throttled,
+        }
+
+
+_budgets: Dict[str, ModelBudget] = {}
+_budgets_lock = threading.Lock()
+
+
+def get_model_budget(use_reasoning: bool, endpoint: str = "primary") -> ModelBudget:
+    """返回进程内共享的 V3 / R1 限流器（每个端点各自计算额度）"""
+    name = 'R1' if use_reasoning else 'V3'
+    if endpoint != "primary":
+        name = f"{endpoint}/{name}"
+    if name not in _budgets:
+        with _budgets_lock:
+            if name not in _budgets:
+                if use_reasoning:
+                    _budgets[name] = ModelBudget(name, DEEPSEEK_R1_RPM, DEEPSEEK_R1_TPM,
+                                                 DEEPSEEK_R1_MAX_CONCURRENCY, DEEPSEEK_R1_TARGET_LATENCY)
+                else:
+                    _budgets[name] = ModelBudget(name, DEEPSEEK_V3_RPM, DEEPSEEK_V3_TPM,
+                                                 DEEPSEEK_V3_MAX_CONCURRENCY, DEEPSEEK_V3_TARGET_LATENCY)
+    return _budgets[name]
+
+
+def budget_stats() -> Dict[str, Any]:
+    return {name: b.stats() for name, b in _budgets.items()}
@@ -1,154 +1,278 @@
 import os
 import time
 import json
+import threading
 import requests
-from typing import List, Dict, Any, Optional
-import akshare as ak
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import List, Dict, Any, Callable, Optional
 from dotenv import load_dotenv
+from services.http_client import get_http_session
+from services.event_log import ERROR, get_event_log
+from services.json_stream import IncrementalJSONParser
+from services.level1_dispatcher import Level1Dispatcher
+from services.llm_client import LLMCall, message_content
+from services.llm_endpoints import LEVEL1_HEDGE, Endpoint, EndpointPool, EventRouter, LatencyTracker
+from services.news_feed import IncrementalFeedReader
+from services.market_context import encode_market_context, merge_candidates
+from services.quote_store import get_quote_store
+from services.stock_screener import StockScreener
+from services.sector_index import get_sector_index
 
 load_dotenv()
 
 DEEPSEEK_API_URL = os.getenv("DEEPSEEK_API_URL", "https://api.siliconflow.cn/v1")
 DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY") or os.getenv("DEEPSEEK_API_KEY".upper()) or os.getenv("DEEPSEEK_API")
 
+# 是否以 SSE 流式方式调用（流式时一级分析的 impact 字段完成即可提前处理）
+DEEPSEEK_STREAM = os.getenv("DEEPSEEK_STREAM", "1") == "1"
+
+# 一级分析批量模式：每批最多条数、每批正文总字数、单条正文截断字数
+LEVEL1_BATCH_SIZE = int(os.getenv("LEVEL1_BATCH_SIZE", "8"))
+LEVEL1_BATCH_MAX_CHARS = int(os.getenv("LEVEL1_BATCH_MAX_CHARS", "6000"))
+LEVEL1_BATCH_ITEM_CHARS = int(os.getenv("LEVEL1_BATCH_ITEM_CHARS", "600"))
+
 SINA_7X24_API = "https://zhibo.sina.com.cn/api/zhibo/feed"
+SINA_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36",
+    "Referer": "https://finance.sina.com.cn/7x24/"
+}
+
+
+def sina_feed_params(page: int, page_size: int) -> Dict[str, Any]:
+    """新浪财经7x24页面使用的API参数"""
+    return {
+        "page": page,
+        "page_size": page_size,
+        "zhibo_id": 152,  # 财经频道ID
+        "tag_id": 0,      # 0表示全部，10=A股，1=宏观等
+        "dire": "f",      # f=forward向前翻页
+        "dpc": 1,
+        "pagesize": page_size
+    }
+
+
+def parse_sina_feed(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """从接口响应的 result.data.feed.list 中提取新闻，格式化为统一结构"""
+    result = data.get("result", {})
+    if isinstance(result, dict):
+        news_list = result.get("data", {}).get("feed", {}).get("list", [])
+    else:
+        news_list = []
+    
+    formatted_news = []
+    for item in news_list:
+        if isinstance(item, dict):
+            formatted_news.append({
+                "id": item.get("id") or item.get("docid"),
+                "title": item.get("rich_text") or item.get("title", ""),
+                "content": item.get("rich_text") or item.get("content", ""),
+                "create_time": item.get("create_time", ""),
+                "source": "新浪财经7x24"
+            })
+    return formatted_news
 
 class RealTimeManager:
     def __init__(self):
-        self.last_seen_id: Optional[str] = None
+        self.screener = StockScreener()
+        self.feed = IncrementalFeedReader(self.fetch_latest_news)
+        self.level1 = Level1Dispatcher(self.analyze_level1, analyze_batch=self.analyze_level1_batch,
+                                       split_batches=self.split_level1_batches)
+        self.endpoints = EndpointPool.from_env(Endpoint(
+            "primary", DEEPSEEK_API_URL, DEEPSEEK_API_KEY,
+            v3_model="Pro/deepseek-ai/DeepSeek-V3", r1_model="Pro/deepseek-ai/DeepSeek-R1"))
+        self.level1_latency = LatencyTracker()
+        self._hedge_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hedge")
+        # 一级分析流式字段回调 hook(新闻, 字段名, 值)，由流水线设置
+        self.level1_field_hook: Optional[Callable[[Dict[str, Any], str, Any], None]] = None
 
     def fetch_latest_news(self, page: int = 1, page_size: int = 20) -> List[Dict[str, Any]]:
         """同步请求新浪财经7x24小时实时新闻接口"""
         try:
-            # 新浪财经7x24页面使用的API参数
-            params = {
-                "page": page,
-                "page_size": page_size,
-                "zhibo_id": 152,  # 财经频道ID
-                "tag_id": 0,      # 0表示全部，10=A股，1=宏观等
-                "dire": "f",      # f=forward向前翻页
-                "dpc": 1,
-                "pagesize": page_size
-            }
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36",
-                "Referer": "https://finance.sina.com.cn/7x24/"
-            }
-            resp = requests.get(SINA_7X24_API, params=params, headers=headers, timeout=10)
+            resp = get_http_session().get(SINA_7X24_API, params=sina_feed_params(page, page_size),
+                                          headers=SINA_HEADERS, timeout=10)
             resp.raise_for_status()
-            data = resp.json()
-            
-            # 提取新闻列表
-            result = data.get("result", {})
-            if isinstance(result, dict):
-                news_list = result.get("data", {}).get("feed", {}).get("list", [])
-            else:
-                news_list = []
-            
-            # 格式化为统一结构
-            formatted_news = []
-            for item in news_list:
-                if isinstance(item, dict):
-                    formatted_news.append({
-                        "id": item.get("id") or item.get("docid"),
-                        "title": item.get("rich_text") or item.get("title", ""),
-                        "content": item.get("rich_text") or item.get("content", ""),
-                        "create_time": item.get("create_time", ""),
-                        "source": "新浪财经7x24"
-                    })
-            
-            return formatted_news if formatted_news else []
+            return parse_sina_feed(resp.json())
         except Exception as e:
-            print(f"抓取新闻失败: {str(e)}")
+            get_event_log().emit('fetch_error', 'fetch', ERROR, outcome='error', error=str(e))
             return []
 
-    def call_deepseek(self, prompt: str, max_tokens: int = 800, use_reasoning: bool = False) -> Dict[str, Any]:
+    def call_deepseek(self, prompt: str, max_tokens: int = 800, use_reasoning: bool = False,
+                      on_event: Optional[Callable[[str, Any], None]] = None, hedge: bool = False,
+                      timeout: Optional[float] = None) -> Dict[str, Any]:
         """调用 DeepSeek 接口，返回解析后的 JSON（如果能解析）或原始文本
         
         Args:
             prompt: 提示词
             max_tokens: 最大token数
             use_reasoning: 是否使用推理模型R1（慢但深度思考），默认使用V3（快速）
+            on_event: 传入时以 SSE 流式方式调用，边接收边回调 on_event(类型, 数据)：
+                'reasoning' 推理过程片段、'token' 正文片段、'field' 顶层 JSON 字段 (名, 值) 刚完整
+            hedge: 一级分析对冲模式（仅对 V3 生效）
+            timeout: 总时限（秒），覆盖重试与流式读取；到期返回 {"error": ...}
         """
-        headers = {
-            "Authorization": f"Bearer {DEEPSEEK_API_KEY}",
-            "Content-Type": "application/json",
-        }
-        
         # 根据参数选择模型
         # DeepSeek-V3: 快速响应（5-10秒），适合高频调用
         # DeepSeek-R1: 深度推理（30-120秒），适合复杂分析
-        model = "Pro/deepseek-ai/DeepSeek-R1" if use_reasoning else "Pro/deepseek-ai/DeepSeek-V3"
-        timeout = 120 if use_reasoning else 30  # R1需要更长超时
+        call = LLMCall(self.endpoints, self.level1_latency, prompt, max_tokens, use_reasoning, timeout)
         
-        payload = {
-            "model": model,
-            "messages": [{"role": "user", "content": prompt}],
-            "max_tokens": max_tokens,
-            "temperature": 0.7,  # 适当的随机性
-        }
+        # 先查响应缓存：重复或近似转发的快讯直接复用之前的分析结果
+        cached = call.cached()
+        if cached is not None:
+            if on_event is not None and isinstance(cached.get("parsed"), dict):
+                for field in cached["parsed"].items():
+                    self._notify(on_event, "field", field)
+            return cached
         
-        # 重试2次（减少重试次数，避免长时间等待）
-        max_retries = 2
-        for attempt in range(max_retries):
+        if hedge and not use_reasoning and call.hedgeable():
+            result = self._call_hedged(call, on_event)
+        else:
+            result = self._call_with_failover(call, call.endpoints, on_event)
+        return call.store(result)
+
+    def _call_with_failover(self, call: LLMCall, endpoints: List[Endpoint],
+                            on_event: Optional[Callable[[str, Any], None]],
+                            cancel: Optional[threading.Event] = None) -> Dict[str, Any]:
+        """按 call.plan 的顺序依次尝试各端点"""
+        result = LLMCall.no_endpoint()
+        for endpoint, attempts, next_endpoint in call.plan(endpoints):
+            if call.expired():
+                return call.deadline_error()
+            result = self._call_endpoint(call, endpoint, attempts, on_event, cancel)
+            if "error" not in result or (cancel is not None and cancel.is_set()):
+                return result
+            call.failover(endpoint, next_endpoint, result)
+        return result
+
+    def _call_hedged(self, call: LLMCall, on_event: Optional[Callable[[str, Any], None]]) -> Dict[str, Any]:
+        """一级分析对冲请求：超过近期 p95 延迟仍未拿到合法 JSON 时，向次优端点补发一次，先返回合法 JSON 者胜出"""
+        router = EventRouter(on_event)
+        cancels = [threading.Event(), threading.Event()]
+        first = self._hedge_pool.submit(self._call_with_failover, call, call.endpoints,
+                                        router.for_attempt(0), cancels[0])
+        futures = {first: 0}
+        done, _ = wait([first], timeout=call.hedge_delay())
+        if first in done and "parsed" in first.result():
+            return first.result()
+
+        # 主请求超时未返回或返回不可用：补发（本轮补发次数用完时继续等主请求）
+        alternate = call.hedge()
+        if alternate is None:
+            return first.result()
+        futures[self._hedge_pool.submit(self._call_with_failover, call, alternate,
+                                        router.for_attempt(1), cancels[1])] = 1
+        pending = set(futures) - set(done)
+        results: Dict[int, Dict[str, Any]] = {}
+        for f in done:
+            results[futures[f]] = f.result()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for f in done:
+                idx = futures[f]
+                results[idx] = f.result()
+                if "parsed" in results[idx]:
+                    for other in pending:
+                        cancels[futures[other]].set()
+                    call.hedge_won(idx)
+                    return results[idx]
+        return LLMCall.hedge_fallback(results)
+
+    def _call_endpoint(self, call: LLMCall, endpoint: Endpoint, attempts: int,
+                       on_event: Optional[Callable[[str, Any], None]],
+                       cancel: Optional[threading.Event] = None) -> Dict[str, Any]:
+        """在单个端点上调用（requests 传输；限流记账与退避重试由 LLMCall/Attempt 决定）"""
+        stream = on_event is not None
+        url, headers, payload = call.request(endpoint, stream)
+        budget = call.budget(endpoint)
+        last_error = "未知错误"
+        for attempt in range(attempts):
+            if call.expired():
+                return call.deadline_error()
+            att = call.attempt(endpoint, budget.acquire(call.est_tokens))
             try:
-                r = requests.post(
-                    DEEPSEEK_API_URL + "/chat/completions", 
-                    headers=headers, 
-                    json=payload, 
-                    timeout=timeout
-                )
-                r.raise_for_status()
-                res = r.json()
-                
-                # deepseek 返回的主文本通常在 choices[0].message.content
-                content = None
+                r = get_http_session().post(url, headers=headers, json=payload, timeout=call.request_timeout(),
+                                            stream=stream)
                 try:
-                    content = res.get("choices", [])[0].get("message", {}).get("content")
-                except Exception:
-                    content = None
-                
-                if not content:
-                    # 兜底：将整个响应转为字符串
-                    return {"raw": res}
-                
-                # 清理可能的markdown代码块标记
-                content_cleaned = content.strip()
+                    if att.http_status(r.status_code, r.headers.get("Retry-After")):
+                        continue
+                    r.raise_for_status()
+                    if stream:
+                        content, res = self._read_stream(r, on_event, cancel, call.deadline)
+                    else:
+                        res = r.json()
+                        content = message_content(res)
+                    att.usage(res)
+                finally:
+                    r.close()
                 
-                # 移除 ```json 和 ``` 标记
-                if content_cleaned.startswith('```json'):
-                    content_cleaned = content_cleaned[7:]  # 移除开头的 ```json
-                elif content_cleaned.startswith('```'):
-                    content_cleaned = content_cleaned[3:]  # 移除开头的 ```
-                
-                if content_cleaned.endswith('```'):
-                    content_cleaned = content_cleaned[:-3]  # 移除结尾的 ```
-                
-                content_cleaned = content_cleaned.strip()
-                
-                # 尝试解析为 JSON
-                try:
-                    parsed = json.loads(content_cleaned)
-                    return {"parsed": parsed, "raw_text": content}
-                except json.JSONDecodeError as e:
-                    # JSON解析失败，返回原始文本
-                    return {"raw_text": content, "parse_error": str(e)}
-                except Exception as e:
-                    return {"raw_text": content, "error": str(e)}
-                    
+                # 对冲中已被另一请求抢先：结果作废，不计入端点健康度
+                if cancel is not None and cancel.is_set():
+                    att.cancelled = True
+                    return {"error": "对冲请求已取消"}
+                return att.result(content, res)
             except requests.exceptions.Timeout:
-                if attempt < max_retries - 1:
-                    wait_time = 3 if use_reasoning else 1  # R1重试等待更久
-                    print(f"⏱️ API超时，{wait_time}秒后重试 ({attempt + 1}/{max_retries - 1})...")
-                    time.sleep(wait_time)
-                    continue
-                else:
-                    model_name = "DeepSeek-R1(推理模型)" if use_reasoning else "DeepSeek-V3"
-                    return {"error": f"{model_name}请求超时（已重试{max_retries}次）"}
+                att.timed_out(attempt)
+            except requests.exceptions.ConnectionError as e:
+                att.connection_error(e)
             except Exception as e:
-                return {"error": str(e)}
+                return att.fatal(e)
+            finally:
+                att.finish()
+                last_error = att.error or last_error
+                wait_time = None if cancel is not None and cancel.is_set() else att.retry_delay(attempt, attempts)
+                if wait_time is not None:
+                    time.sleep(wait_time)
         
-        return {"error": "未知错误"}
+        return {"error": last_error}
+
+    def _read_stream(self, r, on_event: Callable[[str, Any], None], cancel: Optional[threading.Event] = None,
+                     deadline: Optional[float] = None):
+        """逐行读取 chat/completions 的 SSE 流，返回 (完整正文, 推理摘要)
+
+        requests 的 timeout 只限制单次读取的间隔，持续输出的流需要按总时限 deadline 主动中止
+        """
+        r.encoding = "utf-8"
+        parser = IncrementalJSONParser()
+        parts: List[str] = []
+        reasoning_chars = 0
+        usage = None
+        for line in r.iter_lines(decode_unicode=True):
+            if cancel is not None and cancel.is_set():
+                break
+            if deadline is not None and time.monotonic() > deadline:
+                raise requests.exceptions.ReadTimeout("流式读取超过总时限")
+            if not line or not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
+            try:
+                chunk = json.loads(data)
+            except ValueError:
+                continue
+            usage = chunk.get("usage") or usage
+            choices = chunk.get("choices") or []
+            if not choices:
+                continue
+            delta = choices[0].get("delta") or {}
+            reasoning = delta.get("reasoning_content")
+            if reasoning:
+                reasoning_chars += len(reasoning)
+                self._notify(on_event, "reasoning", reasoning)
+            text = delta.get("content")
+            if text:
+                parts.append(text)
+                self._notify(on_event, "token", text)
+                for field in parser.feed(text):
+                    self._notify(on_event, "field", field)
+        return "".join(parts), {"stream": True, "reasoning_chars": reasoning_chars, "usage": usage}
+
+    @staticmethod
+    def _notify(on_event: Callable[[str, Any], None], kind: str, data: Any):
+        # 回调异常不能打断流式读取
+        try:
+            on_event(kind, data)
+        except Exception as e:
+            get_event_log().emit('stream_callback_error', 'llm', ERROR, outcome='error', error=str(e))
 
     def level1_prompt(self, title: str, content: str) -> str:
         return f"""
@@ -166,6 +290,7 @@ class RealTimeManager:
 
 {{
   "impact": "是/否",
+  "impact_strength": "强/中/弱",
   "affected_sectors": ["板块1", "板块2"],
   "reason": "200字以内的详细说明，包括影响逻辑和市场预期"
 }}
@@ -178,9 +303,103 @@ class RealTimeManager:
 请确保分析客观准确，避免过度解读。
 """
 
+    def analyze_level1(self, item: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """对单条新闻做一级分析（强制使用V3快速模型）；设置了 level1_field_hook 时流式调用"""
+        title = item.get('title', '')
+        content = item.get('content', title)  # 如果没有content，使用title
+        hook = self.level1_field_hook
+        on_event = None
+        if DEEPSEEK_STREAM and hook is not None:
+            def on_event(kind: str, data: Any):
+                if kind == 'field':
+                    hook(item, *data)
+        return self.call_deepseek(self.level1_prompt(title, content), max_tokens=500, use_reasoning=False,
+                                  on_event=on_event, hedge=LEVEL1_HEDGE, timeout=timeout)
+
+    def split_level1_batches(self, items: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """按条数和总字数把新闻切分成多个批次，避免超出上下文长度"""
+        batches: List[List[Dict[str, Any]]] = []
+        current: List[Dict[str, Any]] = []
+        chars = 0
+        for item in items:
+            size = min(len(item.get('content') or item.get('title') or ''), LEVEL1_BATCH_ITEM_CHARS)
+            if current and (len(current) >= LEVEL1_BATCH_SIZE or chars + size > LEVEL1_BATCH_MAX_CHARS):
+                batches.append(current)
+                current, chars = [], 0
+            current.append(item)
+            chars += size
+        if current:
+            batches.append(current)
+        return batches
+
+    def level1_batch_prompt(self, items: List[Dict[str, Any]]) -> str:
+        lines = []
+        for i, item in enumerate(items, 1):
+            title = item.get('title', '')
+            content = (item.get('content') or title)[:LEVEL1_BATCH_ITEM_CHARS]
+            if content.startswith(title[:20]):
+                lines.append(f"[{i}] {content}")
+            else:
+                lines.append(f"[{i}] 标题：{title[:100]} 内容：{content}")
+        news_block = "\n".join(lines)
+        return f"""
+【分析任务】
+以下是 {len(items)} 条财经快讯，请逐条判断是否会对2025年A股特定板块产生显著影响。
+
+【新闻列表】
+{news_block}
+
+【分析要求】
+1. 快速识别每条新闻影响的具体板块（如：新能源、半导体、医药、消费等）
+2. 基于2025年当前市场环境，判断该影响是否显著
+3. 严格按照以下JSON数组格式返回，每条新闻一个对象，idx 与新闻编号一致（注意：只返回纯JSON，不要用markdown代码块包裹）：
+
+[
+  {{"idx": 1, "impact": "是/否", "impact_strength": "强/中/弱", "affected_sectors": ["板块1"], "reason": "100字以内的说明"}}
+]
+
+【判断标准】
+- 返回"是"的情况：政策重大变化、行业重大突破、供需关系显著改变、龙头企业重大事件
+- 返回"否"的情况：常规行业动态、已有预期的事件、影响范围有限的消息
+
+⚠️ 重要：直接返回JSON数组，不要用```json或```包裹，不要添加任何解释文字。
+"""
+
+    def analyze_level1_batch(self, items: List[Dict[str, Any]],
+                             timeout: Optional[float] = None) -> List[Optional[Dict[str, Any]]]:
+        """一次请求完成多条新闻的一级分析
+
+        返回与 items 等长的列表，元素格式与 call_deepseek 一致；
+        批量结果缺失或格式不对的条目为 None，由调用方逐条重试。
+        """
+        if not items:
+            return []
+        res = self.call_deepseek(self.level1_batch_prompt(items),
+                                 max_tokens=min(4000, 200 * len(items) + 100), use_reasoning=False,
+                                 timeout=timeout)
+        parsed = res.get('parsed')
+        if isinstance(parsed, dict):
+            parsed = parsed.get('results') or parsed.get('items')
+        results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+        if not isinstance(parsed, list):
+            return results
+        for pos, entry in enumerate(parsed):
+            if not isinstance(entry, dict) or entry.get('impact') not in ('是', '否'):
+                continue
+            try:
+                idx = int(entry.get('idx', pos + 1)) - 1
+            except (TypeError, ValueError):
+                continue
+            if 0 <= idx < len(items) and results[idx] is None:
+                fields = {k: v for k, v in entry.items() if k != 'idx'}
+                fields.setdefault('affected_sectors', [])
+                fields.setdefault('reason', '')
+                results[idx] = {'parsed': fields, 'batched': True}
+        return results
+
     def level2_prompt(self, title: str, affected_sectors: List[str], impact_reason: str, real_time_data: Dict[str, Any]) -> str:
-        # 把实时行情数据序列化为短文本供模型参考
-        rt = json.dumps(real_time_data, ensure_ascii=False)
+        # 候选股行情编码为紧凑的 CSV 块（只保留决策相关列，受 token 预算约束）
+        rt = self.encode_real_time_data(real_time_data)
         return f"""
 你是一个资深的A股量化策略师，需要基于新闻影响和实时行情数据制定具体操作策略。
 
@@ -189,7 +408,7 @@ class RealTimeManager:
 影响板块：{affected_sectors}
 影响原因：{impact_reason}
 
-【实时行情数据】
+【实时行情数据】（CSV；涨幅/换手/振幅单位%，成交额/市值单位亿元）
 {rt}
 
 【分析要求】
@@ -222,37 +441,47 @@ class RealTimeManager:
 请基于实时数据给出具体可执行的操作建议。
 """
 
-    def pick_candidate_stocks(self, num: int = 5) -> List[Dict[str, Any]]:
-        """从 AkShare 获取全市场实时数据并挑选候选股票（按换手率或涨跌幅等）"""
+    def encode_real_time_data(self, real_time_data: Dict[str, Any]) -> str:
+        """candidates 与行情表合并后编码为 CSV，其余字段按紧凑 JSON 附在后面"""
+        candidates = real_time_data.get('candidates')
+        extra = {k: v for k, v in real_time_data.items() if k != 'candidates'}
+        parts = []
+        if isinstance(candidates, list) and candidates:
+            codes = [c.get('code') or c.get('代码') or '' for c in candidates]
+            rows = merge_candidates(candidates, self.get_stocks_realtime(codes))
+            parts.append(encode_market_context(rows))
+        if extra or not parts:
+            parts.append(json.dumps(extra, ensure_ascii=False, separators=(',', ':'), default=str))
+        return "\n".join(parts)
+
+    def pick_candidate_stocks(self, num: int = 5, sectors: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """从共享行情表中挑选候选股票（按换手率，缺失时按绝对涨跌幅；剔除ST/停牌/涨停）
+
+        传入 sectors（一级分析的 affected_sectors）时只在对应板块成分股中筛选，
+        板块无法匹配或成分股全部被过滤时退回全市场筛选。
+        """
         try:
-            df = ak.stock_zh_a_spot_em()
-            # 按换手率列名可能为 '换手率'，如果不存在则按绝对涨跌幅
-            if '换手率' in df.columns:
-                df2 = df.sort_values(by='换手率', ascending=False).head(num)
-            elif '涨跌幅' in df.columns:
-                df2 = df.reindex(df['涨跌幅'].abs().sort_values(ascending=False).index).head(num)
-            else:
-                df2 = df.head(num)
-            res = []
-            for _, row in df2.iterrows():
-                res.append({
-                    'code': str(row.get('代码') or row.get('股票代码') or row.get('code')),
-                    'name': str(row.get('名称') or row.get('股票名称') or row.get('name')),
-                    'price': str(row.get('最新价') or row.get('现价') or row.get('price')),
-                })
-            return res
+            store = get_quote_store()
+            if sectors:
+                universe = get_sector_index().codes_for(sectors)
+                if universe:
+                    picked = self.screener.screen(store, num, universe=universe)
+                    if picked:
+                        return picked
+            return self.screener.screen(store, num)
         except Exception:
             return []
 
     def get_stock_realtime(self, stock_code: str) -> Dict[str, Any]:
-        """获取单只股票的实时数据（尽量使用akshare的现有接口）"""
+        """获取单只股票的实时数据（按代码索引的行情表，O(1) 查询）"""
+        try:
+            return get_quote_store().get(stock_code)
+        except Exception:
+            return {}
+
+    def get_stocks_realtime(self, stock_codes: List[str]) -> Dict[str, Dict[str, Any]]:
+        """批量获取多只股票的实时数据，返回 {代码: 行情}"""
         try:
-            df = ak.stock_zh_a_spot_em()
-            row = df[df['代码'] == stock_code]
-            if row.empty:
-                # 有些code需带市场前缀，如 600000 -> 600000
-                return {}
-            r = row.iloc[0].to_dict()
-            return r
+            return get_quote_store().get_many(stock_codes)
         except Exception:
             return {}
@@ -0,0 +1,298 @@
+"""
+一级分析前的本地相关度预筛
+
+用关键词/板块词典打分（可选叠加基于历史一级分析结果训练的 TF-IDF + 逻辑回归模型），
+只把相关度达到阈值的新闻交给 DeepSeek，明显无关的快讯（体育、天气、海外琐事等）直接跳过。
+
+词典覆盖有限（如海外公司、大宗商品、海外经济数据常常得 0 分），因此默认关闭：
+    PREFILTER_MODE=shadow   只打分不拦截，所有新闻照常分析，一级结论连同相关度一起记为样本
+    PREFILTER_MODE=enforce  拦截低于阈值的新闻，但按 PREFILTER_SAMPLE_RATE 抽样放行一部分，
+                            使被拦截的一侧也有样本（评估时按抽样率加权，召回率才有意义）
+建议先以 shadow 模式积累样本、评估召回率满意后再启用 enforce。
+
+离线评估（在 src 目录下运行）:
+    python -m services.relevance_filter evaluate            # 各阈值下对历史"是"样本的召回率
+    python -m services.relevance_filter train               # 训练可选模型（需要 scikit-learn）
+样本按记录时间排序，最近的 PREFILTER_TEST_RATIO 部分留作测试集：train 只用较早的样本训练，
+evaluate 只在留出的最新样本上计算指标，避免用训练数据评估。
+
+模型文件带格式版本和 HMAC-SHA256 摘要（密钥为 PREFILTER_MODEL_KEY），校验通过后才反序列化；
+不是本模块 train 写出的文件一律忽略。
+"""
+import os
+import re
+import hmac
+import json
+import math
+import hashlib
+import pickle
+import random
+import argparse
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from services.event_log import WARNING, get_event_log
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# off / shadow / enforce，见模块说明
+PREFILTER_MODE = os.getenv("PREFILTER_MODE", "off").strip().lower()
+PREFILTER_ENABLED = PREFILTER_MODE in ("shadow", "enforce")
+# enforce 模式下低于阈值的新闻仍被放行分析的比例（用于获得被拦截一侧的标注样本）
+PREFILTER_SAMPLE_RATE = float(os.getenv("PREFILTER_SAMPLE_RATE", "0.05"))
+PREFILTER_THRESHOLD = float(os.getenv("PREFILTER_THRESHOLD", "0.2"))
+PREFILTER_LABELS_PATH = os.getenv("PREFILTER_LABELS_PATH", os.path.join(PROJECT_ROOT, "data", "level1_labels.jsonl"))
+PREFILTER_MODEL_PATH = os.getenv("PREFILTER_MODEL_PATH", os.path.join(PROJECT_ROOT, "data", "relevance_model.pkl"))
+# 模型文件签名密钥；未设置时只能发现损坏或格式不符的文件，设置后可防篡改
+PREFILTER_MODEL_KEY = os.getenv("PREFILTER_MODEL_KEY", "relevance-filter")
+# 按时间留作测试集的最新样本比例
+PREFILTER_TEST_RATIO = float(os.getenv("PREFILTER_TEST_RATIO", "0.2"))
+
+# 模型文件格式：魔数+版本行、HMAC 摘要行（十六进制），之后是 pickle 数据
+_MODEL_MAGIC = b"relevance-model/1\n"
+
+# 与A股相关的词及权重
+POSITIVE_TERMS: Dict[str, float] = {
+    # 政策与监管
+    '国务院': 3, '央行': 3, '人民银行': 3, '证监会': 3, '发改委': 3, '工信部': 3, '财政部': 3, '商务部': 2,
+    '金融监管': 3, '降准': 3, '降息': 3, 'LPR': 3, '逆回购': 2, '专项债': 2, '关税': 3, '出口管制': 3,
+    '政策': 2, '规划': 2, '补贴': 2, '监管': 2, '印发': 2, '通知': 1,
+    '美联储': 2, '社融': 2, 'PMI': 2, 'CPI': 1, 'GDP': 1, '人民币': 1, '汇率': 1,
+    # 市场与公司
+    'A股': 3, '沪指': 3, '深成指': 3, '创业板': 3, '科创板': 3, '北向资金': 3, '涨停': 3, '跌停': 3,
+    '板块': 2, '概念股': 3, '龙头': 2, '股份': 2, '集团': 1, '公司': 1, '上市': 2, '公告': 2, '停牌': 2,
+    '业绩': 2, '净利润': 2, '营收': 2, '订单': 2, '中标': 2, '并购': 3, '重组': 3, '回购': 2, '增持': 2, '减持': 2,
+    '亿元': 1, '同比': 1, '增长': 1, '产能': 2, '量产': 2, '涨价': 2, '提价': 2, '减产': 2, '价格': 1,
+    # 行业
+    '半导体': 2, '芯片': 2, '光刻': 2, '算力': 2, '人工智能': 2, 'AI': 1, '机器人': 2, '新能源': 2, '光伏': 2,
+    '锂电': 2, '储能': 2, '电池': 2, '汽车': 1, '医药': 2, '创新药': 2, '医疗': 1, '军工': 2, '低空': 2,
+    '稀土': 2, '有色': 2, '黄金': 1, '原油': 1, '煤炭': 2, '钢铁': 2, '地产': 2, '房地产': 2, '券商': 2,
+    '银行': 1, '保险': 1, '消费': 1, '白酒': 2, '游戏': 1, '通信': 1, '5G': 1,
+}
+
+# 与A股基本无关的话题
+NEGATIVE_TERMS: Dict[str, float] = {
+    '足球': 3, '篮球': 3, 'NBA': 3, '比赛': 2, '球队': 3, '赛季': 2, '奥运': 2, '世界杯': 3,
+    '天气': 2, '气温': 2, '降雨': 1, '娱乐': 2, '明星': 2, '电影': 1, '票房': 1, '综艺': 3,
+    '交通事故': 2, '枪击': 2, '选举': 1, '王室': 3,
+}
+
+
+def _compile(terms: Iterable[str]) -> re.Pattern:
+    return re.compile('|'.join(sorted((re.escape(t) for t in terms), key=len, reverse=True)))
+
+
+def _text(item: Dict[str, Any]) -> str:
+    title = item.get('title', '') or ''
+    content = item.get('content', '') or ''
+    return content if content.startswith(title[:20]) else f"{title} {content}"
+
+
+class RelevanceFilter:
+    """本地相关度打分器：词典打分，可选与训练模型取较大值（偏向召回）"""
+
+    def __init__(self, threshold: float = PREFILTER_THRESHOLD, labels_path: str = PREFILTER_LABELS_PATH,
+                 model_path: str = PREFILTER_MODEL_PATH, mode: str = PREFILTER_MODE,
+                 sample_rate: float = PREFILTER_SAMPLE_RATE):
+        self.threshold = threshold
+        self.shadow = mode != "enforce"
+        self.sample_rate = min(1.0, max(0.0, sample_rate))
+        self.labels_path = labels_path
+        self.model_path = model_path
+        self._pos_re = _compile(POSITIVE_TERMS)
+        self._neg_re = _compile(NEGATIVE_TERMS)
+        self._lock = threading.Lock()
+        self.model = self._load_model()
+        self.forwarded = 0
+        self.below_threshold = 0  # 低于阈值的条数（含 shadow 模式下照常放行的和抽样放行的）
+        self.sampled = 0
+        self.skipped = 0
+        # 已放行新闻 id -> (相关度, 样本权重)，在 record() 时写入样本
+        self._pending: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def _load_model(self):
+        return load_model(self.model_path)
+
+    def lexicon_score(self, text: str) -> float:
+        pos = sum(POSITIVE_TERMS[m] for m in self._pos_re.findall(text))
+        neg = sum(NEGATIVE_TERMS[m] for m in self._neg_re.findall(text))
+        s = pos - 2 * neg
+        return 0.0 if s <= 0 else 1 - math.exp(-s / 3)
+
+    def score(self, item: Dict[str, Any]) -> float:
+        text = _text(item)
+        score = self.lexicon_score(text)
+        if self.model is not None:
+            try:
+                score = max(score, float(self.model.predict_proba([text])[0][1]))
+            except Exception:
+                pass
+        return score
+
+    def check(self, item: Dict[str, Any]) -> Tuple[bool, float]:
+        """返回 (是否需要交给 DeepSeek 做一级分析, 相关度)"""
+        score = self.score(item)
+        weight = 1.0
+        if score < self.threshold:
+            self.below_threshold += 1
+            if not self.shadow:
+                if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+                    self.skipped += 1
+                    return False, score
+                self.sampled += 1
+                weight = 1 / self.sample_rate
+        self.forwarded += 1
+        with self._lock:
+            self._pending[str(item.get('id', ''))] = (score, weight)
+            while len(self._pending) > 10000:
+                self._pending.popitem(last=False)
+        return True, score
+
+    def record(self, item: Dict[str, Any], impact: str):
+        """记录一级分析结论，作为训练/评估样本（附带放行时的相关度和抽样权重）"""
+        with self._lock:
+            score, weight = self._pending.pop(str(item.get('id', '')), (None, 1.0))
+        if impact not in ('是', '否'):
+            return
+        line = json.dumps({'id': str(item.get('id', '')), 'text': _text(item), 'impact': impact,
+                           'score': score, 'weight': weight}, ensure_ascii=False)
+        with self._lock:
+            os.makedirs(os.path.dirname(self.labels_path), exist_ok=True)
+            with open(self.labels_path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+
+def _model_digest(payload: bytes) -> bytes:
+    return hmac.new(PREFILTER_MODEL_KEY.encode('utf-8'), _MODEL_MAGIC + payload, hashlib.sha256).hexdigest().encode()
+
+
+def save_model(model: Any, model_path: str = PREFILTER_MODEL_PATH):
+    payload = pickle.dumps(model)
+    os.makedirs(os.path.dirname(model_path) or '.', exist_ok=True)
+    tmp = model_path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(_MODEL_MAGIC + _model_digest(payload) + b"\n" + payload)
+    os.replace(tmp, model_path)
+
+
+def load_model(model_path: str = PREFILTER_MODEL_PATH) -> Optional[Any]:
+    """读取 save_model 写出的模型；文件不存在返回 None，格式或摘要不符时拒绝加载（不反序列化）"""
+    try:
+        with open(model_path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    header, _, rest = data.partition(b"\n")
+    digest, _, payload = rest.partition(b"\n")
+    if header + b"\n" != _MODEL_MAGIC or not hmac.compare_digest(digest, _model_digest(payload)):
+        get_event_log().emit('prefilter_model_rejected', 'prefilter', WARNING, outcome='error', path=model_path)
+        return None
+    try:
+        return pickle.loads(payload)
+    except (pickle.UnpicklingError, ImportError, AttributeError, EOFError) as e:
+        get_event_log().emit('prefilter_model_rejected', 'prefilter', WARNING, outcome='error', path=model_path,
+                             error=str(e))
+        return None
+
+
+def load_labels(path: str = PREFILTER_LABELS_PATH) -> List[Dict[str, Any]]:
+    records: Dict[str, Dict[str, Any]] = {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    r = json.loads(line)
+                except ValueError:
+                    continue
+                records[r.get('id') or r.get('text', '')] = r
+    except OSError:
+        pass
+    return list(records.values())
+
+
+def split_holdout(records: List[Dict[str, Any]],
+                  test_ratio: float = PREFILTER_TEST_RATIO) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """按记录顺序（即时间顺序）切分：较早的样本用于训练，最新的 test_ratio 部分留作测试集"""
+    n_test = min(len(records), max(1, int(round(len(records) * test_ratio)))) if records else 0
+    return records[:len(records) - n_test], records[len(records) - n_test:]
+
+
+def evaluate(flt: RelevanceFilter, records: List[Dict[str, Any]], thresholds: Iterable[float]) -> List[Dict[str, Any]]:
+    """各阈值下的召回率（历史"是"样本被放行的比例）、精确率和放行比例
+
+    样本按 weight 加权：enforce 模式下抽样放行的低分样本代表了 1/抽样率 条被拦截的新闻。
+    只有在 shadow 模式或抽样放行下积累过低分样本时，召回率才反映真实的漏判情况。
+    """
+    scored = [(flt.score({'content': r['text']}), r['impact'] == '是', float(r.get('weight') or 1.0))
+              for r in records]
+    positives = sum(w for _, y, w in scored if y)
+    total = sum(w for _, _, w in scored)
+    rows = []
+    for t in thresholds:
+        kept = [(y, w) for s, y, w in scored if s >= t]
+        kept_weight = sum(w for _, w in kept)
+        tp = sum(w for y, w in kept if y)
+        rows.append({
+            'threshold': t,
+            'recall': tp / positives if positives else None,
+            'precision': tp / kept_weight if kept else None,
+            'forwarded_ratio': kept_weight / total if scored else None,
+        })
+    return rows
+
+
+def train(records: List[Dict[str, Any]], model_path: str = PREFILTER_MODEL_PATH):
+    """用历史一级分析结论训练 TF-IDF(字符 n-gram) + 逻辑回归模型（需要 scikit-learn）"""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import make_pipeline
+
+    texts = [r['text'] for r in records]
+    labels = [1 if r['impact'] == '是' else 0 for r in records]
+    model = make_pipeline(TfidfVectorizer(analyzer='char', ngram_range=(2, 3), min_df=2, sublinear_tf=True),
+                          LogisticRegression(class_weight='balanced', max_iter=1000))
+    model.fit(texts, labels)
+    save_model(model, model_path)
+    return model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="一级分析本地预筛：训练与离线评估")
+    parser.add_argument('command', choices=['evaluate', 'train'])
+    parser.add_argument('--labels', default=PREFILTER_LABELS_PATH, help="历史一级分析结论 JSONL")
+    parser.add_argument('--model', default=PREFILTER_MODEL_PATH, help="模型文件路径")
+    parser.add_argument('--thresholds', default="0.05,0.1,0.2,0.3,0.4,0.5", help="逗号分隔的阈值列表")
+    parser.add_argument('--test-ratio', type=float, default=PREFILTER_TEST_RATIO, help="按时间留作测试集的最新样本比例")
+    args = parser.parse_args()
+
+    records = load_labels(args.labels)
+    if not records:
+        print(f"❌ 没有可用的历史样本: {args.labels}")
+        return
+    train_records, test_records = split_holdout(records, args.test_ratio)
+    positives = sum(1 for r in test_records if r['impact'] == '是')
+    print(f"📊 样本 {len(records)} 条：训练集 {len(train_records)} 条，测试集（最新）{len(test_records)} 条，"
+          f"其中有影响 {positives} 条")
+    low = sum(1 for r in test_records if r.get('score') is not None and r['score'] < PREFILTER_THRESHOLD)
+    if not low:
+        print("⚠️ 测试集中没有低于阈值的新闻（只记录了被放行的新闻），召回率会被高估；请先用 PREFILTER_MODE=shadow 积累样本")
+
+    if args.command == 'train':
+        if not train_records:
+            print("❌ 样本太少，无法在留出测试集后训练")
+            return
+        try:
+            train(train_records, args.model)
+        except ImportError:
+            print("❌ 训练需要 scikit-learn: pip install scikit-learn")
+            return
+        print(f"✅ 模型已保存: {args.model}")
+
+    flt = RelevanceFilter(model_path=args.model)
+    print(f"{'阈值':>6} {'召回率':>8} {'精确率':>8} {'放行比例':>8}  （测试集）")
+    for row in evaluate(flt, test_records, [float(t) for t in args.thresholds.split(',')]):
+        fmt = lambda v: f"{v:.3f}" if v is not None else "-"
+        print(f"{row['threshold']:>6.2f} {fmt(row['recall']):>8} {fmt(row['precision']):>8} {fmt(row['forwarded_ratio']):>8}")
+
+
+if __name__ == '__main__':
+    main()
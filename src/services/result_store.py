@@ -0,0 +1,112 @@
+import os
+import json
+import time
+import threading
+from typing import Any, Dict, List, Optional
+from services.event_log import EventLog, get_event_log
+from services.ring_buffer import FileSpill, RingBuffer
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+PIPELINE_STATE_PATH = os.getenv("PIPELINE_STATE_PATH", os.path.join(PROJECT_ROOT, "data", "pipeline_state.json"))
+# 导出给界面的每类记录条数
+STORE_VIEW_LIMIT = int(os.getenv("STORE_VIEW_LIMIT", "100"))
+# 内存中保留的条数上限，更早的条目落盘到 STORE_SPILL_DIR（分析结果另有数据库持久化）
+STORE_ANALYSIS_CAP = int(os.getenv("STORE_ANALYSIS_CAP", "500"))
+STORE_RECOMMENDATION_CAP = int(os.getenv("STORE_RECOMMENDATION_CAP", "200"))
+STORE_SPILL_DIR = os.getenv("STORE_SPILL_DIR", os.path.join(PROJECT_ROOT, "data", "history"))
+
+
+class ResultStore:
+    """分析流水线的共享结果存储
+
+    流水线线程写入一级分析结果、操作推荐和运行状态，运行日志来自结构化事件流（EventLog）；
+    同进程的界面直接读 snapshot()，独立 worker 进程则通过 flush() 原子写入 JSON 文件，
+    界面用 load_snapshot() 只读加载。
+    """
+
+    def __init__(self, path: str = PIPELINE_STATE_PATH, events: Optional[EventLog] = None):
+        self.path = path
+        self._lock = threading.RLock()
+        self.events = events or get_event_log()
+        self.analysis_results: RingBuffer[Dict[str, Any]] = RingBuffer(
+            STORE_ANALYSIS_CAP, FileSpill(os.path.join(STORE_SPILL_DIR, "analysis_results.jsonl")))
+        self.recommendations: RingBuffer[Dict[str, Any]] = RingBuffer(
+            STORE_RECOMMENDATION_CAP, FileSpill(os.path.join(STORE_SPILL_DIR, "recommendations.jsonl")))
+        self.news: List[Dict[str, Any]] = []
+        self.status: Dict[str, Any] = {}
+        # 代表新闻尚未写入结果时先暂存其重复快讯
+        self._pending_duplicates: Dict[str, List[Dict[str, Any]]] = {}
+
+    def add_analysis(self, result: Dict[str, Any]):
+        with self._lock:
+            pending = self._pending_duplicates.pop(str(result.get('news_id', '')), None)
+            if pending:
+                result.setdefault('duplicates', []).extend(pending)
+            self.analysis_results.append(result)
+
+    def link_duplicate(self, rep_id: str, item: Dict[str, Any]):
+        """把近重复快讯挂到其代表新闻的一级分析结果下"""
+        dup = {'news_id': str(item.get('id', '')), 'news_title': item.get('title', ''),
+               'create_time': item.get('create_time', '')}
+        with self._lock:
+            for result in self.analysis_results:
+                if str(result.get('news_id', '')) == rep_id:
+                    result.setdefault('duplicates', []).append(dup)
+                    return
+            self._pending_duplicates.setdefault(rep_id, []).append(dup)
+            if len(self._pending_duplicates) > STORE_VIEW_LIMIT:
+                self._pending_duplicates.pop(next(iter(self._pending_duplicates)))
+
+    def add_recommendation(self, recommendation: Dict[str, Any]):
+        with self._lock:
+            self.recommendations.append(recommendation)
+
+    def set_news(self, news: List[Dict[str, Any]]):
+        with self._lock:
+            self.news = list(news)
+
+    def update_status(self, **kwargs):
+        with self._lock:
+            self.status.update(kwargs)
+            self.status['heartbeat'] = time.time()
+
+    def snapshot(self, limit: int = STORE_VIEW_LIMIT) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'events': self.events.recent(limit),
+                'stage_timing': self.events.stage_stats(),
+                'analysis_results': self.analysis_results.newest(limit),
+                'recommendations': self.recommendations.newest(limit),
+                'news': list(self.news),
+                'status': dict(self.status),
+            }
+
+    def flush(self):
+        """原子写入状态文件，供其他进程中的界面读取"""
+        with self._lock:
+            data = self.snapshot()
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, default=str)
+            os.replace(tmp, self.path)
+
+
+_snapshot_cache: Dict[str, Any] = {'mtime': None, 'data': None}
+
+
+def load_snapshot(path: str = PIPELINE_STATE_PATH) -> Optional[Dict[str, Any]]:
+    """只读加载 worker 写出的状态文件；文件未变化时直接返回上次结果"""
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    if _snapshot_cache['mtime'] == mtime:
+        return _snapshot_cache['data']
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return _snapshot_cache['data']
+    _snapshot_cache.update(mtime=mtime, data=data)
+    return data
@@ -0,0 +1,53 @@
+import os
+import json
+from collections import deque
+from itertools import islice
+from typing import Any, Callable, Deque, Generic, Iterator, List, Optional, TypeVar
+from services.event_log import ERROR, get_event_log
+
+T = TypeVar('T')
+
+
+class RingBuffer(Generic[T]):
+    """定长追加缓冲：O(1) 追加，超出容量时最旧的条目交给 on_evict（如落盘）后丢弃
+
+    读取按"最新在前"的顺序，newest(n) 只遍历前 n 条。
+    """
+
+    def __init__(self, capacity: int, on_evict: Optional[Callable[[T], None]] = None):
+        self.capacity = max(1, capacity)
+        self.on_evict = on_evict
+        self._items: Deque[T] = deque()
+
+    def append(self, item: T):
+        if len(self._items) >= self.capacity:
+            evicted = self._items.popleft()
+            if self.on_evict is not None:
+                try:
+                    self.on_evict(evicted)
+                except Exception as e:
+                    get_event_log().emit('spill_error', 'system', ERROR, outcome='error', error=str(e))
+        self._items.append(item)
+
+    def newest(self, limit: Optional[int] = None) -> List[T]:
+        return list(islice(reversed(self._items), limit))
+
+    def __iter__(self) -> Iterator[T]:
+        """最新在前"""
+        return reversed(self._items)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class FileSpill:
+    """把溢出的条目追加写入文件：字符串原样一行，其余序列化为一行 JSON"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def __call__(self, item: Any):
+        line = item if isinstance(item, str) else json.dumps(item, ensure_ascii=False, default=str)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
@@ -0,0 +1,180 @@
+import os
+import re
+import json
+import time
+import difflib
+import threading
+from typing import Dict, Iterable, List, Optional, Set
+import akshare as ak
+from services.event_log import ERROR, get_event_log
+from services.quote_store import normalize_code
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SECTOR_INDEX_PATH = os.getenv("SECTOR_INDEX_PATH", os.path.join(PROJECT_ROOT, "data", "sector_index.json"))
+SECTOR_INDEX_TTL = float(os.getenv("SECTOR_INDEX_TTL", str(24 * 3600)))
+SECTOR_MATCH_CUTOFF = float(os.getenv("SECTOR_MATCH_CUTOFF", "0.6"))
+
+# 模型输出的板块名常带这些后缀，匹配前去掉
+_SUFFIXES = re.compile(r'(板块|概念股|概念|行业|产业链|产业|指数|相关)$')
+
+
+# 模型常用的口语化板块名 -> 索引中的板块名（均为去后缀后的形式，索引中不存在时不生效）
+_ALIASES = {
+    '芯片': '半导体',
+    '券商': '证券',
+    '白酒': '酿酒',
+    '锂电': '锂电池',
+    '光伏': '光伏设备',
+    '新能源车': '新能源汽车',
+    '地产': '房地产开发',
+    '房地产': '房地产开发',
+}
+
+
+def _normalize_name(name: str) -> str:
+    text = re.sub(r'\s+', '', str(name)).upper()
+    stripped = _SUFFIXES.sub('', text)
+    return stripped or text
+
+
+class SectorIndex:
+    """行业/概念板块 -> 成分股代码 的倒排索引
+
+    数据来自 AkShare 东方财富板块接口，构建较慢（需逐个板块拉取成分股），
+    因此持久化到本地 JSON，并在过期后于后台线程重建；重建期间继续使用旧索引。
+    """
+
+    def __init__(self, path: str = SECTOR_INDEX_PATH, ttl: float = SECTOR_INDEX_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._building = False
+        self.built_at = 0.0
+        self.boards: Dict[str, Set[str]] = {}
+        self._by_key: Dict[str, List[str]] = {}
+        self._match_cache: Dict[str, List[str]] = {}
+        self.load()
+
+    # ---------- 持久化 ----------
+    def load(self) -> bool:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self._install({k: set(v) for k, v in data.get('boards', {}).items()}, data.get('built_at', 0.0))
+            return True
+        except (OSError, ValueError):
+            return False
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'built_at': self.built_at, 'boards': {k: sorted(v) for k, v in self.boards.items()}},
+                      f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def _install(self, boards: Dict[str, Set[str]], built_at: float):
+        by_key: Dict[str, List[str]] = {}
+        for name in boards:
+            by_key.setdefault(_normalize_name(name), []).append(name)
+        with self._lock:
+            self.boards = boards
+            self._by_key = by_key
+            self._match_cache = {}
+            self.built_at = built_at
+
+    # ---------- 构建 ----------
+    def build(self) -> int:
+        """从 AkShare 拉取行业和概念板块成分股，返回板块数量"""
+        boards: Dict[str, Set[str]] = {}
+        for list_fn, cons_fn in ((ak.stock_board_industry_name_em, ak.stock_board_industry_cons_em),
+                                 (ak.stock_board_concept_name_em, ak.stock_board_concept_cons_em)):
+            try:
+                names = list_fn()['板块名称'].tolist()
+            except Exception as e:
+                get_event_log().emit('sector_list_error', 'screen', ERROR, outcome='error', error=str(e))
+                continue
+            for name in names:
+                try:
+                    cons = cons_fn(symbol=name)
+                    codes = {normalize_code(c) for c in cons['代码'].tolist()}
+                except Exception:
+                    continue
+                if codes:
+                    boards.setdefault(name, set()).update(codes)
+        if boards:
+            self._install(boards, time.time())
+            self.save()
+        return len(boards)
+
+    def is_stale(self) -> bool:
+        return not self.boards or time.time() - self.built_at > self.ttl
+
+    def refresh_async(self) -> bool:
+        """索引过期时启动后台重建；已有重建在进行则直接返回"""
+        with self._lock:
+            if self._building or not self.is_stale():
+                return False
+            self._building = True
+
+        def run():
+            try:
+                self.build()
+            finally:
+                with self._lock:
+                    self._building = False
+
+        threading.Thread(target=run, daemon=True).start()
+        return True
+
+    # ---------- 查询 ----------
+    def match(self, sector: str) -> List[str]:
+        """把模型给出的板块名模糊匹配到索引中的板块名
+
+        依次尝试：去后缀后完全相同 -> 别名 -> 子串（只取长度最接近的一组）-> difflib 近似；
+        去后缀后不足 2 个字的名称（如"油"）不做匹配，避免命中大量无关板块。
+        """
+        key = _normalize_name(sector)
+        cached = self._match_cache.get(key)
+        if cached is not None:
+            return cached
+        by_key = self._by_key
+        if len(key) < 2:
+            result = []
+        elif key in by_key:
+            result = list(by_key[key])
+        elif _ALIASES.get(key) in by_key:
+            result = list(by_key[_ALIASES[key]])
+        else:
+            hits = [k for k in by_key if len(k) >= 2 and (key in k or k in key)]
+            if hits:
+                closest = min(abs(len(k) - len(key)) for k in hits)
+                result = [n for k in hits if abs(len(k) - len(key)) == closest for n in by_key[k]]
+            else:
+                close = difflib.get_close_matches(key, list(by_key), n=3, cutoff=SECTOR_MATCH_CUTOFF)
+                result = [n for k in close for n in by_key[k]]
+        self._match_cache[key] = result
+        return result
+
+    def codes_for(self, sectors: Iterable[str]) -> Set[str]:
+        """多个板块名对应成分股的并集"""
+        self.refresh_async()
+        codes: Set[str] = set()
+        for sector in sectors or []:
+            for name in self.match(sector):
+                codes |= self.boards.get(name, set())
+        return codes
+
+
+_sector_index: Optional[SectorIndex] = None
+_sector_index_lock = threading.Lock()
+
+
+def get_sector_index() -> SectorIndex:
+    """返回进程内唯一的板块索引（首次调用时从磁盘加载）"""
+    global _sector_index
+    if _sector_index is None:
+        with _sector_index_lock:
+            if _sector_index is None:
+                _sector_index = SectorIndex()
+    return _sector_index
@@ -0,0 +1,145 @@
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from services.quote_store import QuoteStore
+
+# 逻辑字段 -> 行情接口中可能出现的列名
+COLUMN_ALIASES: Dict[str, Tuple[str, ...]] = {
+    'code': ('代码', '股票代码', 'code'),
+    'name': ('名称', '股票名称', 'name'),
+    'price': ('最新价', '现价', 'price'),
+    'turnover': ('换手率', 'turnover'),
+    'change_pct': ('涨跌幅', 'change_pct'),
+    'volume': ('成交量', 'volume'),
+    'amount': ('成交额', 'amount'),
+}
+
+# 默认打分：有换手率按换手率，否则按绝对涨跌幅
+DEFAULT_WEIGHTS = {'turnover': 1.0}
+FALLBACK_WEIGHTS = {'abs_change': 1.0}
+
+
+@lru_cache(maxsize=32)
+def resolve_columns(columns: Tuple[str, ...]) -> Dict[str, Optional[str]]:
+    """按快照列结构解析一次字段别名，同一结构后续直接命中缓存"""
+    present = set(columns)
+    return {field: next((c for c in aliases if c in present), None) for field, aliases in COLUMN_ALIASES.items()}
+
+
+def _as_float(values: Optional[np.ndarray], size: int) -> np.ndarray:
+    if values is None:
+        return np.full(size, np.nan)
+    try:
+        return values.astype(np.float64)
+    except (TypeError, ValueError):
+        out = np.full(size, np.nan)
+        for i, v in enumerate(values):
+            try:
+                out[i] = float(v)
+            except (TypeError, ValueError):
+                pass
+        return out
+
+
+class ScreenFeatures:
+    """一份快照上的筛选特征，按快照构建一次后复用"""
+
+    def __init__(self, store: QuoteStore):
+        cols = resolve_columns(tuple(store.columns))
+        n = len(store)
+        self.cols = cols
+        self.size = n
+        self.names = store.column(cols['name']) if cols['name'] else np.full(n, '', dtype=object)
+        self.price = _as_float(store.column(cols['price']) if cols['price'] else None, n)
+        self.turnover = _as_float(store.column(cols['turnover']) if cols['turnover'] else None, n)
+        self.change_pct = _as_float(store.column(cols['change_pct']) if cols['change_pct'] else None, n)
+        volume = _as_float(store.column(cols['volume']) if cols['volume'] else None, n)
+
+        names = self.names.astype(str)
+        self.is_st = np.char.find(np.char.upper(names), 'ST') >= 0
+        # 停牌：无最新价或当日无成交
+        self.is_suspended = np.isnan(self.price) | (volume == 0)
+        # 涨停阈值：创业板/科创板 20%，北交所 30%，ST 5%，其余 10%
+        codes = store.codes.astype(str)
+        limit = np.full(n, 10.0)
+        limit[np.char.startswith(codes, '300') | np.char.startswith(codes, '301') | np.char.startswith(codes, '688')] = 20.0
+        limit[np.char.startswith(codes, '8') | np.char.startswith(codes, '4') | np.char.startswith(codes, '92')] = 30.0
+        limit[self.is_st] = 5.0
+        self.is_limit_up = self.change_pct >= (limit - 0.1)
+
+    def feature(self, name: str) -> np.ndarray:
+        if name == 'turnover':
+            return self.turnover
+        if name == 'change_pct':
+            return self.change_pct
+        if name == 'abs_change':
+            return np.abs(self.change_pct)
+        raise KeyError(f"未知的打分字段: {name}")
+
+
+class StockScreener:
+    """向量化候选股筛选：别名解析 + 布尔过滤 + argpartition 取 top-k"""
+
+    def __init__(self, exclude_st: bool = True, exclude_suspended: bool = True, exclude_limit_up: bool = True):
+        self.exclude_st = exclude_st
+        self.exclude_suspended = exclude_suspended
+        self.exclude_limit_up = exclude_limit_up
+        self._features: Optional[ScreenFeatures] = None
+        self._features_store: Optional[QuoteStore] = None
+
+    def features(self, store: QuoteStore) -> ScreenFeatures:
+        if self._features_store is not store:
+            self._features = ScreenFeatures(store)
+            self._features_store = store
+        return self._features
+
+    def score(self, feats: ScreenFeatures, weights: Optional[Dict[str, float]] = None) -> np.ndarray:
+        """组合打分：各字段做 z-score 后加权求和，缺失值视为最低分"""
+        if weights is None:
+            weights = DEFAULT_WEIGHTS if feats.cols['turnover'] else FALLBACK_WEIGHTS
+        if len(weights) == 1:
+            name, w = next(iter(weights.items()))
+            total = feats.feature(name) * w
+        else:
+            total = np.zeros(feats.size)
+            for name, w in weights.items():
+                values = feats.feature(name)
+                std = np.nanstd(values)
+                z = (values - np.nanmean(values)) / std if std > 0 else np.zeros(feats.size)
+                total += w * z
+        return np.where(np.isnan(total), -np.inf, total)
+
+    def screen(self, store: QuoteStore, num: int = 5, weights: Optional[Dict[str, float]] = None,
+               universe: Optional[Iterable[Any]] = None) -> List[Dict[str, Any]]:
+        """返回得分最高的 num 只股票；universe 为可选的候选代码集合"""
+        feats = self.features(store)
+        if num <= 0 or feats.size == 0:
+            return []
+
+        if universe is not None:
+            candidates = np.unique(store.positions(universe))
+        else:
+            candidates = np.arange(feats.size)
+
+        keep = np.ones(len(candidates), dtype=bool)
+        if self.exclude_st:
+            keep &= ~feats.is_st[candidates]
+        if self.exclude_suspended:
+            keep &= ~feats.is_suspended[candidates]
+        if self.exclude_limit_up:
+            keep &= ~feats.is_limit_up[candidates]
+        candidates = candidates[keep]
+        if len(candidates) == 0:
+            return []
+
+        scores = self.score(feats, weights)[candidates]
+        k = min(num, len(candidates))
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(candidates) else np.arange(len(candidates))
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return self.records(store, feats, candidates[top])
+
+    def records(self, store: QuoteStore, feats: ScreenFeatures, positions: np.ndarray) -> List[Dict[str, Any]]:
+        codes = store.codes[positions].tolist()
+        names = feats.names[positions].tolist()
+        prices = feats.price[positions].tolist()
+        return [{'code': str(c), 'name': str(n), 'price': str(p)} for c, n, p in zip(codes, names, prices)]
@@ -0,0 +1,156 @@
+import os
+import json
+import asyncio
+import itertools
+from typing import Any, Dict, List, Optional
+from services.analysis_repository import AnalysisRepository
+from services.event_log import ERROR, get_event_log
+
+# 每个客户端待发送队列长度；队列满时丢弃最旧的消息，累计丢弃过多则断开该客户端
+WS_CLIENT_QUEUE_SIZE = int(os.getenv("WS_CLIENT_QUEUE_SIZE", "100"))
+WS_MAX_DROPPED = int(os.getenv("WS_MAX_DROPPED", "500"))
+# 跟踪分析结果表的间隔（秒）
+WS_POLL_INTERVAL = float(os.getenv("WS_POLL_INTERVAL", "0.5"))
+
+# 一级分析影响强度 -> 前端样式 impact-high/medium/low
+IMPACT_LEVELS = {'强': 'high', '中': 'medium', '弱': 'low'}
+
+
+class WSClient:
+    def __init__(self, client_id: int, websocket, username: Optional[str], queue_size: int):
+        self.id = client_id
+        self.websocket = websocket
+        self.username = username
+        self.queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    async def sender(self):
+        try:
+            while True:
+                message = await self.queue.get()
+                await self.websocket.send_text(message)
+        except Exception:
+            # 连接已断开，由接收端负责注销
+            pass
+
+
+class BroadcastHub:
+    """WebSocket 广播中心：每条消息只序列化一次，放入各客户端的有界队列，由各自的发送协程写出
+
+    慢客户端的队列满时丢弃其最旧的消息，不影响其他客户端；累计丢弃超过 max_dropped 条则断开。
+    publish() 需在事件循环线程内调用。
+    """
+
+    def __init__(self, queue_size: int = WS_CLIENT_QUEUE_SIZE, max_dropped: int = WS_MAX_DROPPED):
+        self.queue_size = queue_size
+        self.max_dropped = max_dropped
+        self.clients: Dict[int, WSClient] = {}
+        self.published = 0
+        self.disconnected_slow = 0
+        self._ids = itertools.count(1)
+
+    def register(self, websocket, username: Optional[str] = None) -> WSClient:
+        client = WSClient(next(self._ids), websocket, username, self.queue_size)
+        self.clients[client.id] = client
+        return client
+
+    def unregister(self, client: WSClient):
+        self.clients.pop(client.id, None)
+
+    def publish(self, message: Dict[str, Any]):
+        data = json.dumps(message, ensure_ascii=False, default=str)
+        self.published += 1
+        for client in list(self.clients.values()):
+            if client.queue.full():
+                client.queue.get_nowait()
+                client.dropped += 1
+                if client.dropped > self.max_dropped:
+                    self.unregister(client)
+                    self.disconnected_slow += 1
+                    asyncio.ensure_future(client.websocket.close(code=1013))
+                    continue
+            client.queue.put_nowait(data)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'clients': len(self.clients),
+            'published': self.published,
+            'queued': sum(c.queue.qsize() for c in self.clients.values()),
+            'dropped': sum(c.dropped for c in self.clients.values()),
+            'disconnected_slow': self.disconnected_slow,
+        }
+
+
+def to_push_message(row: Dict[str, Any]) -> Dict[str, Any]:
+    """把分析结果表中的一行转换为前端 displayAnalysis() 需要的结构"""
+    stocks = []
+    for s in row.get('recommended_stocks') or []:
+        if not isinstance(s, dict):
+            continue
+        stocks.append({
+            'code': s.get('code') or s.get('stock_code', ''),
+            'name': s.get('name') or s.get('stock_name', ''),
+            'action': s.get('action') or 'BUY',
+            'reason': s.get('reason') or s.get('selection_reason', ''),
+        })
+    return {
+        'id': row.get('id'),
+        'level': row.get('level'),
+        'news_id': row.get('news_id'),
+        'news_title': row.get('news_title') or '',
+        'news_content': row.get('news_content') or row.get('reason') or '',
+        'impact': row.get('impact'),
+        'impact_level': IMPACT_LEVELS.get(row.get('impact_level'), 'low'),
+        'affected_sectors': row.get('affected_sectors') or [],
+        'recommended_stocks': stocks,
+        'reason': row.get('reason') or '',
+        'analysis_time': row.get('analysis_time'),
+    }
+
+
+class AnalysisFeed:
+    """跟踪分析结果表（按 id 游标增量读取），把新结果推给广播中心
+
+    流水线无论运行在 worker、Streamlit 还是本进程，都会写入同一张表，
+    因此以表为唯一数据源，每条结果只推送一次。无影响的一级分析结果不推送。
+    """
+
+    def __init__(self, repository: AnalysisRepository, hub: BroadcastHub, interval: float = WS_POLL_INTERVAL):
+        self.repository = repository
+        self.hub = hub
+        self.interval = interval
+        self.cursor: Optional[int] = None
+
+    @staticmethod
+    def should_push(row: Dict[str, Any]) -> bool:
+        return row.get('level') == 2 or row.get('impact') == '是'
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                if self.cursor is None:
+                    # 启动时从当前最新一条之后开始推送；数据库暂不可用时与增量读取一样按间隔重试
+                    latest = await loop.run_in_executor(None, self.repository.latest, 1)
+                    self.cursor = latest[0]['id'] if latest else 0
+                rows: List[Dict[str, Any]] = await loop.run_in_executor(None, self.repository.since, self.cursor, 200)
+            except Exception as e:
+                get_event_log().emit('feed_read_error', 'system', ERROR, outcome='error', error=str(e))
+                rows = []
+            for row in rows:
+                self.cursor = max(self.cursor, row['id'])
+                if self.should_push(row):
+                    self.hub.publish(to_push_message(row))
+            if len(rows) < 200:
+                await asyncio.sleep(self.interval)
+
+
+_hub: Optional[BroadcastHub] = None
+
+
+def get_broadcast_hub() -> BroadcastHub:
+    """返回进程内共享的广播中心"""
+    global _hub
+    if _hub is None:
+        _hub = BroadcastHub()
+    return _hub
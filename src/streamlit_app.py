@@ -8,304 +8,106 @@ from streamlit_autorefresh import st_autorefresh
 # 添加项目根目录到 Python 路径
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from services.realtime_manager import RealTimeManager
+from typing import Optional
+from services.auth_service import JWT_SECRET_EPHEMERAL, create_access_token, get_auth_service
+from services.event_log import format_event
+from services.http_client import get_http_session
+from services.pipeline import AnalysisPipeline
+from services.result_store import load_snapshot
+
+# embedded: 本进程内启动一个共享的后台流水线（所有会话共用）
+# external: 流水线由 src/worker.py 独立运行，界面只读取其状态文件
+PIPELINE_MODE = os.getenv("PIPELINE_MODE", "embedded")
+# 设置后登录请求发往该 FastAPI 服务的 /api/auth/token；否则在本进程内用同一个 AuthService 签发相同的 JWT
+AUTH_API_URL = os.getenv("AUTH_API_URL", "")
 
 # 配置页面
 st.set_page_config(page_title="A股观察室", page_icon="📈", layout="wide")
 
-# 只在已登录状态下启用自动刷新（每10秒）
-if 'authenticated' in st.session_state and st.session_state.authenticated:
-    st_autorefresh(interval=10000, key="data_refresh")
+@st.cache_resource
+def get_pipeline():
+    """进程级单例流水线：无论打开多少个标签页都只运行一份"""
+    pipeline = AnalysisPipeline()
+    pipeline.start()
+    return pipeline
+
+@st.cache_resource
+def get_auth():
+    """进程级共享的认证服务（所有会话共用一个数据库引擎和用户缓存）"""
+    service = get_auth_service()
+    service.ensure_default_user()
+    return service
+
+def load_view():
+    """读取流水线的最新结果快照"""
+    if PIPELINE_MODE == "external":
+        return load_snapshot() or {}
+    return get_pipeline().store.snapshot()
+
+def request_token(username: str, password: str) -> Optional[str]:
+    """用户名密码换取 JWT，失败返回 None"""
+    if AUTH_API_URL:
+        r = get_http_session().post(f"{AUTH_API_URL.rstrip('/')}/api/auth/token",
+                                    data={"username": username, "password": password}, timeout=10)
+        return r.json().get("access_token") if r.status_code == 200 else None
+    if not get_auth().authenticate_user(username, password):
+        return None
+    return create_access_token(data={"sub": username})
+
+def current_user() -> Optional[str]:
+    """由会话中的 JWT 确定当前用户：本地验签、检查过期时间，并确认用户仍然存在（用户记录有缓存）
 
-# 初始化会话状态
-if 'authenticated' not in st.session_state:
-    st.session_state.authenticated = False
-if 'username' not in st.session_state:
-    st.session_state.username = None
-if 'rt_manager' not in st.session_state:
-    st.session_state.rt_manager = RealTimeManager()
-if 'last_seen_id' not in st.session_state:
-    st.session_state.last_seen_id = None
-if 'logs' not in st.session_state:
-    st.session_state.logs = []
-if 'recommendations' not in st.session_state:
-    st.session_state.recommendations = []
-if 'analysis_results' not in st.session_state:
-    st.session_state.analysis_results = []  # 存储所有一级分析结果
-if 'use_reasoning_model' not in st.session_state:
-    st.session_state.use_reasoning_model = False  # 默认使用快速的V3模型（现在仅用于用户强制全流程使用R1）
-if 'is_analyzing' not in st.session_state:
-    st.session_state.is_analyzing = False  # 标记是否正在分析中
-if 'analysis_start_time' not in st.session_state:
-    st.session_state.analysis_start_time = None  # 分析开始时间
-if 'is_level2_analyzing' not in st.session_state:
-    st.session_state.is_level2_analyzing = False  # 标记是否正在进行二级分析（R1）
-if 'level2_queue' not in st.session_state:
-    st.session_state.level2_queue = []  # 待处理的二级分析队列
+    token 只保存在本会话的 session_state 中，不写入 URL（避免经浏览器历史、Referer、日志或分享链接泄露）。
+    """
+    if 'token' in st.query_params:
+        # URL 中的 token 参数一律清除且不使用
+        del st.query_params['token']
+    token = st.session_state.get('token')
+    user = get_auth().user_from_token(token) if token else None
+    if user is None:
+        logout()
+        return None
+    return user.username
+
+def logout():
+    st.session_state.pop('token', None)
 
 def render_login():
     st.title("A股观察室 — 实时推荐")
+    if AUTH_API_URL and JWT_SECRET_EPHEMERAL:
+        # 本进程的随机密钥无法校验 FastAPI 签发的 token
+        st.error("已配置 AUTH_API_URL，但未设置 JWT_SECRET：请为界面与 FastAPI 服务配置相同的 JWT_SECRET")
+        return
     with st.form("login_form"):
         username = st.text_input("用户名")
         password = st.text_input("密码", type="password")
         submit = st.form_submit_button("登录")
         if submit:
-            if username == "admin" and password == "admin123":
-                st.session_state.authenticated = True
-                st.session_state.username = username
+            try:
+                token = request_token(username, password)
+            except Exception as e:
+                st.error(f"登录服务不可用: {str(e)}")
+                return
+            if token:
+                st.session_state.token = token
                 st.success("登录成功！")
                 time.sleep(0.5)
                 st.rerun()
             else:
                 st.error("用户名或密码错误")
 
-def process_level2_analysis():
-    """处理二级分析队列（使用R1模型）"""
-    if not st.session_state.level2_queue:
-        return
-    
-    # 取出队列第一个任务
-    task = st.session_state.level2_queue.pop(0)
-    rt = st.session_state.rt_manager
-    current_time = time.strftime('%H:%M:%S')
-    
-    title = task['title']
-    sectors = task['sectors']
-    reason = task['reason']
-    candidates = task['candidates']
-    created_time = task['created_time']
-    
-    st.session_state.logs.insert(0, f"[{current_time}] 🚀 开始R1二级分析 (创建于 {created_time})")
-    
-    try:
-        # 标记开始二级分析
-        st.session_state.is_level2_analyzing = True
-        st.session_state.analysis_start_time = time.time()
-        
-        real_time_data = {'candidates': candidates}
-        prompt2 = rt.level2_prompt(title, sectors, reason, real_time_data)
-        
-        # 强制使用R1模型进行二级分析
-        res2 = rt.call_deepseek(prompt2, max_tokens=1500, use_reasoning=True)
-        
-    finally:
-        # 确保状态总是被重置
-        st.session_state.is_level2_analyzing = False
-        st.session_state.analysis_start_time = None
-    
-    # 检查API错误
-    if 'error' in res2:
-        error_msg = f"[{current_time}] ❌ R1二级分析失败: {res2['error']}"
-        st.session_state.logs.insert(0, error_msg)
-        st.error(f"🚨 **R1二级分析失败**\n\n错误信息: {res2['error']}\n\n可能原因:\n- API超时（R1推理时间较长）\n- API配额用完\n\n建议: 等待10秒后自动重试")
-        return
-    
-    st.session_state.logs.insert(0, f"[{current_time}] ✅ R1二级分析完成")
-    
-    # 保存推荐结果
-    st.session_state.recommendations.insert(0, {
-        'title': title,
-        'time': current_time,
-        'strategy': res2,
-        'sectors': sectors,
-        'candidates': candidates,
-        'model': 'DeepSeek-R1'
-    })
-    
-    # 成功提示
-    st.success(f"✅ **R1深度分析完成！** 已生成高质量操作建议")
+# 当前登录用户；只在已登录状态下启用自动刷新（每10秒）
+st.session_state.username = current_user()
+if st.session_state.username:
+    st_autorefresh(interval=10000, key="data_refresh")
 
-def process_news():
-    """处理最新一条新闻并调用 DeepSeek 分析"""
-    rt = st.session_state.rt_manager
-    current_time = time.strftime('%H:%M:%S')
-    
-    # 检查是否有待处理的二级分析任务（R1模型）
-    if st.session_state.level2_queue and not st.session_state.is_level2_analyzing:
-        process_level2_analysis()
-    
-    # 如果正在进行二级分析（R1），更新状态但继续一级分析
-    if st.session_state.is_level2_analyzing:
-        elapsed = int(time.time() - st.session_state.analysis_start_time)
-        # 更新日志中的等待时间
-        if st.session_state.logs and "R1二级分析中" in st.session_state.logs[0]:
-            st.session_state.logs[0] = f"[{current_time}] ⏳ R1二级分析中... 已等待 {elapsed} 秒 (一级分析继续进行)"
-        else:
-            st.session_state.logs.insert(0, f"[{current_time}] ⏳ R1二级分析中... 已等待 {elapsed} 秒 (一级分析继续进行)")
-        # 继续执行一级分析，不return
-    
-    st.session_state.logs.insert(0, f"[{current_time}] 🔍 开始抓取新闻...")
-    
-    try:
-        # ========== 步骤1: 抓取新闻 ==========
-        news_items = rt.fetch_latest_news(page=1, page_size=10)
-        
-        if not news_items or not isinstance(news_items, list):
-            error_msg = f"[{current_time}] ❌ 新闻抓取失败"
-            st.session_state.logs.insert(0, error_msg)
-            st.error(f"🚨 **新闻抓取失败**\n\n返回数据类型: {type(news_items)}\n\n请检查新浪财经API是否可用")
-            return  # 停止处理
-        
-        st.session_state.logs.insert(0, f"[{current_time}] ✅ 成功获取 {len(news_items)} 条新闻")
-        
-        # ========== 处理第一条新闻 ==========
-        for item in news_items[:1]:
-            if not isinstance(item, dict):
-                st.session_state.logs.insert(0, f"[{current_time}] ⚠️ 新闻格式错误，跳过")
-                continue
-            
-            nid = str(item.get('id', ''))
-            title = item.get('title', '')
-            content = item.get('content', title)  # 如果没有content，使用title
-            
-            st.session_state.logs.insert(0, f"[{current_time}] 📰 新闻ID: {nid}")
-            st.session_state.logs.insert(0, f"[{current_time}] 📰 标题: {title[:50]}...")
-            
-            # 检查是否是新新闻
-            if nid and nid == st.session_state.last_seen_id:
-                st.session_state.logs.insert(0, f"[{current_time}] ⏭️ 已处理过此新闻，跳过")
-                continue
-            
-            # 更新最后处理的新闻ID
-            st.session_state.last_seen_id = nid
-            
-            # ========== 步骤2: 一级分析（强制使用V3快速模型）==========
-            try:
-                st.session_state.logs.insert(0, f"[{current_time}] 🤖 调用DeepSeek一级分析(V3快速模型)...")
-                
-                prompt1 = rt.level1_prompt(title, content)
-                
-                # 一级分析强制使用V3快速模型
-                res1 = rt.call_deepseek(prompt1, max_tokens=500, use_reasoning=False)
-                
-            finally:
-                # 一级分析不设置阻塞状态，可以并发
-                pass
-            
-            # 检查API错误
-            if 'error' in res1:
-                error_msg = f"[{current_time}] ❌ 一级分析API调用失败: {res1['error']}"
-                st.session_state.logs.insert(0, error_msg)
-                st.error(f"🚨 **DeepSeek API 一级分析失败**\n\n错误信息: {res1['error']}\n\n可能原因:\n- API超时（网络问题）\n- API配额用完\n- 服务暂时不可用\n\n建议: 等待10秒后自动重试")
-                return  # 停止处理，等待下次刷新
-            
-            st.session_state.logs.insert(0, f"[{current_time}] ✅ 一级分析API调用成功")
-            
-            # 检查返回格式
-            if 'parsed' not in res1:
-                error_msg = f"[{current_time}] ⚠️ 一级分析返回非JSON格式"
-                st.session_state.logs.insert(0, error_msg)
-                
-                # 保存非JSON格式的分析结果
-                raw_text = res1.get('raw_text', str(res1))
-                st.session_state.analysis_results.insert(0, {
-                    'time': current_time,
-                    'news_id': nid,
-                    'news_title': title,
-                    'impact': '未知',
-                    'sectors': [],
-                    'reason': f"[非JSON格式] {raw_text}",
-                    'is_json': False,
-                    'raw_response': raw_text
-                })
-                
-                # 持久显示警告，不使用st.warning（会自动消失）
-                # 改为在分析结果面板中显示
-                return  # 停止处理
-            
-            # ========== 解析一级分析结果 ==========
-            impact = res1['parsed'].get('impact', '否')
-            sectors = res1['parsed'].get('affected_sectors', [])
-            reason = res1['parsed'].get('reason', '')
-            
-            st.session_state.logs.insert(0, f"[{current_time}] 📊 影响判断: {impact}")
-            st.session_state.logs.insert(0, f"[{current_time}] 📊 影响板块: {', '.join(sectors)}")
-            st.session_state.logs.insert(0, f"[{current_time}] 📊 分析原因: {reason[:50]}...")
-            
-            # 保存一级分析结果
-            st.session_state.analysis_results.insert(0, {
-                'time': current_time,
-                'news_id': nid,
-                'news_title': title,
-                'impact': impact,
-                'sectors': sectors,
-                'reason': reason,
-                'is_json': True,
-                'raw_response': None
-            })
-            
-            # 不再使用临时弹窗，所有结果都在第二列持久显示
-            
-            if impact == '是':
-                # ========== 步骤3: 筛选候选股票 ==========
-                st.session_state.logs.insert(0, f"[{current_time}] � 开始筛选候选股票...")
-                
-                try:
-                    candidates = rt.pick_candidate_stocks(5)
-                    if not candidates or len(candidates) == 0:
-                        error_msg = f"[{current_time}] ❌ 股票筛选失败，未获取到数据"
-                        st.session_state.logs.insert(0, error_msg)
-                        
-                        # 保存失败信息到推荐列表（持久显示）
-                        st.session_state.recommendations.insert(0, {
-                            'title': title,
-                            'time': current_time,
-                            'strategy': {'error': 'AkShare股票数据获取失败，接口暂时不可用'},
-                            'sectors': sectors,
-                            'candidates': [],
-                            'error_type': 'akshare_failed'
-                        })
-                        return  # 停止处理
-                    
-                    st.session_state.logs.insert(0, f"[{current_time}] ✅ 筛选了 {len(candidates)} 只候选股票")
-                    for i, c in enumerate(candidates[:3], 1):
-                        st.session_state.logs.insert(0, f"[{current_time}]    {i}. {c.get('name')} ({c.get('code')}) - {c.get('price')}")
-                    
-                except Exception as e:
-                    error_msg = f"[{current_time}] ❌ 股票筛选异常: {str(e)}"
-                    st.session_state.logs.insert(0, error_msg)
-                    
-                    # 保存异常信息到推荐列表（持久显示）
-                    st.session_state.recommendations.insert(0, {
-                        'title': title,
-                        'time': current_time,
-                        'strategy': {'error': f'AkShare异常: {str(e)}'},
-                        'sectors': sectors,
-                        'candidates': [],
-                        'error_type': 'akshare_exception',
-                        'error_detail': str(e)
-                    })
-                    return  # 停止处理
-                
-                # ========== 步骤4: 加入二级分析队列（使用R1模型）==========
-                # 将任务加入队列，异步处理
-                task = {
-                    'title': title,
-                    'sectors': sectors,
-                    'reason': reason,
-                    'candidates': candidates,
-                    'created_time': current_time,
-                    'nid': nid
-                }
-                st.session_state.level2_queue.append(task)
-                st.session_state.logs.insert(0, f"[{current_time}] 📥 已加入R1二级分析队列 (队列长度: {len(st.session_state.level2_queue)})")
-                st.info(f"✅ **一级分析完成！** 发现显著影响，已加入R1深度分析队列")
-                
-            else:
-                st.session_state.logs.insert(0, f"[{current_time}] ⏭️ 无显著影响，继续监控")
-                st.info(f"ℹ️ 该新闻对A股无显著影响，继续监控下一条")
-            
-            break  # 只处理第一条新闻
-            
-    except Exception as e:
-        error_msg = f"[{current_time}] ❌ 系统异常: {str(e)}"
-        st.session_state.logs.insert(0, error_msg)
-        
-        import traceback
-        full_trace = traceback.format_exc()
-        st.session_state.logs.insert(0, f"[{current_time}] 堆栈: {full_trace[:200]}")
-        
-        st.error(f"🚨 **系统异常**\n\n错误信息: {str(e)}\n\n详细堆栈:\n```\n{full_trace}\n```")
+def render_duplicates(result):
+    """显示挂在该条分析下的近重复快讯"""
+    duplicates = result.get('duplicates') or []
+    if duplicates:
+        st.caption(f"🔁 同一事件的其他快讯 {len(duplicates)} 条（未重复分析）")
+        for dup in duplicates[:5]:
+            st.caption(f"· {dup.get('create_time', '')} {dup.get('news_title', '')[:60]}")
 
 def render_main():
     st.title("A股观察室 — 实时监控中 🔴")
@@ -314,44 +116,79 @@ def render_main():
     refresh_count = st.session_state.get('refresh_count', 0)
     st.session_state.refresh_count = refresh_count + 1
     
+    view = load_view()
+    status = view.get('status', {})
+    
     col1, col2, col3 = st.columns([2, 1, 1])
     with col1:
         # 显示混合模式状态
-        queue_len = len(st.session_state.level2_queue)
-        mode_info = f"一级: V3快速 | 二级: R1深度 | R1队列: {queue_len}"
+        level2 = status.get('level2', {})
+        queue_len = level2.get('queued', 0)
+        mode_info = (f"一级: V3快速 | 二级: R1深度 | R1队列: {queue_len} | R1并发: {len(level2.get('running', []))}/{level2.get('workers', 0)}"
+                     f" | 已完成: {level2.get('done', 0)} | 已过期: {level2.get('expired', 0)} | 待分析新闻: {status.get('backlog', 0)}")
         st.markdown(f"**用户：{st.session_state.username}** | 自动刷新：每10秒 | 刷新次数: {st.session_state.refresh_count}")
         st.caption(f"🔧 {mode_info}")
+        cache_stats = status.get('llm_cache')
+        if cache_stats:
+            hit_ratio = cache_stats.get('hit_ratio')
+            st.caption(f"🗄️ 响应缓存: 命中 {cache_stats.get('hits', 0)} / 未命中 {cache_stats.get('misses', 0)}"
+                       f" | 命中率 {hit_ratio if hit_ratio is not None else '-'} | 条目 {cache_stats.get('entries', 0)}")
+        limits = status.get('rate_limits') or {}
+        if limits:
+            st.caption("🚦 限流: " + " | ".join(
+                f"{name} 并发 {b.get('in_flight', 0)}/{b.get('concurrency_limit', 0)} 429次数 {b.get('throttled', 0)}"
+                for name, b in sorted(limits.items())))
+        hedge = status.get('hedge')
+        if hedge:
+            endpoints = status.get('endpoints') or []
+            st.caption(f"🔀 一级对冲: p95 {hedge.get('p95')}秒 | 补发 {hedge.get('hedged', 0)} 次 / 补发胜出 {hedge.get('hedge_wins', 0)} 次 | 端点: "
+                       + ", ".join(f"{e['name']}{'' if e.get('available') else '(冷却中)'} 失败率 {e.get('error_rate')}"
+                                   for e in endpoints))
     with col2:
         if st.button("🔄 立即刷新"):
             st.rerun()
     with col3:
         if st.button("退出"):
-            st.session_state.authenticated = False
+            logout()
             st.rerun()
     
     st.markdown("---")
     
+    # 流水线运行状态
+    heartbeat = status.get('heartbeat')
+    if heartbeat is None:
+        st.info("⏳ 分析流水线启动中，首轮结果稍后显示")
+    elif time.time() - heartbeat > 60:
+        st.error(f"🚨 **分析流水线已 {int(time.time() - heartbeat)} 秒无响应**\n\n请检查 worker 进程（python src/worker.py）是否在运行")
+    if status.get('last_error'):
+        st.error(f"🚨 **最近一轮处理出错**: {status['last_error']}")
+    
     # 显示R1二级分析状态
-    if st.session_state.is_level2_analyzing:
-        elapsed = int(time.time() - st.session_state.analysis_start_time)
-        progress_text = f"⏳ **R1二级分析中...** 已等待 **{elapsed}** 秒"
-        if elapsed > 60:
-            progress_text += f" ({elapsed // 60} 分 {elapsed % 60} 秒)"
-        st.warning(progress_text)
+    running = level2.get('running', [])
+    if running:
+        for job in running:
+            elapsed = int(time.time() - (job.get('started_at') or time.time()))
+            progress_text = f"⏳ **R1二级分析中...** [{job.get('strength', '中')}] {job.get('title', '')[:30]} 已等待 **{elapsed}** 秒"
+            if elapsed > 60:
+                progress_text += f" ({elapsed // 60} 分 {elapsed % 60} 秒)"
+            progress = job.get('progress') or {}
+            if progress:
+                progress_text += f" | 推理 {progress.get('reasoning_chars', 0)} 字 · 输出 {progress.get('content_chars', 0)} 字"
+            st.warning(progress_text)
         st.info("💡 R1模型正在进行深度推理，一级分析（V3）将继续监控新闻。")
-    elif st.session_state.level2_queue:
-        st.info(f"📥 **R1分析队列**: {len(st.session_state.level2_queue)} 个任务等待处理")
+    elif queue_len:
+        st.info(f"📥 **R1分析队列**: {queue_len} 个任务等待处理")
     
-    # 每次页面加载时自动处理新闻
-    with st.spinner('处理新闻中...'):
-        process_news()
+    analysis_results = view.get('analysis_results', [])
+    events = view.get('events', [])
+    recommendations = view.get('recommendations', [])
     
     # 四列布局：新闻流 | 一级分析结果 | 运行日志 | 操作推荐
     c1, c2, c3, c4 = st.columns([2, 2, 2, 2])
     
     with c1:
         st.subheader("📰 新闻流")
-        news = st.session_state.rt_manager.fetch_latest_news(1, 5)
+        news = view.get('news', [])[:5]
         if news and isinstance(news, list):
             for i, n in enumerate(news):
                 if isinstance(n, dict):
@@ -363,8 +200,8 @@ def render_main():
     
     with c2:
         st.subheader("🔍 一级分析结果")
-        if st.session_state.analysis_results:
-            for i, result in enumerate(st.session_state.analysis_results[:10]):  # 显示最近10条
+        if analysis_results:
+            for i, result in enumerate(analysis_results[:10]):  # 显示最近10条
                 impact = result.get('impact', '未知')
                 sectors = result.get('sectors', [])
                 reason = result.get('reason', '')
@@ -397,6 +234,7 @@ def render_main():
                         st.markdown(f"**影响板块**: {', '.join(sectors)}")
                         st.markdown(f"**分析原因**:")
                         st.info(reason)
+                        render_duplicates(result)
                 else:
                     with st.expander(f"⚪ {time_str} - 无影响", expanded=False):
                         st.markdown(f"**新闻**: {news_title[:60]}...")
@@ -405,6 +243,7 @@ def render_main():
                             st.markdown(f"**相关板块**: {', '.join(sectors)}")
                         st.markdown(f"**分析原因**:")
                         st.caption(reason)
+                        render_duplicates(result)
         else:
             st.info("暂无分析结果")
     
@@ -412,16 +251,23 @@ def render_main():
         st.subheader("📋 运行日志")
         log_container = st.container()
         with log_container:
-            if st.session_state.logs:
-                for log in st.session_state.logs[:30]:
-                    st.text(log)
+            if events:
+                for event in events[:30]:
+                    st.text(format_event(event))
             else:
                 st.info("暂无日志")
+        timing = view.get('stage_timing') or {}
+        if timing:
+            with st.expander("⏱️ 各阶段耗时（秒）"):
+                st.dataframe(
+                    [{'阶段': key, '次数': t['count'], '平均': t['avg'], 'p95': t['p95'], '最大': t['max']}
+                     for key, t in sorted(timing.items())],
+                    hide_index=True)
     
     with c4:
         st.subheader("💡 操作推荐")
-        if st.session_state.recommendations:
-            for i, rec in enumerate(st.session_state.recommendations[:5]):  # 显示最近5条
+        if recommendations:
+            for i, rec in enumerate(recommendations[:5]):  # 显示最近5条
                 error_type = rec.get('error_type', None)
                 
                 # 处理AkShare错误
@@ -519,7 +365,7 @@ def render_main():
             st.info("💤 暂无推荐\n\n系统正在监控中，发现显著影响时会自动生成推荐")
 
 def main():
-    if not st.session_state.authenticated:
+    if not st.session_state.username:
         render_login()
     else:
         render_main()
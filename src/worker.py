@@ -0,0 +1,31 @@
+"""
+A股观察室 - 后台分析 worker
+
+独立运行新闻抓取、一级分析、候选股筛选和二级分析，结果写入共享状态文件。
+Streamlit 界面设置 PIPELINE_MODE=external 后只读取该文件，多个浏览器标签页不再各自跑一遍流水线。
+
+用法: python src/worker.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from services.pipeline import AnalysisPipeline
+
+
+def main():
+    pipeline = AnalysisPipeline()
+    pipeline.start()
+    print(f"🚀 分析 worker 已启动，状态文件: {pipeline.store.path}")
+    try:
+        while pipeline.is_running():
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pipeline.stop()
+        print("👋 分析 worker 已停止")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import threading
+
+from sqlalchemy import select
+
+from models.database import StockAnalysisSector
+from services.analysis_repository import AnalysisRepository
+
+
+def make_repo(tmp_path, **kwargs):
+    return AnalysisRepository(url=f"sqlite:///{tmp_path / 'analysis.db'}", **kwargs)
+
+
+def record(news_id, level=1, sectors=()):
+    return {'news_id': news_id, 'level': level, 'news_title': f'新闻{news_id}', 'news_content': '',
+            'affected_sectors': list(sectors), 'recommended_stocks': [], 'impact': '是', 'reason': ''}
+
+
+def sector_rows(repo):
+    table = StockAnalysisSector.__table__
+    with repo.engine.connect() as conn:
+        return sorted((r.analysis_id, r.sector) for r in conn.execute(select(table)))
+
+
+def test_write_batch_maps_returned_ids_to_sectors(tmp_path):
+    repo = make_repo(tmp_path)
+    repo.write_batch([
+        record('a', sectors=['半导体', '证券', '半导体']),
+        record('b'),
+        record('c', sectors=['证券', '', None]),
+    ])
+    rows = {r['news_id']: r['id'] for r in repo.latest(10)}
+    # 去重、跳过空板块名，且 RETURNING 的 id 与参数顺序一一对应
+    assert sector_rows(repo) == sorted([(rows['a'], '半导体'), (rows['a'], '证券'), (rows['c'], '证券')])
+    assert repo.written == 3
+    repo.write_batch([])
+    assert repo.written == 3
+
+
+def test_latest_since_and_filters(tmp_path):
+    repo = make_repo(tmp_path)
+    repo.write_batch([
+        record('1', sectors=['半导体']),
+        record('2', level=2, sectors=['半导体', '证券']),
+        record('3', sectors=['证券']),
+        record('4', level=2),
+    ])
+    assert [r['news_id'] for r in repo.latest(3)] == ['4', '3', '2']
+    assert [r['news_id'] for r in repo.latest(10, level=2)] == ['4', '2']
+    assert [r['news_id'] for r in repo.latest(10, sector='证券')] == ['3', '2']
+    assert [r['news_id'] for r in repo.latest(10, level=1, sector='半导体')] == ['1']
+    assert repo.latest(10, sector='酿酒') == []
+
+    cursor = repo.latest(10)[-1]['id']
+    assert [r['news_id'] for r in repo.since(cursor)] == ['2', '3', '4']
+    assert [r['news_id'] for r in repo.since(cursor, limit=1)] == ['2']
+    assert [r['news_id'] for r in repo.since(cursor, sector='半导体')] == ['2']
+    latest = repo.latest(1)[0]
+    assert repo.since(latest['id']) == []
+    assert isinstance(latest['analysis_time'], str)
+    assert latest['affected_sectors'] == []
+
+
+def test_background_writer_batches_records(tmp_path, monkeypatch):
+    repo = make_repo(tmp_path, batch_size=3, flush_interval=1.0)
+    batches = []
+    write_batch = repo.write_batch
+
+    def recording(records):
+        batches.append(len(records))
+        write_batch(records)
+
+    monkeypatch.setattr(repo, 'write_batch', recording)
+    item = {'id': 'x', 'title': '央行降准', 'content': '释放长期资金'}
+    for _ in range(6):
+        repo.record_level1(item, '是', ['银行'], '利好', impact_level='强')
+    repo.record_level2({'nid': 'x', 'title': '央行降准', 'sectors': ['银行'], 'strength': '强'},
+                       {'parsed': {'recommended_stocks': [{'code': '600000'}], 'overall_strategy': '关注银行'}})
+    repo.flush()
+    assert sum(batches) == 7
+    assert max(batches) <= 3
+    assert repo.stats() == {'written': 7, 'queued': 0, 'dropped': 0}
+    level2 = repo.latest(1, level=2)[0]
+    assert level2['model'] == 'DeepSeek-R1'
+    assert level2['reason'] == '关注银行'
+    assert level2['recommended_stocks'] == [{'code': '600000'}]
+    assert len(repo.latest(10, sector='银行')) == 7
+
+
+def test_flush_under_concurrent_saves(tmp_path):
+    repo = make_repo(tmp_path, batch_size=16, flush_interval=0.05)
+    threads_n, per_thread = 8, 25
+    start = threading.Barrier(threads_n)
+
+    def save(t):
+        start.wait()
+        for i in range(per_thread):
+            repo.add(record(f'{t}-{i}', sectors=[f'板块{t}']))
+
+    threads = [threading.Thread(target=save, args=(t,)) for t in range(threads_n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    repo.flush()
+    assert repo.written == threads_n * per_thread
+    assert len(repo.since(0, limit=1000)) == threads_n * per_thread
+    assert len(repo.latest(1000, sector='板块3')) == per_thread
@@ -0,0 +1,59 @@
+from services.json_stream import IncrementalJSONParser
+
+
+def feed_chars(parser, text):
+    """逐字符喂入，模拟最碎的流式分片"""
+    fields = []
+    for ch in text:
+        fields.extend(parser.feed(ch))
+    return fields
+
+
+def test_fields_complete_in_order():
+    text = '{"impact": "是", "impact_strength": "强", "affected_sectors": ["半导体", "芯片"], "reason": "政策利好"}'
+    parser = IncrementalJSONParser()
+    assert feed_chars(parser, text) == [
+        ("impact", "是"),
+        ("impact_strength", "强"),
+        ("affected_sectors", ["半导体", "芯片"]),
+        ("reason", "政策利好"),
+    ]
+    assert parser.finished
+
+
+def test_field_emitted_as_soon_as_value_closes():
+    parser = IncrementalJSONParser()
+    assert parser.feed('{"impact": "是"') == [("impact", "是")]
+    assert parser.feed(', "reason": "未完') == []
+    assert parser.feed('成"}') == [("reason", "未完成")]
+
+
+def test_escape_split_across_chunks():
+    parser = IncrementalJSONParser()
+    assert parser.feed('{"reason": "引号\\') == []
+    assert parser.feed('"仍在字符串内\\\\') == []
+    assert parser.feed('", "impact": "否"}') == [("reason", '引号"仍在字符串内\\'), ("impact", "否")]
+
+
+def test_nested_values_with_brackets_in_strings():
+    text = '{"stocks": [{"code": "600000", "note": "含 } 和 ] 的说明"}, {"code": "000001"}], "meta": {"a": {"b": [1, 2]}}, "n": 3}'
+    parser = IncrementalJSONParser()
+    fields = feed_chars(parser, text)
+    assert fields == [
+        ("stocks", [{"code": "600000", "note": "含 } 和 ] 的说明"}, {"code": "000001"}]),
+        ("meta", {"a": {"b": [1, 2]}}),
+        ("n", 3),
+    ]
+
+
+def test_scalar_values_and_last_field_without_comma():
+    parser = IncrementalJSONParser()
+    fields = parser.feed('{"score": 0.85, "ok": true, "missing": null}')
+    assert fields == [("score", 0.85), ("ok", True), ("missing", None)]
+
+
+def test_markdown_fence_is_skipped_and_trailing_text_ignored():
+    parser = IncrementalJSONParser()
+    fields = feed_chars(parser, '```json\n{"impact": "否"}\n```\n{"extra": 1}')
+    assert fields == [("impact", "否")]
+    assert parser.fields == {"impact": "否"}
@@ -0,0 +1,50 @@
+import threading
+import time
+
+import services.level1_dispatcher as level1_dispatcher
+from services.level1_dispatcher import Level1Dispatcher
+
+
+def test_timeout_is_passed_to_analyze_and_results_keep_order():
+    seen = []
+
+    def analyze(item, timeout=None):
+        seen.append(timeout)
+        time.sleep(0.01 * (3 - item['id']))
+        return {'parsed': {'id': item['id']}}
+
+    dispatcher = Level1Dispatcher(analyze, concurrency=3, item_timeout=7)
+    results = dispatcher.dispatch([{'id': 0}, {'id': 1}, {'id': 2}])
+    assert [r['parsed']['id'] for r in results] == [0, 1, 2]
+    assert seen == [7, 7, 7]
+
+
+def test_hung_job_does_not_block_queued_jobs_forever(monkeypatch):
+    monkeypatch.setattr(level1_dispatcher, '_TIMEOUT_GRACE', 0.1)
+    release = threading.Event()
+
+    def analyze(item, timeout=None):
+        if item['id'] == 'hang':
+            release.wait(5)  # 无视超时、一直占用唯一的工作线程
+        return {'parsed': {'id': item['id']}}
+
+    dispatcher = Level1Dispatcher(analyze, concurrency=1, item_timeout=0.2)
+    started = time.monotonic()
+    results = dispatcher.dispatch([{'id': 'hang'}, {'id': 'a'}, {'id': 'b'}])
+    elapsed = time.monotonic() - started
+    release.set()
+    dispatcher.shutdown()
+    assert all('error' in r for r in results)
+    assert elapsed < 2
+
+
+def test_batch_results_fall_back_to_single_calls_for_missing_items():
+    def analyze(item, timeout=None):
+        return {'parsed': {'id': item['id'], 'single': True}}
+
+    def analyze_batch(items, timeout=None):
+        return [{'parsed': {'id': items[0]['id']}}, None, None]
+
+    dispatcher = Level1Dispatcher(analyze, analyze_batch=analyze_batch, batch_min=3)
+    results = dispatcher.dispatch([{'id': 1}, {'id': 2}, {'id': 3}])
+    assert [r['parsed'].get('single', False) for r in results] == [False, True, True]
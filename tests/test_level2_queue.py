@@ -0,0 +1,90 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from services.level2_queue import Level2Queue, parse_news_time
+
+
+def drain(queue):
+    """不启动工作线程，按出队顺序取出全部任务标题"""
+    titles = []
+    while queue._heap:
+        item = queue._next()
+        if item is None:
+            break
+        titles.append(item[1]['title'])
+    return titles
+
+
+def test_strength_first_then_freshness():
+    queue = Level2Queue(handler=lambda task: None)
+    now = time.time()
+    queue.submit({'title': '弱-新'}, strength='弱', news_time=now - 10)
+    queue.submit({'title': '中-旧'}, strength='中', news_time=now - 600)
+    queue.submit({'title': '强-旧'}, strength='强', news_time=now - 900)
+    queue.submit({'title': '中-新'}, strength='中', news_time=now - 60)
+    queue.submit({'title': '强-新'}, strength='强', news_time=now - 30)
+    queue.submit({'title': '未知强度'}, strength='?', news_time=now - 300)
+    assert drain(queue) == ['强-新', '强-旧', '中-新', '未知强度', '中-旧', '弱-新']
+
+
+def test_expired_jobs_are_skipped_at_dequeue():
+    queue = Level2Queue(handler=lambda task: None, max_news_age=60)
+    now = time.time()
+    expired = queue.submit({'title': '过期'}, strength='强', news_time=now - 120)
+    queue.submit({'title': '有效'}, strength='弱', news_time=now - 30)
+    assert drain(queue) == ['有效']
+    assert queue.counters['expired'] == 1
+    assert queue._jobs[expired]['state'] == 'expired'
+
+
+def test_workers_run_jobs_and_count_outcomes():
+    done = threading.Event()
+    seen = []
+
+    def handler(task):
+        seen.append(task['title'])
+        if len(seen) == 3:
+            done.set()
+        if task['title'] == '失败':
+            return False
+        if task['title'] == '异常':
+            raise RuntimeError('R1 调用失败')
+
+    queue = Level2Queue(handler=handler, workers=1)
+    queue.submit({'title': '成功'}, strength='强')
+    queue.submit({'title': '失败'}, strength='中')
+    queue.submit({'title': '异常'}, strength='弱')
+    queue.start()
+    try:
+        assert done.wait(5)
+        deadline = time.time() + 5
+        while queue.counters['done'] + queue.counters['failed'] < 3 and time.time() < deadline:
+            time.sleep(0.01)
+    finally:
+        queue.stop()
+    assert seen == ['成功', '失败', '异常']
+    assert queue.counters == {'done': 1, 'failed': 2, 'expired': 0}
+    assert queue.progress()['queued'] == 0
+
+
+def test_parse_news_time_naive_is_beijing_time():
+    expected = datetime(2025, 10, 20, 1, 31, tzinfo=timezone.utc).timestamp()
+    assert parse_news_time('2025-10-20 09:31:00') == expected
+    assert parse_news_time('2025-10-20 09:31:00.500') == expected + 0.5
+    assert parse_news_time(datetime(2025, 10, 20, 9, 31)) == expected
+
+
+def test_parse_news_time_aware_keeps_its_offset():
+    expected = datetime(2025, 10, 20, 1, 31, tzinfo=timezone.utc).timestamp()
+    assert parse_news_time('2025-10-20T01:31:00+00:00') == expected
+    assert parse_news_time('2025-10-20 10:31:00+09:00') == expected
+    assert parse_news_time(datetime(2025, 10, 20, 1, 31, tzinfo=timezone.utc)) == expected
+
+
+def test_parse_news_time_clamps_future_and_rejects_garbage():
+    future = (datetime.now(timezone.utc) + timedelta(hours=2)).isoformat()
+    assert parse_news_time(future) <= time.time()
+    assert parse_news_time('') is None
+    assert parse_news_time(None) is None
+    assert parse_news_time('昨天 09:31') is None
@@ -0,0 +1,75 @@
+import services.llm_cache as llm_cache
+from services.llm_cache import LLMCache
+
+PARAMS = {'max_tokens': 500, 'temperature': 0.7}
+
+
+class FakeClock:
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+def make_cache(tmp_path, monkeypatch, **kwargs):
+    clock = FakeClock()
+    monkeypatch.setattr(llm_cache, 'time', clock)
+    return LLMCache(path=str(tmp_path / 'cache' / 'llm_cache.db'), **kwargs), clock
+
+
+def test_key_is_stable_across_whitespace_and_param_order():
+    key = LLMCache.make_key('deepseek-chat', '分析这条新闻：\n  央行降准', PARAMS)
+    assert key == LLMCache.make_key('deepseek-chat', '  分析这条新闻： 央行降准\n',
+                                    {'temperature': 0.7, 'max_tokens': 500})
+    assert len(key) == 64
+
+
+def test_different_model_prompt_or_params_miss(tmp_path, monkeypatch):
+    cache, _ = make_cache(tmp_path, monkeypatch)
+    key = LLMCache.make_key('deepseek-chat', '央行降准', PARAMS)
+    cache.put(key, 'deepseek-chat', {'parsed': {'impact': '是'}})
+    assert cache.get(key) == {'parsed': {'impact': '是'}}
+    assert cache.get(LLMCache.make_key('deepseek-reasoner', '央行降准', PARAMS)) is None
+    assert cache.get(LLMCache.make_key('deepseek-chat', '央行加息', PARAMS)) is None
+    assert cache.get(LLMCache.make_key('deepseek-chat', '央行降准', {**PARAMS, 'max_tokens': 800})) is None
+    assert cache.stats() == {'hits': 1, 'misses': 3, 'hit_ratio': 0.25, 'entries': 1}
+
+
+def test_entries_expire_after_ttl(tmp_path, monkeypatch):
+    cache, clock = make_cache(tmp_path, monkeypatch, ttl=60)
+    cache.put('k', 'deepseek-chat', {'parsed': {}})
+    clock.now += 59
+    assert cache.get('k') == {'parsed': {}}
+    clock.now += 2
+    assert cache.get('k') is None
+    # 过期条目在读取时删除
+    assert cache.stats()['entries'] == 0
+
+
+def test_lru_eviction_keeps_recently_used(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_cache, '_EVICT_EVERY', 1)
+    cache, clock = make_cache(tmp_path, monkeypatch, max_entries=2)
+    cache.put('a', 'deepseek-chat', {'parsed': 'a'})
+    clock.now += 1
+    cache.put('b', 'deepseek-chat', {'parsed': 'b'})
+    clock.now += 1
+    assert cache.get('a') == {'parsed': 'a'}  # a 最近被访问
+    clock.now += 1
+    cache.put('c', 'deepseek-chat', {'parsed': 'c'})
+    assert cache.get('b') is None
+    assert cache.get('a') == {'parsed': 'a'}
+    assert cache.get('c') == {'parsed': 'c'}
+    assert cache.stats()['entries'] == 2
+
+
+def test_cache_persists_across_instances(tmp_path, monkeypatch):
+    cache, _ = make_cache(tmp_path, monkeypatch)
+    cache.put('k', 'deepseek-chat', {'parsed': {'sectors': ['半导体']}})
+    reopened = LLMCache(path=cache.path)
+    assert reopened.get('k') == {'parsed': {'sectors': ['半导体']}}
+
+
+def test_disabled_cache_returns_none(monkeypatch):
+    monkeypatch.setattr(llm_cache, 'LLM_CACHE_ENABLED', False)
+    assert llm_cache.get_llm_cache() is None
@@ -0,0 +1,133 @@
+import services.pipeline as pipeline_module
+from services.news_dedup import NearDuplicateDetector
+from services.result_store import ResultStore
+
+TEXT = '【财联社】央行宣布下调存款准备金率0.5个百分点，释放长期资金约1万亿元，支持实体经济发展'
+
+
+def news(nid, text=TEXT):
+    return {'id': nid, 'title': text[:20], 'content': text, 'create_time': '2025-10-20 09:30:00'}
+
+
+# ---------- NearDuplicateDetector ----------
+def test_duplicates_wait_for_pending_representative_and_are_returned_on_confirm():
+    dedup = NearDuplicateDetector()
+    assert dedup.check(news('1')) is None
+    assert dedup.is_pending('1')
+    assert dedup.check(news('2', TEXT + '。')) == '1'
+    assert [d['id'] for d in dedup.confirm('1')] == ['2']
+    assert not dedup.is_pending('1')
+    # 代表确认后，新的重复条目不再暂存
+    assert dedup.check(news('3', '快讯：' + TEXT)) == '1'
+    assert dedup.confirm('1') == []
+
+
+def test_release_drops_representative_and_hands_back_duplicates():
+    dedup = NearDuplicateDetector()
+    dedup.check(news('1'))
+    dedup.check(news('2', TEXT + '。'))
+    assert [d['id'] for d in dedup.release('1')] == ['2']
+    assert dedup.duplicates == 0
+    # 交回的条目重新判重时成为新的代表
+    assert dedup.check(news('2', TEXT + '。')) is None
+    assert dedup.is_pending('2')
+
+
+def test_unrelated_news_is_not_a_duplicate():
+    dedup = NearDuplicateDetector()
+    dedup.check(news('1'))
+    assert dedup.check(news('2', '国家统计局公布9月CPI同比上涨0.3%，核心CPI保持稳定')) is None
+
+
+# ---------- AnalysisPipeline 与簇代表 ----------
+class FakeFeed:
+    def __init__(self):
+        self.pages = []
+        self.last_fetch_ok = True
+
+    def poll(self):
+        return self.pages.pop(0) if self.pages else []
+
+    def recent(self, limit):
+        return []
+
+
+class FakeLevel1:
+    concurrency = 1
+
+    def __init__(self):
+        self.results = {}
+        self.seen = []
+
+    def dispatch(self, items):
+        self.seen.append([item['id'] for item in items])
+        return [self.results.get(item['id'], {'error': '超时'}) for item in items]
+
+
+class FakeLatency:
+    def start_cycle(self):
+        pass
+
+    def stats(self):
+        return {}
+
+
+class FakeEndpoints:
+    def stats(self):
+        return []
+
+
+class FakeRT:
+    def __init__(self):
+        self.feed = FakeFeed()
+        self.level1 = FakeLevel1()
+        self.level1_latency = FakeLatency()
+        self.endpoints = FakeEndpoints()
+        self.level1_field_hook = None
+
+
+def make_pipeline(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline_module, 'get_analysis_repository', lambda: None)
+    monkeypatch.setattr(pipeline_module, 'get_llm_cache', lambda: None)
+    rt = FakeRT()
+    store = ResultStore(path=str(tmp_path / 'state.json'))
+    return pipeline_module.AnalysisPipeline(rt=rt, store=store), rt, store
+
+
+def test_duplicates_are_linked_after_representative_succeeds(tmp_path, monkeypatch):
+    pipeline, rt, store = make_pipeline(tmp_path, monkeypatch)
+    rt.level1.results['1'] = {'parsed': {'impact': '否', 'affected_sectors': [], 'reason': ''}}
+    rt.feed.pages = [[news('1'), news('2', TEXT + '。')]]
+    pipeline.run_cycle()
+    assert rt.level1.seen == [['1']]
+    result = store.analysis_results.newest(1)[0]
+    assert [d['news_id'] for d in result['duplicates']] == ['2']
+
+
+def test_duplicates_are_analyzed_when_representative_fails(tmp_path, monkeypatch):
+    pipeline, rt, store = make_pipeline(tmp_path, monkeypatch)
+    rt.level1.results['2'] = {'parsed': {'impact': '否', 'affected_sectors': [], 'reason': ''}}
+    rt.feed.pages = [[news('1'), news('2', TEXT + '。')]]
+    pipeline.run_cycle()  # 代表 1 第一次失败，放回待分析队列
+    pipeline.run_cycle()  # 再次失败，撤销代表，重复条目 2 交回
+    pipeline.run_cycle()  # 2 成为新代表并完成分析
+    assert rt.level1.seen == [['1'], ['1'], ['2']]
+    assert [r['news_id'] for r in store.analysis_results.newest(5)] == ['2']
+
+
+def test_news_taken_for_dispatch_is_not_lost_when_cycle_raises(tmp_path, monkeypatch):
+    pipeline, rt, store = make_pipeline(tmp_path, monkeypatch)
+    calls = []
+
+    def failing_dispatch(items):
+        calls.append([item['id'] for item in items])
+        if len(calls) == 1:
+            raise RuntimeError('线程池已关闭')
+        return [{'parsed': {'impact': '否', 'affected_sectors': [], 'reason': ''}} for _ in items]
+
+    rt.level1.dispatch = failing_dispatch
+    rt.feed.pages = [[news('1')]]
+    pipeline.run_cycle()
+    pipeline.run_cycle()
+    assert calls == [['1'], ['1']]
+    assert [r['news_id'] for r in store.analysis_results.newest(5)] == ['1']
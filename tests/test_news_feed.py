@@ -0,0 +1,111 @@
+import asyncio
+
+from services.news_feed import IncrementalFeedReader
+
+
+class FakeFeed:
+    """新浪 7x24 分页接口的替身：news 按 id 从新到旧排列，page 从 1 开始"""
+
+    def __init__(self, ids=()):
+        self.news = [self.item(i) for i in sorted(ids, reverse=True)]
+        self.requests = []
+
+    @staticmethod
+    def item(nid):
+        return {'id': nid, 'title': f'新闻{nid}', 'create_time': f'2025-10-20 09:{nid % 60:02d}:00'}
+
+    def publish(self, *ids):
+        self.news = [self.item(i) for i in sorted(ids, reverse=True)] + self.news
+
+    def __call__(self, page, page_size):
+        self.requests.append(page)
+        start = (page - 1) * page_size
+        return self.news[start:start + page_size]
+
+
+def ids(items):
+    return [item['id'] for item in items]
+
+
+def test_first_poll_reads_only_first_page():
+    feed = FakeFeed(range(1, 51))
+    reader = IncrementalFeedReader(feed, page_size=10, max_backfill_pages=5)
+    assert ids(reader.poll()) == list(range(41, 51))
+    assert feed.requests == [1]
+    assert reader.high_water == 50
+
+
+def test_incremental_poll_returns_only_newer_items_oldest_first():
+    feed = FakeFeed(range(1, 11))
+    reader = IncrementalFeedReader(feed, page_size=10)
+    reader.poll()
+    feed.publish(11, 12, 13)
+    feed.requests.clear()
+    assert ids(reader.poll()) == [11, 12, 13]
+    assert feed.requests == [1]
+    assert reader.poll() == []
+
+
+def test_backfills_across_gap_larger_than_a_page():
+    feed = FakeFeed(range(1, 11))
+    reader = IncrementalFeedReader(feed, page_size=10, max_backfill_pages=5)
+    reader.poll()
+    feed.publish(*range(11, 36))  # 25 条新闻，跨 3 页
+    feed.requests.clear()
+    assert ids(reader.poll()) == list(range(11, 36))
+    assert feed.requests == [1, 2, 3]
+    assert reader.high_water == 35
+
+
+def test_backfill_stops_at_max_pages():
+    feed = FakeFeed(range(1, 11))
+    reader = IncrementalFeedReader(feed, page_size=10, max_backfill_pages=2)
+    reader.poll()
+    feed.publish(*range(11, 61))
+    assert ids(reader.poll()) == list(range(41, 61))
+    assert reader.high_water == 60
+
+
+def test_dedups_items_shifted_between_pages():
+    pages = {
+        1: [FakeFeed.item(i) for i in (14, 13, 12)],
+        # 翻页期间又来了新闻，整体后移，第 2 页重复出现 12
+        2: [FakeFeed.item(i) for i in (12, 11, 10)],
+    }
+    first = {1: [FakeFeed.item(10)]}
+    current = first
+
+    def fetch(page, page_size):
+        return current.get(page, [])
+
+    reader = IncrementalFeedReader(fetch, page_size=3, max_backfill_pages=5)
+    assert ids(reader.poll()) == [10]
+    current = pages
+    assert ids(reader.poll()) == [11, 12, 13, 14]
+
+
+def test_seen_ids_without_numeric_id_are_not_repeated():
+    items = [{'id': 'abc', 'title': 'x'}, {'id': 'def', 'title': 'y'}]
+    reader = IncrementalFeedReader(lambda page, size: list(items), page_size=10)
+    assert ids(reader.poll()) == ['abc', 'def']
+    assert reader.poll() == []
+
+
+def test_empty_first_page_marks_fetch_failed():
+    reader = IncrementalFeedReader(lambda page, size: [], page_size=10)
+    assert reader.poll() == []
+    assert reader.last_fetch_ok is False
+    assert reader.high_water is None
+
+
+def test_poll_async_shares_cursor_with_sync_poll():
+    feed = FakeFeed(range(1, 11))
+    reader = IncrementalFeedReader(feed, page_size=10)
+    reader.poll()
+    feed.publish(*range(11, 26))
+
+    async def fetch(page, page_size):
+        return feed(page, page_size)
+
+    assert ids(asyncio.run(reader.poll_async(fetch))) == list(range(11, 26))
+    assert ids(reader.poll()) == []
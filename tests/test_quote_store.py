@@ -0,0 +1,61 @@
+import pandas as pd
+import pytest
+
+import services.quote_store as quote_store
+from services.quote_store import QuoteStore, normalize_code
+
+
+def make_df(rows):
+    return pd.DataFrame(rows, columns=['代码', '名称', '最新价'])
+
+
+def test_normalize_code():
+    assert normalize_code('sh600000') == '600000'
+    assert normalize_code('600000.SH') == '600000'
+    assert normalize_code(600000) == '600000'
+    assert normalize_code('N/A') == 'N/A'
+
+
+def test_get_many_skips_unknown_codes():
+    store = QuoteStore(make_df([['600000', '浦发银行', 10.0], ['000001', '平安银行', 12.5]]))
+    assert store.get_many(['sz000001', '999999', '600000.SH', 'bad']) == {
+        '000001': {'代码': '000001', '名称': '平安银行', '最新价': 12.5},
+        '600000': {'代码': '600000', '名称': '浦发银行', '最新价': 10.0},
+    }
+    assert store.get_many(['999999']) == {}
+    assert store.get('999999') == {}
+    assert '600000' in store and '999999' not in store
+
+
+def test_missing_code_column_raises():
+    with pytest.raises(KeyError):
+        QuoteStore(pd.DataFrame({'名称': ['浦发银行']}))
+
+
+class FakeSnapshot:
+    def __init__(self, df):
+        self.df = df
+
+    def get(self):
+        return self.df
+
+
+def test_store_is_rebuilt_when_snapshot_changes(monkeypatch):
+    snapshot = FakeSnapshot(make_df([['600000', '浦发银行', 10.0]]))
+    monkeypatch.setattr(quote_store, 'get_snapshot_cache', lambda: snapshot)
+    monkeypatch.setattr(quote_store, '_store', None)
+    monkeypatch.setattr(quote_store, '_store_source', None)
+
+    first = quote_store.get_quote_store()
+    assert quote_store.get_quote_store() is first
+    assert first.get_many(['600000'])['600000']['最新价'] == 10.0
+
+    snapshot.df = make_df([['600000', '浦发银行', 10.5], ['601398', '工商银行', 6.1]])
+    rebuilt = quote_store.get_quote_store()
+    assert rebuilt is not first
+    assert rebuilt.get_many(['600000', '601398', '000001']) == {
+        '600000': {'代码': '600000', '名称': '浦发银行', '最新价': 10.5},
+        '601398': {'代码': '601398', '名称': '工商银行', '最新价': 6.1},
+    }
+    # 旧表不受新快照影响
+    assert first.get_many(['601398']) == {}
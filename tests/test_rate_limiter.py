@@ -0,0 +1,185 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from services.rate_limiter import AIMDLimiter, ModelBudget, TokenBucket, backoff_delay, parse_retry_after
+
+
+def make_budget(rpm=600, tpm=60000, max_concurrency=2, target_latency=10):
+    return ModelBudget('test', rpm, tpm, max_concurrency, target_latency)
+
+
+# ---------- TokenBucket ----------
+def test_try_acquire_takes_tokens_or_reports_wait_without_deducting():
+    bucket = TokenBucket(60)  # 每秒补充 1 个
+    assert bucket.try_acquire(60) == 0
+    wait = bucket.try_acquire(2)
+    assert 1.5 < wait <= 2
+    assert bucket.tokens < 1  # 失败的尝试不扣减
+
+
+def test_try_acquire_clamps_to_capacity():
+    bucket = TokenBucket(60)
+    assert bucket.try_acquire(1000) == 0
+    assert bucket.tokens < 1
+
+
+def test_adjust_refunds_and_overdraws():
+    bucket = TokenBucket(60)
+    bucket.try_acquire(60)
+    bucket.adjust(-30)
+    assert bucket.try_acquire(30) == 0
+    bucket.adjust(10)
+    assert bucket.tokens < -9
+
+
+def test_sync_acquire_waits_for_refill():
+    bucket = TokenBucket(600)  # 每秒补充 10 个
+    bucket.try_acquire(600)
+    started = time.monotonic()
+    bucket.acquire(1)
+    assert 0.05 < time.monotonic() - started < 1
+
+
+# ---------- AIMDLimiter ----------
+def test_try_acquire_respects_limit_and_cancel_keeps_limit():
+    limiter = AIMDLimiter(max_limit=4, target_latency=10)
+    assert limiter.limit == 2
+    assert limiter.try_acquire() and limiter.try_acquire()
+    assert not limiter.try_acquire()
+    limiter.cancel()
+    assert limiter.in_flight == 1 and limiter.limit == 2
+    assert limiter.try_acquire()
+
+
+def test_congestion_halves_and_success_grows_limit():
+    limiter = AIMDLimiter(max_limit=8, target_latency=1)
+    limiter.acquire()
+    limiter.release(None, congested=True)
+    assert limiter.limit == 2
+    limiter.acquire()
+    limiter.release(5.0, congested=False)  # 超过目标延迟也视为拥塞
+    assert limiter.limit == 1
+    for _ in range(3):
+        limiter.acquire()
+        limiter.release(0.1, congested=False)
+    assert 2 < limiter.limit <= 8
+    assert limiter.in_flight == 0
+
+
+def test_cancel_wakes_blocked_sync_acquire():
+    limiter = AIMDLimiter(max_limit=2, target_latency=10)
+    assert limiter.try_acquire()
+    acquired = threading.Event()
+
+    def worker():
+        limiter.acquire()
+        acquired.set()
+
+    threading.Thread(target=worker, daemon=True).start()
+    assert not acquired.wait(0.1)
+    limiter.cancel()
+    assert acquired.wait(1)
+
+
+# ---------- ModelBudget ----------
+def test_acquire_async_waits_for_slot_held_by_sync_caller():
+    budget = make_budget(max_concurrency=2)  # 初始并发上限 1
+    started = budget.acquire(100)
+
+    async def run():
+        task = asyncio.ensure_future(budget.acquire_async(100, poll=0.01))
+        await asyncio.sleep(0.1)
+        assert not task.done()
+        threading.Timer(0.05, budget.release, args=(started, 100)).start()
+        return await asyncio.wait_for(task, 2)
+
+    async_started = asyncio.run(run())
+    assert async_started > started
+    assert budget.concurrency.in_flight == 1
+    budget.release(async_started, 100)
+    assert budget.concurrency.in_flight == 0
+    assert budget.completed == 2
+
+
+def test_acquire_async_refunds_request_and_slot_when_tpm_exhausted():
+    budget = make_budget(rpm=600, tpm=60)
+    budget.acquire(60)  # 同步调用方用光 TPM
+    requests_left = budget.requests.tokens
+
+    async def run():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(budget.acquire_async(30, poll=0.01), 0.2)
+
+    asyncio.run(run())
+    # 异步调用方没拿到额度：不占用并发位，RPM 令牌已退还（只会随时间补充）
+    assert budget.concurrency.in_flight == 1
+    assert budget.requests.tokens >= requests_left
+
+
+def test_sync_and_async_callers_share_concurrency_limit():
+    budget = make_budget(max_concurrency=4)
+    budget.concurrency.max_limit = 2  # 固定并发上限为 2，不随成功次数增长
+    peak = {'value': 0}
+    lock = threading.Lock()
+
+    def hold(started):
+        with lock:
+            peak['value'] = max(peak['value'], budget.concurrency.in_flight)
+        time.sleep(0.05)
+        budget.release(started, 10, used_tokens=10)
+
+    def sync_caller():
+        hold(budget.acquire(10))
+
+    async def async_caller():
+        started = await budget.acquire_async(10, poll=0.005)
+        await asyncio.get_running_loop().run_in_executor(None, hold, started)
+
+    async def run():
+        await asyncio.gather(*(async_caller() for _ in range(4)))
+
+    threads = [threading.Thread(target=sync_caller) for _ in range(4)]
+    for t in threads:
+        t.start()
+    asyncio.run(run())
+    for t in threads:
+        t.join(5)
+    assert peak['value'] <= 2
+    assert budget.concurrency.in_flight == 0
+    assert budget.completed == 8
+
+
+def test_release_throttled_drains_requests_and_halves_concurrency():
+    budget = make_budget(max_concurrency=8)
+    started = budget.acquire(10)
+    budget.release(started, 10, throttled=True)
+    assert budget.throttled == 1
+    assert budget.concurrency.limit == 2
+    assert budget.requests.tokens <= 0.5
+
+
+def test_release_cancelled_does_not_count_or_shrink():
+    budget = make_budget(max_concurrency=8)
+    started = budget.acquire(10)
+    budget.release(started, 10, cancelled=True)
+    assert budget.concurrency.limit == 4
+    assert budget.completed == 0 and budget.throttled == 0
+
+
+# ---------- 重试辅助 ----------
+def test_backoff_respects_retry_after_and_cap():
+    for attempt in range(6):
+        assert 0 <= backoff_delay(attempt, base=1, cap=8) <= 8
+    assert backoff_delay(0, retry_after=5, base=1, cap=8) >= 5
+    assert backoff_delay(0, retry_after=1000, base=1, cap=8) == 32
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('3') == 3
+    assert parse_retry_after('-1') == 0
+    assert parse_retry_after('') is None
+    assert parse_retry_after('soon') is None
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0
@@ -0,0 +1,46 @@
+import pickle
+
+from services.relevance_filter import RelevanceFilter, load_model, save_model, split_holdout
+
+
+class ConstantModel:
+    def __init__(self, p):
+        self.p = p
+
+    def predict_proba(self, texts):
+        return [[1 - self.p, self.p] for _ in texts]
+
+
+def test_split_holdout_keeps_newest_records_for_testing():
+    records = [{'id': str(i)} for i in range(10)]
+    train, test = split_holdout(records, 0.2)
+    assert [r['id'] for r in train] == [str(i) for i in range(8)]
+    assert [r['id'] for r in test] == ['8', '9']
+    assert split_holdout([], 0.2) == ([], [])
+    assert split_holdout(records[:1], 0.2) == ([], records[:1])
+
+
+def test_saved_model_round_trips(tmp_path):
+    path = str(tmp_path / 'model.pkl')
+    save_model(ConstantModel(0.9), path)
+    flt = RelevanceFilter(model_path=path, labels_path=str(tmp_path / 'labels.jsonl'))
+    assert flt.score({'content': '与市场无关的一句话'}) == 0.9
+
+
+def test_plain_pickle_is_not_loaded(tmp_path):
+    path = tmp_path / 'model.pkl'
+    path.write_bytes(pickle.dumps(ConstantModel(0.9)))
+    assert load_model(str(path)) is None
+
+
+def test_tampered_model_is_rejected(tmp_path):
+    path = tmp_path / 'model.pkl'
+    save_model(ConstantModel(0.9), str(path))
+    data = bytearray(path.read_bytes())
+    data[-2] ^= 1
+    path.write_bytes(bytes(data))
+    assert load_model(str(path)) is None
+
+
+def test_missing_model_file():
+    assert load_model('/nonexistent/model.pkl') is None
@@ -0,0 +1,75 @@
+import time
+
+from services.sector_index import SectorIndex
+
+BOARDS = {
+    '半导体': {'600001'},
+    'AI芯片': {'600002'},
+    '酿酒行业': {'600003'},
+    '锂电池': {'300001'},
+    '固态电池': {'300002'},
+    '钠离子电池概念': {'300003'},
+    '人工智能': {'600004'},
+    '石油行业': {'600005'},
+    '油气设施': {'600006'},
+}
+
+
+def make_index(tmp_path, boards=BOARDS):
+    index = SectorIndex(path=str(tmp_path / 'sector_index.json'), ttl=3600)
+    index._install({k: set(v) for k, v in boards.items()}, time.time())
+    return index
+
+
+def test_exact_match_after_stripping_suffixes(tmp_path):
+    index = make_index(tmp_path)
+    assert index.match('半导体概念') == ['半导体']
+    assert index.match('酿酒') == ['酿酒行业']
+    assert index.match(' 石油 板块') == ['石油行业']
+
+
+def test_alias_wins_over_substring(tmp_path):
+    index = make_index(tmp_path)
+    # "芯片" 也是 "AI芯片" 的子串，但别名优先
+    assert index.match('芯片板块') == ['半导体']
+    assert index.match('白酒') == ['酿酒行业']
+
+
+def test_alias_ignored_when_target_board_missing(tmp_path):
+    index = make_index(tmp_path, {'证券服务': {'600010'}})
+    # 别名 "券商" -> "证券" 不在索引中，退回子串匹配
+    assert index.match('券商') == []
+    assert index.match('证券') == ['证券服务']
+
+
+def test_substring_keeps_only_closest_length(tmp_path):
+    index = make_index(tmp_path)
+    assert index.match('电池') == ['锂电池']
+    assert sorted(index.match('电池板块')) == ['锂电池']
+
+
+def test_difflib_fallback(tmp_path):
+    index = make_index(tmp_path)
+    assert index.match('人工智慧') == ['人工智能']
+    assert index.match('养猪') == []
+
+
+def test_short_names_are_rejected(tmp_path):
+    index = make_index(tmp_path)
+    assert index.match('油') == []
+    assert index.match('油概念') == []
+
+
+def test_codes_for_unions_matched_boards(tmp_path):
+    index = make_index(tmp_path)
+    assert index.codes_for(['芯片', '石油', '油', '未知板块']) == {'600001', '600005'}
+    assert index.codes_for(None) == set()
+
+
+def test_save_and_load_round_trip(tmp_path):
+    index = make_index(tmp_path)
+    index.save()
+    loaded = SectorIndex(path=index.path)
+    assert loaded.boards == index.boards
+    assert loaded.built_at == index.built_at
+    assert loaded.match('电池') == ['锂电池']
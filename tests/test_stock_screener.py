@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+from services.quote_store import QuoteStore
+from services.stock_screener import ScreenFeatures, StockScreener, resolve_columns
+
+
+def make_store(rows, columns=('代码', '名称', '最新价', '换手率', '涨跌幅', '成交量')):
+    return QuoteStore(pd.DataFrame(rows, columns=list(columns)))
+
+
+def codes(result):
+    return [r['code'] for r in result]
+
+
+def test_resolve_columns_picks_first_alias_present():
+    cols = resolve_columns(('股票代码', '现价', 'turnover', '涨跌幅'))
+    assert cols['code'] == '股票代码'
+    assert cols['price'] == '现价'
+    assert cols['turnover'] == 'turnover'
+    assert cols['name'] is None and cols['volume'] is None
+
+
+def test_top_k_by_turnover_with_aliased_columns():
+    store = make_store([
+        ['600001', '甲', 10.0, 1.0, 1.0, 100],
+        ['600002', '乙', 10.0, 5.0, 1.0, 100],
+        ['600003', '丙', 10.0, 3.0, 1.0, 100],
+        ['600004', '丁', 10.0, 4.0, 1.0, 100],
+        ['600005', '戊', 10.0, 2.0, 1.0, 100],
+    ], columns=('股票代码', '股票名称', '现价', 'turnover', 'change_pct', 'volume'))
+    screener = StockScreener()
+    assert codes(screener.screen(store, num=3)) == ['600002', '600004', '600003']
+    assert codes(screener.screen(store, num=10)) == ['600002', '600004', '600003', '600005', '600001']
+    assert screener.screen(store, num=0) == []
+    assert screener.screen(store, num=2)[0] == {'code': '600002', 'name': '乙', 'price': '10.0'}
+
+
+def test_fallback_scores_by_absolute_change_without_turnover():
+    store = make_store([
+        ['600001', '甲', 10.0, 2.0, 100],
+        ['600002', '乙', 10.0, -6.0, 100],
+        ['600003', '丙', 10.0, 4.0, 100],
+    ], columns=('代码', '名称', '最新价', '涨跌幅', '成交量'))
+    assert codes(StockScreener().screen(store, num=3)) == ['600002', '600003', '600001']
+
+
+def test_composite_score_sums_z_scores():
+    store = make_store([
+        ['600001', '甲', 10.0, 10.0, 0.0, 100],
+        ['600002', '乙', 10.0, 2.0, 8.0, 100],
+        ['600003', '丙', 10.0, 6.0, 5.0, 100],
+        ['600004', '丁', 10.0, 1.0, 1.0, 100],
+    ])
+    screener = StockScreener()
+    weights = {'turnover': 1.0, 'change_pct': 1.0}
+    feats = screener.features(store)
+    turnover = np.array([10.0, 2.0, 6.0, 1.0])
+    change = np.array([0.0, 8.0, 5.0, 1.0])
+    expected = (turnover - turnover.mean()) / turnover.std() + (change - change.mean()) / change.std()
+    assert np.allclose(screener.score(feats, weights), expected)
+    # 综合排序与单独按换手率（甲丙乙丁）或涨跌幅（乙丙丁甲）排序都不同
+    assert codes(screener.screen(store, num=4, weights=weights)) == ['600003', '600002', '600001', '600004']
+    assert codes(screener.screen(store, num=2, weights=weights)) == ['600003', '600002']
+
+
+def test_missing_values_rank_last():
+    store = make_store([
+        ['600001', '甲', 10.0, None, 1.0, 100],
+        ['600002', '乙', 10.0, 1.0, 1.0, 100],
+    ])
+    assert codes(StockScreener().screen(store, num=2)) == ['600002', '600001']
+
+
+def test_st_suspended_and_limit_up_masks():
+    store = make_store([
+        ['600001', '*ST甲', 10.0, 9.0, 4.95, 100],   # ST，5% 涨停
+        ['600002', '乙', None, 9.0, 0.0, 0],          # 停牌：无价
+        ['600003', '丙', 10.0, 9.0, 0.0, 0],          # 停牌：无成交
+        ['600004', '丁', 10.0, 9.0, 9.95, 100],       # 主板 10% 涨停
+        ['300001', '戊', 10.0, 8.0, 15.0, 100],       # 创业板 20%，未涨停
+        ['300002', '己', 10.0, 8.0, 19.95, 100],      # 创业板涨停
+        ['688001', '庚', 10.0, 7.0, 19.95, 100],      # 科创板涨停
+        ['830001', '辛', 10.0, 6.0, 25.0, 100],       # 北交所 30%，未涨停
+        ['830002', '壬', 10.0, 6.0, 29.95, 100],      # 北交所涨停
+        ['920001', '癸', 10.0, 5.0, 29.95, 100],      # 北交所 92 开头新代码
+        ['600005', '子', 10.0, 1.0, 5.0, 100],
+    ])
+    feats = ScreenFeatures(store)
+    assert feats.is_st.tolist() == [True] + [False] * 10
+    assert feats.is_suspended.tolist() == [False, True, True] + [False] * 8
+    assert feats.is_limit_up.tolist() == [True, False, False, True, False, True, True, False, True, True, False]
+
+    assert codes(StockScreener().screen(store, num=20)) == ['300001', '830001', '600005']
+    unfiltered = StockScreener(exclude_st=False, exclude_suspended=False, exclude_limit_up=False)
+    assert len(unfiltered.screen(store, num=20)) == 11
+
+
+def test_universe_restricts_candidates_and_ignores_unknown_codes():
+    store = make_store([
+        ['600001', '甲', 10.0, 1.0, 1.0, 100],
+        ['600002', '乙', 10.0, 5.0, 1.0, 100],
+        ['600003', '丙', 10.0, 3.0, 1.0, 100],
+    ])
+    screener = StockScreener()
+    assert codes(screener.screen(store, num=5, universe=['sh600001', '600003.SH', '600003', '999999'])) == \
+        ['600003', '600001']
+    assert screener.screen(store, num=5, universe=['999999']) == []
@@ -0,0 +1,104 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from jose import jwt
+from starlette.websockets import WebSocketDisconnect
+
+import api.routes.realtime as realtime
+from services.auth_service import create_access_token
+from services.ws_hub import BroadcastHub
+
+
+@pytest.fixture
+def hub(monkeypatch):
+    hub = BroadcastHub(queue_size=2, max_dropped=3)
+    monkeypatch.setattr(realtime, 'get_broadcast_hub', lambda: hub)
+    return hub
+
+
+@pytest.fixture
+def client(hub):
+    app = FastAPI()
+    app.include_router(realtime.router)
+
+    @app.post("/publish/{count}")
+    async def publish(count: int):
+        # 在事件循环线程内连续发布，期间发送协程没有机会运行
+        for i in range(count):
+            hub.publish({'seq': i})
+        return hub.stats()
+
+    with TestClient(app) as client:
+        yield client
+
+
+def wait_for_clients(client, expected):
+    deadline = time.monotonic() + 2
+    while time.monotonic() < deadline:
+        if client.get('/api/metrics/ws').json()['clients'] == expected:
+            return
+        time.sleep(0.01)
+    raise AssertionError(f'客户端数量未变为 {expected}')
+
+
+def test_bounded_queue_keeps_newest_messages(client):
+    token = create_access_token({'sub': 'admin'})
+    with client.websocket_connect(f'/ws?token={token}') as ws:
+        wait_for_clients(client, 1)
+        stats = client.post('/publish/5').json()
+        assert stats['dropped'] == 3
+        assert ws.receive_json() == {'seq': 3}
+        assert ws.receive_json() == {'seq': 4}
+    wait_for_clients(client, 0)
+    assert client.get('/api/metrics/ws').json()['published'] == 5
+
+
+@pytest.mark.parametrize('token', [
+    '',
+    'not-a-jwt',
+    jwt.encode({'sub': 'admin'}, 'some-other-secret', algorithm='HS256'),
+])
+def test_bad_jwt_is_rejected(client, token):
+    with pytest.raises(WebSocketDisconnect) as exc:
+        with client.websocket_connect(f'/ws?token={token}') as ws:
+            ws.receive_text()
+    assert exc.value.code == 1008
+    assert client.get('/api/metrics/ws').json()['clients'] == 0
+
+
+class SlowSocket:
+    def __init__(self):
+        self.closed_with = None
+
+    async def send_text(self, message):
+        await asyncio.sleep(3600)
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+def test_slow_client_is_disconnected_without_affecting_others():
+    async def scenario():
+        hub = BroadcastHub(queue_size=2, max_dropped=3)
+        slow = hub.register(SlowSocket(), 'slow')
+        fast = hub.register(SlowSocket(), 'fast')
+        for i in range(5):
+            hub.publish({'seq': i})
+            # 快客户端及时取走消息
+            while not fast.queue.empty():
+                fast.queue.get_nowait()
+        assert slow.dropped == 3
+        assert slow.queue.qsize() == 2
+        assert fast.dropped == 0
+        hub.publish({'seq': 5})
+        await asyncio.sleep(0)
+        return hub, slow, fast
+
+    hub, slow, fast = asyncio.run(scenario())
+    assert slow.websocket.closed_with == 1013
+    assert list(hub.clients.values()) == [fast]
+    assert hub.stats()['disconnected_slow'] == 1
+    assert fast.queue.qsize() == 1